@@ -0,0 +1,28 @@
+# Generated by Django 6.0 on 2026-10-17 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0003_alter_course_options_alter_course_code_and_more'),
+        ('facilitators', '0004_facilitator_deleted_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, db_index=True, default=None, null=True, verbose_name='Deleted At'),
+        ),
+        migrations.AlterField(
+            model_name='course',
+            name='code',
+            field=models.CharField(db_index=True, max_length=50, verbose_name='Code'),
+        ),
+        migrations.AddConstraint(
+            model_name='course',
+            constraint=models.UniqueConstraint(condition=models.Q(('deleted_at__isnull', True)), fields=('code',), name='unique_live_course_code'),
+        ),
+    ]
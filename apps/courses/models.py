@@ -1,18 +1,30 @@
 from django.db import models
 
+from utils.softdelete import LiveManager
+
 # course model
 class Course(models.Model):
     id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=255, db_index=True, verbose_name="Course Name")
-    code = models.CharField(max_length=50, unique=True, verbose_name="Code")
+    code = models.CharField(max_length=50, db_index=True, verbose_name="Code")
     facilitator = models.ForeignKey('facilitators.Facilitator', on_delete=models.SET_NULL, blank=True,
         null=True, default=None, verbose_name="Facilitator")
     created_at = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name="Created At")
+    # set when the row is deleted; the purger removes it later (utils/softdelete.py)
+    deleted_at = models.DateTimeField(null=True, blank=True, default=None, db_index=True, verbose_name="Deleted At")
+
+    objects = LiveManager()
+    all_objects = models.Manager()
     
     class Meta:
         verbose_name = "Course"
         verbose_name_plural = "Courses"
         ordering = ['-created_at']
+        constraints = [
+            # tombstoned rows do not block reusing the value
+            models.UniqueConstraint(
+                fields=["code"], condition=models.Q(deleted_at__isnull=True), name="unique_live_course_code"),
+        ]
 
     def __str__(self):
         return self.name
\ No newline at end of file
@@ -4,4 +4,5 @@ from . import views as v
 urlpatterns = [
     path('', v.courses_page, name='courses_page'),
     path('actions/', v.courses_actions, name="courses_actions"),
+    path('export/', v.courses_export, name="courses_export"),
 ]
@@ -5,134 +5,55 @@ from django.shortcuts import render
 from django.views.decorators.cache import never_cache
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse, HttpRequest, HttpResponse
-from django.db.models import QuerySet, Q
-from django.db.models.functions import Lower
-
-import os
-import openpyxl
-from django.conf import settings
-from django.core.files.storage import FileSystemStorage
 from django.db import transaction
-from datetime import datetime
 
 from .models import Course
 from apps.facilitators.models import Facilitator
-from apps.dashboard.models import Activity
+from apps.dashboard import activity, bulk, changes
+from apps.dashboard.refdata import normalize, refdata
+from apps.imports.merge import ImportDiff, ImportSpec, ParsedChunk, merge_chunk
+from apps.imports.preview import parsed_chunks
+from apps.imports.views import ImportJobService
+from apps.stationery.autocomplete import autocomplete
+from utils.datatables import Column, DataTableExporter, DataTableProcessor, TableSpec
+from utils.excel_import import ImportSource, ProgressCallback, Row, cell_text, import_result, import_stopped
+from utils.softdelete import live_related
 
 logger = logging.getLogger(__name__)
 
 
 # =============================================================================
-#  Database / Query utilities
+#  DataTable specification
 # =============================================================================
 
-def build_column_filter(
-    field_path: str,
-    search_value: str,
-    filter_kind: str = "contains",
-) -> Optional[Q]:
-    """
-    Build a Q object for column-specific filtering.
-    Supports:
-      - 'contains' / 'icontains' for text
-      - 'exact' for IDs / foreign keys / booleans
-      - Special 'n/a' → IS NULL
-    """
-    value = (search_value or "").strip()
-    if not value:
-        return None
-
-    if value.lower() == "n/a":
-        return Q(**{f"{field_path}__isnull": True})
-
-    if filter_kind == "exact":
-        return Q(**{field_path: value})
-
-    return Q(**{f"{field_path}__icontains": value})
-
-
-class DataTableProcessor:
-    """
-    Handles server-side processing for DataTables:
-    filtering, sorting, pagination, counting — all at database level.
-    """
-
-    @staticmethod
-    def process_request(
-        request: HttpRequest,
-        queryset: QuerySet,
-        global_search_fields: List[str],
-        column_filter_fields: Dict[int, str],
-        column_filter_types: Dict[str, str],
-        column_sort_fields: Optional[Dict[int, str]] = None,
-    ) -> Dict[str, Any]:
-        """
-        Main entry point.
-        column_sort_fields defaults to column_filter_fields if not provided.
-        """
-        if column_sort_fields is None:
-            column_sort_fields = column_filter_fields
-
-        # ── 1. Total records (unfiltered) ───────────────────────────────
-        total_records = queryset.count()
-
-        # ── 2. Read DataTables parameters ───────────────────────────────
-        draw = int(request.POST.get("draw", 1))
-        start = int(request.POST.get("start", 0))
-        length = int(request.POST.get("length", 10))
-        global_search = (request.POST.get("search[value]", "") or "").strip()
-
-        filtered_qs = queryset
-
-        # ── 3. Global search ────────────────────────────────────────────
-        if global_search:
-            q_global = Q()
-            for field in global_search_fields:
-                q_global |= Q(**{f"{field}__icontains": global_search})
-            filtered_qs = filtered_qs.filter(q_global)
-
-        # ── 4. Column-specific filters ──────────────────────────────────
-        for col_index, field_path in column_filter_fields.items():
-            search_val = (request.POST.get(f"columns[{col_index}][search][value]", "") or "").strip()
-            if not search_val:
-                continue
-
-            filter_kind = column_filter_types.get(field_path, "contains")
-            q_filter = build_column_filter(field_path, search_val, filter_kind)
-
-            if q_filter is not None:
-                filtered_qs = filtered_qs.filter(q_filter)
-
-        filtered_count = filtered_qs.count()
-
-        # ── 5. Sorting ──────────────────────────────────────────────────
-        order_column_idx = int(request.POST.get("order[0][column]", 1))
-        order_direction = request.POST.get("order[0][dir]", "asc")
-        sort_field = column_sort_fields.get(order_column_idx, "name")
-
-        if sort_field == "name":
-            order_by_expr = f"-{sort_field}" if order_direction == "desc" else sort_field
-        else:
-            order_by_expr = Lower(sort_field).desc() if order_direction == "desc" else Lower(sort_field).asc()
-
-        filtered_qs = filtered_qs.order_by(order_by_expr)
-
-        # ── 6. Pagination ───────────────────────────────────────────────
-        page_data = filtered_qs[start : start + length] if length > 0 else filtered_qs
-
-        if length < 0:
-            Activity.objects.create(
-                categ="course",
-                title="Courses data exported",
-                maelezo="All courses table data has been exported"
-                )
-
-        return {
-            "draw": draw,
-            "recordsTotal": total_records,
-            "recordsFiltered": filtered_count,
-            "data": page_data,
-        }
+def _course_row(obj: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": obj["id"],
+        "name": obj["name"],
+        "code": obj["code"],
+        "facilitator": obj["facilitator_name"] or "n/a",
+        "facilitator_id": obj["facilitator_id"] if obj["facilitator_name"] is not None else "",
+        "action": "",
+    }
+
+
+COURSES_TABLE = TableSpec(
+    label="courses",
+    categ="course",
+    queryset=lambda: Course.objects.annotate(facilitator_name=live_related("facilitator", "name")),
+    columns=(
+        Column(2, "name"),
+        Column(3, "code"),
+        Column(4, "facilitator__id", sort_field="facilitator_name",
+               filter_kind="exact", null_field="facilitator_name"),
+    ),
+    global_search_fields=("name", "code", "facilitator_name"),
+    values=("id", "name", "code", "facilitator_id", "facilitator_name"),
+    row=_course_row,
+    fulltext=(("course", "id"), ("facilitator_name", "facilitator_id")),
+    export_columns=(("Course Name", "name"), ("Code", "code"), ("Facilitator", "facilitator")),
+    depends_on=("courses.Course", "facilitators.Facilitator"),
+)
 
 
 # =============================================================================
@@ -156,7 +77,7 @@ class CourseService:
                 name=name, code=code,
                 facilitator=Facilitator.objects.get(id=fac_id) if fac_id else None,
             )
-            Activity.objects.create(
+            activity.record(
                 categ="course",
                 title="New course added",
                 maelezo="New course has been registered successfully"
@@ -181,7 +102,7 @@ class CourseService:
             course.facilitator = Facilitator.objects.get(id=fac_id) if fac_id else None
             course.save()
 
-            Activity.objects.create(
+            activity.record(
                 categ="course",
                 title="Course updated",
                 maelezo="Course information has been updated"
@@ -197,8 +118,9 @@ class CourseService:
     @staticmethod
     def delete_by_id(course_id: int) -> Dict[str, Any]:
         try:
-            Course.objects.filter(id=course_id).delete()
-            Activity.objects.create(
+            if not bulk.tombstone(Course, [course_id]):
+                return {"success": False, "sms": "Course not found."}
+            activity.record(
                 categ="course",
                 title="Course deleted",
                 maelezo="One course has been removed from system"
@@ -209,88 +131,111 @@ class CourseService:
             return {"success": False, "sms": "Delete failed."}
 
     @staticmethod
-    def import_from_excel(filepath: str) -> Dict[str, Any]:
-        created_count = 0
+    def import_from_excel(source: Optional[ImportSource], progress: Optional[ProgressCallback] = None,
+                          update_existing: bool = False, preview_token: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Import an upload, or the parsed rows of a checked preview when
+        ``preview_token`` is given, merging each chunk by course code
+        (apps.imports.merge).
+        """
+        processed = 0
         failed = []
+        diff = ImportDiff()
+        # lowercased codes of earlier rows, to report the ones repeated in the file
+        seen = set()
         try:
-            if not filepath.lower().endswith(('.xlsx', '.xls')):
-                return {"success": False, "sms": "Only Excel files (.xlsx, .xls) are accepted."}
-
-            wb = openpyxl.load_workbook(filepath, read_only=True, data_only=True)
-            sheet = wb.active
-
-            with transaction.atomic():
-                for row_num, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
-                    name = str(row[0] or '').strip() if len(row) > 0 else ''
-                    code = str(row[1] or '').strip() if len(row) > 1 else ''
-                    facil = str(row[2]).strip() if len(row) > 2 and row[2] else None
-                    
-                    if facil:
-                        facil = Facilitator.objects.filter(name__iexact=facil).first()
-
-                    if len(name) < 3 or len(code) < 3:
-                        failed.append({'row': row_num, 'reason': 'Name or Code is too short.'})
-                        continue
-                    elif Course.objects.filter(code__iexact=code).exists():
-                        failed.append({'row': row_num, 'reason': 'Code already exists.'})
-                        continue
-
-                    Course.objects.create(name=name, code=code, facilitator=facil)
-                    created_count += 1
-
-            wb.close()
-
-            sms = f'Imported {created_count} course(s) successfully.'
-            if failed:
-                sms += '<br>'
-                sms += 'Failed courses:<br>' + '<br>'.join([
-                    f'Row {f["row"]}: {f["reason"]}'
-                    for f in failed
-                ])
-
-            success = created_count > 0 and len(failed) == 0
-            
-            if created_count > 0:
-                Activity.objects.create(
-                    categ="course",
-                    title="Multiple courses added",
-                    maelezo=f"{created_count} courses has been registered from excel sheet"
-                    )
-
-            return {'success': success, 'sms': sms}
+            for parsed in parsed_chunks(COURSES_IMPORT, source, preview_token):
+                failed.extend(parsed.failed)
+                with transaction.atomic():
+                    merge_chunk(Course, "code", "Code", parsed.rows, seen, failed, diff, update_existing)
+                processed += parsed.size
+                if progress:
+                    progress(processed, len(failed))
+
+            result = import_result(
+                "course", diff.inserted, failed,
+                updated_count=diff.updated if update_existing else None, unchanged_count=diff.unchanged,
+            )
 
         except Exception as e:
-            logger.exception("Facilitators import failed")
-            return {'success': False, 'sms': f'Error processing file: {str(e)}'}
-        
+            logger.exception("Courses import failed")
+            result = import_stopped(
+                "course", e, processed + 2, diff.inserted, failed,
+                updated_count=diff.updated if update_existing else None, unchanged_count=diff.unchanged,
+            )
+
+        # rows of committed chunks stay saved even when a later chunk fails
+        if diff.inserted > 0:
+            activity.record(
+                categ="course",
+                title="Multiple courses added",
+                maelezo=f"{diff.inserted} courses has been registered from excel sheet"
+                )
+        if diff.updated > 0:
+            activity.record(
+                categ="course",
+                title="Multiple courses updated",
+                maelezo=f"{diff.updated} courses has been updated from excel sheet"
+                )
+
+        return result
+
+    @staticmethod
+    def parse_chunk(chunk: List[Row]) -> ParsedChunk:
+        """
+        Row checks for one chunk of spreadsheet rows, shared by the import
+        and its preview. Facilitator names resolve from the reference cache;
+        an unknown one is flagged. A row without a resolved facilitator leaves
+        facilitator_id out: new courses get none, existing ones keep theirs.
+        """
+        parsed = ParsedChunk(size=len(chunk))
+        cells = [
+            (row_num, cell_text(row, 0), cell_text(row, 1), cell_text(row, 2))
+            for row_num, row in chunk
+        ]
+        facilitators = refdata.ids_for("facilitators", {facil for _, _, _, facil in cells if facil})
+
+        for row_num, name, code, facil in cells:
+            if len(name) < 3 or len(code) < 3:
+                parsed.failed.append({'row': row_num, 'reason': 'Name or Code is too short.'})
+                continue
+
+            values = {"name": name}
+            facilitator_id = facilitators.get(normalize(facil)) if facil else None
+            if facilitator_id is not None:
+                values["facilitator_id"] = facilitator_id
+            elif facil:
+                parsed.warnings.append({'row': row_num, 'reason': f'Unknown facilitator "{facil}".'})
+            parsed.rows.append((row_num, code, values))
+        return parsed
+
     @staticmethod
     def delete_multiple(data: Dict[str, Any]) -> Dict[str, Any]:
         try:
             courses = data.get("courses_list", "")
-            courses_list = [int(x) for x in courses.split(",") if x.strip()]
+            courses_list = [int(x) for x in courses.split(",") if x.strip().isdigit()]
             delete_type = data.get("delete_type")
             
             if delete_type == "all":
-                get_all = Course.objects.all()
-                if len(get_all) == 0:
+                if not Course.objects.exists():
                     return {"success": False, "sms": "No courses available to delete."}
                 
-                get_all.delete()
-                Activity.objects.create(
+                deleted = bulk.tombstone(Course)
+                activity.record(
                     categ="course", title="All courses deleted",
                     maelezo="All courses have been erased from system"
                     )
-                return {"success": True, "sms": "All courses deleted successfully."}
+                return {"success": True, "sms": f"All {deleted} courses deleted successfully."}
             
-            for course in courses_list:
-                Course.objects.filter(id=course).delete()
+            deleted = bulk.tombstone(Course, courses_list) if courses_list else 0
+            if not deleted:
+                return {"success": False, "sms": "No courses were deleted."}
 
-            Activity.objects.create(
+            activity.record(
                 categ="course", title="Multiple courses deleted",
-                maelezo=f"{len(courses_list)} courses have been deleted from system"
+                maelezo=f"{deleted} courses have been deleted from system"
                 )
-            
-            return {"success": True, "sms": f"{len(courses_list)} courses deleted successfully."}
+            return {"success": True, "sms": f"{deleted} courses deleted successfully."}
                 
         except Exception as e:
             logger.exception("Course delete failed")
@@ -337,9 +282,11 @@ class CourseService:
 
             # transfer courses
             courses_updated = coursesList.update(facilitator=endFacil)
+            autocomplete.invalidate("courses")
+            changes.touch("courses.Course")
 
             if courses_updated > 0:
-                Activity.objects.create(
+                activity.record(
                     categ="course", title="Multiple courses transfered",
                     maelezo=f"{courses_updated} courses have been transfered to new facilitator"
                     )
@@ -350,6 +297,12 @@ class CourseService:
             logger.exception("Course transfer failed")
             return {"success": False, "sms": "Operation failed."}
 
+
+COURSES_IMPORT = ImportSpec(
+    kind="courses", model=Course, key_field="code", key_label="Code",
+    parse=CourseService.parse_chunk, warning="unknown_facilitator",
+)
+
 # =============================================================================
 #  Views
 # =============================================================================
@@ -357,63 +310,27 @@ class CourseService:
 @login_required
 def courses_page(request: HttpRequest) -> HttpResponse:
     if request.method == "POST" and request.headers.get("X-Requested-With") == "XMLHttpRequest":
-        base_qs = Course.objects.select_related("facilitator").all()
-
-        column_filter_fields = {
-            2: "name",
-            3: "code",
-            4: "facilitator__id",
-        }
-
-        column_sort_fields = {
-            2: "name",
-            3: "code",
-            4: "facilitator__name",
-        }
-
-        column_filter_types = {
-            "facilitator__id": "exact",
-        }
-
-        result = DataTableProcessor.process_request(
-            request=request,
-            queryset=base_qs,
-            global_search_fields=["name", "code", "facilitator__name"],
-            column_filter_fields=column_filter_fields,
-            column_filter_types=column_filter_types,
-            column_sort_fields=column_sort_fields,
-        )
-
-        start_idx = int(request.POST.get("start", 0))
-        rows = [
-            {
-                "count": start_idx + i + 1,
-                "id": obj.id,
-                "name": obj.name,
-                "code": obj.code,
-                "facilitator": obj.facilitator.name if obj.facilitator else "n/a",
-                "facilitator_id": obj.facilitator.id if obj.facilitator else "",
-                "action": "",
-            }
-            for i, obj in enumerate(result["data"])
-        ]
-
-        return JsonResponse(
-            {
-                "draw": result["draw"],
-                "recordsTotal": result["recordsTotal"],
-                "recordsFiltered": result["recordsFiltered"],
-                "data": rows,
-            }
-        )
+        return DataTableProcessor.respond(request, COURSES_TABLE)
 
     return render(
         request,
         "courses/courses.html",
-        {"facilitators": Facilitator.objects.all().order_by("name")},
+        # the option lists are cached fragments; the queryset only runs on a miss
+        {
+            "facilitators": Facilitator.objects.all().order_by("name"),
+            "facilitators_version": changes.stamp("facilitators.Facilitator"),
+        },
     )
 
 
+@never_cache
+@login_required
+def courses_export(request: HttpRequest) -> HttpResponse:
+    if request.method != "POST":
+        return JsonResponse({"success": False, "sms": "Invalid request"})
+    return DataTableExporter.export(request, COURSES_TABLE)
+
+
 @never_cache
 @login_required
 def courses_actions(request: HttpRequest) -> JsonResponse:
@@ -421,27 +338,17 @@ def courses_actions(request: HttpRequest) -> JsonResponse:
         return JsonResponse({"success": False, "sms": "Invalid request"}, status=405)
     
     if 'excel_file' in request.FILES:
-        uploaded_file = request.FILES['excel_file']
-        now = datetime.now().strftime("%Y-%m-%d_%H%M%S")
-        original_ext = os.path.splitext(uploaded_file.name)[1].lower()
-        new_filename = f"{now}_courses{original_ext}"
-        fs = FileSystemStorage(location=os.path.join(settings.MEDIA_ROOT, 'tmp'))
-        
-        # Save with new name
-        filepath = fs.path(fs.save(new_filename, uploaded_file))
-        
-        try:
-            result = CourseService.import_from_excel(filepath)
-            return JsonResponse(result)
-        finally:
-            if os.path.exists(filepath):
-                try:
-                    os.remove(filepath)
-                except (PermissionError, OSError):
-                    # Silently ignore
-                    pass
-                except Exception as e:
-                    logger.warning(f"Could not delete temp file {filepath}: {e}")
+        update_existing = request.POST.get("import_mode") == "upsert"
+        if request.POST.get("dry_run") == "true":
+            return JsonResponse(ImportJobService.dry_run(request.FILES['excel_file'], COURSES_IMPORT, update_existing))
+        return JsonResponse(ImportJobService.start(
+            "courses", request.FILES['excel_file'], CourseService.import_from_excel,
+            update_existing=update_existing,
+        ))
+    if request.POST.get("preview_token"):
+        return JsonResponse(ImportJobService.start_preview(
+            "courses", request.POST["preview_token"], CourseService.import_from_excel,
+        ))
 
     post_data = request.POST
     course_id = post_data.get("course_id")
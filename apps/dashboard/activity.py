@@ -0,0 +1,226 @@
+"""
+Buffered writes of Activity rows.
+
+record() takes the same arguments as Activity.objects.create() but queues
+the row instead of inserting it. The queue is written with one
+bulk_create when it reaches ACTIVITY_BUFFER_SIZE rows, when its oldest row
+is ACTIVITY_FLUSH_SECONDS old, at the end of every request
+(ActivityFlushMiddleware) and at interpreter exit. Rows are only queued
+once the surrounding transaction commits, so rolled back work leaves no
+trace in the log.
+
+A batch the database cannot take right now (locked, unavailable) goes back
+to the front of the queue for the next flush, up to MAX_QUEUED_ROWS rows.
+Any other failure writes the batch row by row, so only the offending rows
+are lost, and those are logged in full.
+
+Rows older than ACTIVITY_RETENTION_DAYS are moved to gzipped JSONL files,
+one per month, under ACTIVITY_ARCHIVE_DIR by archive_old() (run through
+`manage.py archive_activity`).
+
+Each recorded row is also pushed onto a short "recent activity" list in
+the cache, which is what the dashboard widget reads.
+"""
+import atexit
+import gzip
+import json
+import logging
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, OperationalError, transaction
+from django.utils import timezone
+
+from .models import Activity
+
+logger = logging.getLogger(__name__)
+
+RECENT_CACHE_KEY = "dashboard:recent_activity"
+
+# Queued rows kept while the database is unavailable; older ones are
+# logged and dropped beyond this
+MAX_QUEUED_ROWS = 5000
+
+
+def _setting(name: str, default: Any) -> Any:
+    return getattr(settings, name, default)
+
+
+class ActivityBuffer:
+    """Process-wide queue of unsaved Activity rows."""
+
+    def __init__(self) -> None:
+        self._rows: List[Activity] = []
+        self._oldest = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, row: Activity) -> None:
+        with self._lock:
+            if not self._rows:
+                self._oldest = time.monotonic()
+            self._rows.append(row)
+            full = len(self._rows) >= _setting("ACTIVITY_BUFFER_SIZE", 50)
+            stale = time.monotonic() - self._oldest >= _setting("ACTIVITY_FLUSH_SECONDS", 5)
+        if full or stale:
+            self.flush()
+
+    def flush(self) -> int:
+        """Insert every queued row; returns the number written."""
+        with self._lock:
+            rows, self._rows = self._rows, []
+        if not rows:
+            return 0
+        try:
+            with transaction.atomic():
+                Activity.objects.bulk_create(rows)
+        except OperationalError as e:
+            logger.warning(f"Could not write {len(rows)} activity row(s), will retry: {e}")
+            self._requeue(rows)
+            return 0
+        except DatabaseError as e:
+            logger.warning(f"Could not write {len(rows)} activity row(s) at once, writing them one by one: {e}")
+            return self._write_each(rows)
+        return len(rows)
+
+    def _requeue(self, rows: List[Activity]) -> None:
+        with self._lock:
+            self._rows = rows + self._rows
+            dropped = self._rows[:-MAX_QUEUED_ROWS]
+            del self._rows[:-MAX_QUEUED_ROWS]
+        for row in dropped:
+            logger.error(f"Dropped activity row: {_entry(row)}")
+
+    @staticmethod
+    def _write_each(rows: List[Activity]) -> int:
+        written = 0
+        for row in rows:
+            row.pk = None
+            try:
+                with transaction.atomic():
+                    row.save(force_insert=True)
+                written += 1
+            except DatabaseError as e:
+                logger.error(f"Could not write activity row {_entry(row)}: {e}")
+        return written
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+
+buffer = ActivityBuffer()
+atexit.register(buffer.flush)
+
+
+# =============================================================================
+# Public API
+# =============================================================================
+
+def record(categ: str, title: str = None, maelezo: str = "") -> None:
+    """Queue one activity entry (see the module docstring)."""
+    row = Activity(categ=categ, title=title, maelezo=maelezo, created_at=timezone.now())
+
+    def enqueue() -> None:
+        buffer.add(row)
+        _remember(row)
+
+    transaction.on_commit(enqueue)
+
+
+def flush() -> int:
+    return buffer.flush()
+
+
+# =============================================================================
+# Recent activity ring
+# =============================================================================
+
+def _entry(row: Activity) -> Dict[str, Any]:
+    return {"categ": row.categ, "title": row.title, "maelezo": row.maelezo, "created_at": row.created_at}
+
+
+def _remember(row: Activity) -> None:
+    entries = cache.get(RECENT_CACHE_KEY)
+    if entries is None:
+        # Nothing cached yet; the next recent() call rebuilds from the table
+        return
+    size = _setting("ACTIVITY_RECENT_SIZE", 20)
+    cache.set(RECENT_CACHE_KEY, [_entry(row)] + entries[:size - 1], _setting("ACTIVITY_RECENT_TTL", 300))
+
+
+def recent(limit: int = 5) -> List[Dict[str, Any]]:
+    """Newest activity entries, newest first, as dicts (see _entry)."""
+    entries = cache.get(RECENT_CACHE_KEY)
+    if entries is None:
+        flush()
+        size = _setting("ACTIVITY_RECENT_SIZE", 20)
+        entries = [_entry(row) for row in Activity.objects.order_by("-created_at", "-id")[:size]]
+        cache.set(RECENT_CACHE_KEY, entries, _setting("ACTIVITY_RECENT_TTL", 300))
+    return entries[:limit]
+
+
+class ActivityFlushMiddleware:
+    """Writes the activity rows queued while handling a request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            return self.get_response(request)
+        finally:
+            if len(buffer):
+                buffer.flush()
+
+
+# =============================================================================
+# Retention
+# =============================================================================
+
+# Rows archived and deleted per round-trip
+ARCHIVE_CHUNK_SIZE = 1000
+
+
+def archive_dir() -> Path:
+    return Path(_setting("ACTIVITY_ARCHIVE_DIR", Path(settings.BASE_DIR) / "archive" / "activity"))
+
+
+def archive_old(days: Optional[int] = None, dry_run: bool = False) -> int:
+    """
+    Move activity rows older than ``days`` (ACTIVITY_RETENTION_DAYS by
+    default) into monthly ``activity-YYYY-MM.jsonl.gz`` files, deleting each
+    chunk only after it has been written. Returns the number of rows moved.
+    """
+    days = _setting("ACTIVITY_RETENTION_DAYS", 365) if days is None else days
+    old = Activity.objects.filter(created_at__lt=timezone.now() - timedelta(days=days))
+    if dry_run:
+        return old.count()
+
+    directory = archive_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    moved = 0
+    while True:
+        chunk = list(old.order_by("id").values("id", "categ", "title", "maelezo", "created_at")[:ARCHIVE_CHUNK_SIZE])
+        if not chunk:
+            break
+
+        months: Dict[str, List[Dict[str, Any]]] = {}
+        for row in chunk:
+            months.setdefault(timezone.localtime(row["created_at"]).strftime("%Y-%m"), []).append(row)
+        for month, rows in months.items():
+            # Appending adds a new gzip member; readers see one continuous stream
+            with gzip.open(directory / f"activity-{month}.jsonl.gz", "at", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps(row, default=str) + "\n")
+
+        Activity.objects.filter(id__in=[row["id"] for row in chunk]).delete()
+        moved += len(chunk)
+
+    if moved:
+        cache.delete(RECENT_CACHE_KEY)
+        logger.info(f"Archived {moved} activity row(s) older than {days} day(s) to {directory}")
+    return moved
@@ -0,0 +1,210 @@
+"""
+Set-based writes and deletes for the entity tables.
+
+save() writes the inserts and updates of an import chunk with one
+bulk_create and one bulk_update, adjusts the counters and sends
+bulk_saved so the caches built on those tables catch up, as the per-row
+receivers would after save().
+
+Deleting is two-phase (utils/softdelete.py). tombstone() sets
+``deleted_at`` on the rows in one short transaction, so they vanish from
+every page at once, and schedules purge(). The purger then works through
+the tombstoned rows in the background in batches of PURGE_BATCH_SIZE, each
+in its own transaction with a pause in between, so other writers get the
+SQLite write lock between batches: first the SET_NULL references to them
+(e.g. the students of a deleted program) are cleared, then delete() removes
+the rows and their cascades. `manage.py purge_deleted` runs the same purge.
+
+Both steps walk the ids in chunks of DELETE_CHUNK_SIZE inside one
+transaction (_by_chunk()): tombstone() with one UPDATE per chunk, delete()
+with one collector pass per chunk (one SELECT, one DELETE per cascaded
+table, one UPDATE per SET_NULL relation) instead of one per row.
+
+The per-row signal receivers are suspended (counters.suspended()) during
+both steps; their effects are applied once per chunk / call through the
+signals below, whose receivers live next to the per-row ones:
+
+    bulk_deleting -- sender=model, ids=chunk; before the chunk is hidden / deleted
+    bulk_deleted  -- sender=model, ids=all ids, deleted={label: count},
+                     nulled=labels of models whose foreign keys were cleared
+    bulk_saved    -- sender=model, created=ids, updated=ids; after save()
+"""
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Type
+
+from django.apps import apps
+from django.db import connections, models, transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from . import counters
+
+logger = logging.getLogger(__name__)
+
+DELETE_CHUNK_SIZE = 500
+
+# Rows purged (or references cleared) per transaction, and the pause between
+# batches that lets other writers take the lock
+PURGE_BATCH_SIZE = 200
+PURGE_PAUSE_SECONDS = 0.05
+
+# Soft-deletable models, in purge order
+SOFT_DELETE_MODELS = (
+    "students.Student",
+    "courses.Course",
+    "programs.Program",
+    "facilitators.Facilitator",
+)
+
+bulk_deleting = Signal()
+bulk_deleted = Signal()
+bulk_saved = Signal()
+
+_purge_lock = threading.Lock()
+
+
+def set_null_relations(model: Type[models.Model]) -> List[str]:
+    """Labels of the models whose foreign keys to ``model`` are SET_NULL."""
+    return sorted({
+        rel.related_model._meta.label
+        for rel in model._meta.related_objects
+        if rel.on_delete is models.SET_NULL
+    })
+
+
+def _add_counts(totals: Dict[str, int], counts: Dict[str, int]) -> None:
+    for label, count in counts.items():
+        totals[label] = totals.get(label, 0) + count
+
+
+def save(model: Type[models.Model], created: Sequence[models.Model] = (),
+         updated: Sequence[models.Model] = (), fields: Sequence[str] = ()) -> None:
+    """
+    Insert ``created`` and write ``fields`` of ``updated`` (instances loaded
+    from the database), one bulk_create and one bulk_update at most.
+    """
+    if not created and not updated:
+        return
+    with transaction.atomic():
+        if created:
+            model.objects.bulk_create(created)
+            counters.adjust(**{counters.FIELD_BY_LABEL[model._meta.label]: len(created)})
+        if updated:
+            model.objects.bulk_update(updated, fields)
+        bulk_saved.send(
+            sender=model, created=[obj.pk for obj in created], updated=[obj.pk for obj in updated],
+        )
+
+
+def _by_chunk(model: Type[models.Model], ids: List[int], chunk_size: int,
+              step: Callable[[models.QuerySet], Dict[str, int]]) -> Dict[str, int]:
+    """
+    Run ``step`` on the rows of ``ids`` chunk by chunk, announcing each chunk
+    with bulk_deleting and the whole set with bulk_deleted. ``step`` returns
+    per-model counts; their totals are returned.
+    """
+    totals: Dict[str, int] = {}
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        bulk_deleting.send(sender=model, ids=chunk)
+        _add_counts(totals, step(model._base_manager.filter(id__in=chunk)))
+    if ids:
+        bulk_deleted.send(sender=model, ids=ids, deleted=totals, nulled=set_null_relations(model))
+    return totals
+
+
+def delete(model: Type[models.Model], ids: Iterable[int], chunk_size: int = DELETE_CHUNK_SIZE) -> Dict[str, int]:
+    """
+    Delete the rows of ``model`` with the given ids for good, tombstoned or
+    not. Returns the per-model counts, cascades included, like
+    QuerySet.delete(); ids that no longer exist are not counted. The
+    counters are left alone: the rows were taken off them by tombstone().
+    """
+    with transaction.atomic(), counters.suspended():
+        pending = list(model._base_manager.filter(id__in=set(ids)).order_by("id").values_list("id", flat=True))
+        return _by_chunk(model, pending, chunk_size, lambda chunk: chunk.delete()[1])
+
+
+def tombstone(model: Type[models.Model], ids: Optional[Iterable[int]] = None,
+              chunk_size: int = DELETE_CHUNK_SIZE) -> int:
+    """
+    Hide the live rows of ``model`` with the given ids (every live row when
+    ``ids`` is None) and start purging them once the transaction commits.
+    Returns the number of rows hidden.
+    """
+    queryset = model.objects.all() if ids is None else model.objects.filter(id__in=set(ids))
+    label = model._meta.label
+
+    with transaction.atomic(), counters.suspended():
+        hidden = list(queryset.order_by("id").values_list("id", flat=True))
+        now = timezone.now()
+        totals = _by_chunk(model, hidden, chunk_size, lambda chunk: {label: chunk.update(deleted_at=now)})
+        if hidden:
+            counters.adjust_deleted(totals)
+            transaction.on_commit(purge_in_background)
+    return len(hidden)
+
+
+# =============================================================================
+# Purge
+# =============================================================================
+
+def _clear_references(model: Type[models.Model], ids: List[int], batch_size: int, pause: float) -> None:
+    """Set the SET_NULL foreign keys pointing at ``ids`` to NULL, batch by batch."""
+    for rel in model._meta.related_objects:
+        if rel.on_delete is not models.SET_NULL:
+            continue
+        related = rel.related_model._base_manager
+        lookup = {f"{rel.field.name}__in": ids}
+        while True:
+            with transaction.atomic():
+                batch = list(related.filter(**lookup).values_list("pk", flat=True)[:batch_size])
+                if batch:
+                    related.filter(pk__in=batch).update(**{rel.field.name: None})
+            if not batch:
+                break
+            time.sleep(pause)
+
+
+def purge(batch_size: int = PURGE_BATCH_SIZE, pause: float = PURGE_PAUSE_SECONDS) -> Dict[str, int]:
+    """Delete every tombstoned row for good. Returns the per-model counts."""
+    totals: Dict[str, int] = {}
+    for label in SOFT_DELETE_MODELS:
+        model = apps.get_model(label)
+        while True:
+            ids = list(
+                model.all_objects.filter(deleted_at__isnull=False)
+                .order_by("id").values_list("id", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            _clear_references(model, ids, batch_size, pause)
+            _add_counts(totals, delete(model, ids, chunk_size=batch_size))
+            time.sleep(pause)
+    return totals
+
+
+def _purge_guarded() -> None:
+    if not _purge_lock.acquire(blocking=False):
+        return
+    try:
+        # Repeat until a pass finds nothing: rows tombstoned while a pass
+        # was past their model are picked up by the next one
+        while True:
+            started = time.monotonic()
+            totals = purge()
+            if not totals:
+                break
+            logger.info(f"Purged deleted rows in {time.monotonic() - started:.2f}s: {totals}")
+    except Exception:
+        logger.exception("Purging deleted rows failed; `manage.py purge_deleted` will retry")
+    finally:
+        _purge_lock.release()
+        connections.close_all()
+
+
+def purge_in_background() -> None:
+    if not _purge_lock.locked():
+        threading.Thread(target=_purge_guarded, name="purge-deleted", daemon=True).start()
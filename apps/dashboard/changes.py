@@ -0,0 +1,59 @@
+"""
+Per-table change stamps shared through the cache backend.
+
+Every save or delete of a tracked model (receivers in signals.py) stores the
+current time, in nanoseconds, under the model's key once the transaction
+commits; bulk paths that bypass signals (bulk_create, queryset.update())
+call touch() themselves. A stamp therefore changes whenever the table does,
+which makes it usable both as a cache key version (template fragments,
+reference data) and as a Last-Modified time for conditional responses.
+
+A missing stamp (cold or evicted cache) is created as "now", so it can only
+cause an extra miss, never a stale hit.
+"""
+import time
+from typing import Dict, Iterable
+
+from django.core.cache import cache
+from django.db import transaction
+
+TRACKED_MODELS = (
+    "students.Student",
+    "programs.Program",
+    "courses.Course",
+    "facilitators.Facilitator",
+)
+
+STAMP_KEY = "changes:{label}"
+
+
+def _key(label: str) -> str:
+    return STAMP_KEY.format(label=label.lower())
+
+
+def touch(*labels: str) -> None:
+    """Mark ``labels`` (e.g. "students.Student") as changed after the current transaction commits."""
+    def apply() -> None:
+        now = time.time_ns()
+        cache.set_many({_key(label): now for label in labels}, None)
+
+    transaction.on_commit(apply)
+
+
+def stamps(labels: Iterable[str]) -> Dict[str, int]:
+    """{label: stamp} for ``labels``."""
+    labels = list(labels)
+    found = cache.get_many([_key(label) for label in labels])
+    missing = {_key(label): time.time_ns() for label in labels if _key(label) not in found}
+    if missing:
+        # add() keeps a stamp another worker stored in the meantime
+        for key, value in missing.items():
+            if not cache.add(key, value, None):
+                missing[key] = cache.get(key, value)
+        found.update(missing)
+    return {label: found[_key(label)] for label in labels}
+
+
+def stamp(*labels: str) -> int:
+    """Newest stamp of ``labels``: changes whenever any of the tables does."""
+    return max(stamps(labels).values())
@@ -0,0 +1,94 @@
+"""
+Dashboard totals kept in the single DashboardCounters row.
+
+Single-row creates and deletes update the row through the signal receivers
+in signals.py, inside the same transaction as the change. Bulk paths
+(bulk.save(), bulk.tombstone()) adjust it themselves with adjust()
+/ adjust_deleted(), running queryset deletes under suspended() so that rows
+are not counted twice; the other per-row receivers honour it too. reconcile() recounts the tables and fixes any
+drift (see the reconcile_counters command).
+"""
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Mapping
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import F
+
+from .models import DashboardCounters
+
+# counter field -> counted model
+COUNTED_MODELS = {
+    "students": "students.Student",
+    "courses": "courses.Course",
+    "programs": "programs.Program",
+    "facilitators": "facilitators.Facilitator",
+}
+FIELD_BY_LABEL = {label: field for field, label in COUNTED_MODELS.items()}
+
+_state = threading.local()
+
+
+@contextmanager
+def suspended() -> Iterator[None]:
+    """Make the signal receivers ignore per-row deletes/creates on this thread."""
+    previous = getattr(_state, "suspended", False)
+    _state.suspended = True
+    try:
+        yield
+    finally:
+        _state.suspended = previous
+
+
+def is_suspended() -> bool:
+    return getattr(_state, "suspended", False)
+
+
+def adjust(**deltas: int) -> None:
+    """Add ``deltas`` (e.g. students=+500) to the counters row."""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    updated = DashboardCounters.objects.filter(pk=1).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+    if not updated:
+        # No row yet: a fresh count already includes this change
+        reconcile()
+
+
+def adjust_deleted(deleted: Mapping[str, int]) -> None:
+    """Apply the per-model counts returned by QuerySet.delete()."""
+    adjust(**{
+        FIELD_BY_LABEL[label]: -count for label, count in deleted.items() if label in FIELD_BY_LABEL
+    })
+
+
+def actual_counts() -> Dict[str, int]:
+    return {field: apps.get_model(label).objects.count() for field, label in COUNTED_MODELS.items()}
+
+
+def reconcile() -> Dict[str, int]:
+    """
+    Recount every table and store the result.
+    Returns the drift that was corrected (stored - actual) per counter.
+    """
+    with transaction.atomic():
+        counts = actual_counts()
+        row, created = DashboardCounters.objects.select_for_update().get_or_create(pk=1, defaults=counts)
+        drift = {} if created else {
+            field: getattr(row, field) - count for field, count in counts.items() if getattr(row, field) != count
+        }
+        if drift:
+            DashboardCounters.objects.filter(pk=1).update(**counts)
+    return drift
+
+
+def read() -> Dict[str, int]:
+    """Current totals, from one row."""
+    row = DashboardCounters.objects.filter(pk=1).values(*COUNTED_MODELS).first()
+    if row is None:
+        reconcile()
+        row = DashboardCounters.objects.filter(pk=1).values(*COUNTED_MODELS).first()
+    return row
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from apps.dashboard.activity import archive_dir, archive_old
+
+
+class Command(BaseCommand):
+    help = "Move activity log rows past the retention period into compressed monthly archive files."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, help="Keep this many days (default: ACTIVITY_RETENTION_DAYS).")
+        parser.add_argument("--dry-run", action="store_true", help="Only report how many rows would be archived.")
+
+    def handle(self, *args, **options):
+        moved = archive_old(days=options["days"], dry_run=options["dry_run"])
+        if options["dry_run"]:
+            self.stdout.write(f"{moved} activity row(s) would be archived.")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Archived {moved} activity row(s) to {archive_dir()}."))
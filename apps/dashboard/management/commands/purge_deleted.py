@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from apps.dashboard import bulk
+
+
+class Command(BaseCommand):
+    help = "Delete tombstoned students, courses, programs and facilitators for good, in small batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=bulk.PURGE_BATCH_SIZE)
+        parser.add_argument("--pause", type=float, default=bulk.PURGE_PAUSE_SECONDS,
+                            help="Seconds to wait between batches.")
+
+    def handle(self, *args, **options):
+        totals = bulk.purge(batch_size=options["batch_size"], pause=options["pause"])
+        if not totals:
+            self.stdout.write("Nothing to purge.")
+            return
+        for label, count in sorted(totals.items()):
+            self.stdout.write(f"{label}: {count}")
+        self.stdout.write(self.style.SUCCESS("Purge complete."))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from apps.dashboard.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = "Recount students, courses, programs and facilitators and fix drift in the dashboard counters."
+
+    def handle(self, *args, **options):
+        drift = reconcile()
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("Dashboard counters are up to date."))
+            return
+        for field, delta in drift.items():
+            self.stdout.write(self.style.WARNING(f"{field}: corrected drift of {delta:+d}"))
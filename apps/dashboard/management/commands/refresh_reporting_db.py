@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from utils.db_router import refresh_snapshot
+
+
+class Command(BaseCommand):
+    help = "Refresh the SQLite reporting snapshot (REPORTING_DB_ALIAS) from the default database."
+
+    def handle(self, *args, **options):
+        if not refresh_snapshot():
+            raise CommandError("No SQLite reporting snapshot is configured, or a refresh is already running.")
+        self.stdout.write(self.style.SUCCESS("Reporting snapshot refreshed."))
@@ -0,0 +1,25 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.dashboard.rollups import PERIODS, rebuild
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily/weekly cover page rollups from the stationery Page table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--period", choices=PERIODS, help="Only rebuild this period (default: all).")
+        parser.add_argument("--since", help="Only rebuild buckets from this date (YYYY-MM-DD).")
+
+    def handle(self, *args, **options):
+        since = None
+        if options["since"]:
+            try:
+                since = date.fromisoformat(options["since"])
+            except ValueError:
+                raise CommandError("--since must be a date in YYYY-MM-DD format.")
+
+        periods = (options["period"],) if options["period"] else PERIODS
+        written = rebuild(periods=periods, since=since)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} rollup row(s)."))
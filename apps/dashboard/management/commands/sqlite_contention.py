@@ -0,0 +1,122 @@
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Rows written per import transaction, as in utils.excel_import
+IMPORT_BATCH = 500
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark SQLite lock contention in a scratch database: a bulk importer, "
+        "counter staff saving records and dashboard readers run at the same time, "
+        "first with SQLite defaults and then with the DATABASES['default'] options."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seconds", type=float, default=5.0, help="Duration of each run.")
+        parser.add_argument("--importers", type=int, default=1)
+        parser.add_argument("--clerks", type=int, default=4, help="Threads doing read-then-write transactions.")
+        parser.add_argument("--readers", type=int, default=4)
+
+    def handle(self, *args, **options):
+        db_options = settings.DATABASES["default"].get("OPTIONS", {})
+        profiles = {
+            "defaults": {"init": [], "timeout": 5.0, "begin": "BEGIN"},
+            "configured": {
+                "init": [sql.strip() for sql in db_options.get("init_command", "").split(";") if sql.strip()],
+                "timeout": float(db_options.get("timeout", 5.0)),
+                "begin": f"BEGIN {db_options.get('transaction_mode') or ''}".strip(),
+            },
+        }
+
+        self.stdout.write(f"{'profile':<11} {'role':<9} {'ops':>7} {'ops/s':>8} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8}")
+        for name, profile in profiles.items():
+            with tempfile.TemporaryDirectory() as tmp:
+                results = self.run_profile(Path(tmp) / "bench.sqlite3", profile, options)
+            for role, r in results.items():
+                latencies = sorted(r["latencies"]) or [0.0]
+                p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+                self.stdout.write(
+                    f"{name:<11} {role:<9} {len(r['latencies']):>7} {len(r['latencies']) / options['seconds']:>8.1f} "
+                    f"{r['errors']:>7} {statistics.median(latencies) * 1000:>8.1f} {p95 * 1000:>8.1f}"
+                )
+
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def connect(path: Path, profile: Dict[str, Any]) -> sqlite3.Connection:
+        conn = sqlite3.connect(path, timeout=profile["timeout"], isolation_level=None, check_same_thread=False)
+        for sql in profile["init"]:
+            conn.execute(sql)
+        return conn
+
+    def run_profile(self, path: Path, profile: Dict[str, Any], options: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        conn = self.connect(path, profile)
+        conn.execute("CREATE TABLE item (id INTEGER PRIMARY KEY, name TEXT NOT NULL, hits INTEGER NOT NULL DEFAULT 0)")
+        conn.executemany("INSERT INTO item (name) VALUES (?)", ((f"seed {i}",) for i in range(10000)))
+        conn.close()
+
+        begin = profile["begin"]
+        deadline = time.monotonic() + options["seconds"]
+        results: Dict[str, Dict[str, Any]] = {
+            role: {"latencies": [], "errors": 0} for role in ("importer", "clerk", "reader")
+        }
+        lock = threading.Lock()
+
+        def importer(c: sqlite3.Connection, n: int) -> None:
+            c.execute(begin)
+            c.executemany("INSERT INTO item (name) VALUES (?)", ((f"import {n}-{i}",) for i in range(IMPORT_BATCH)))
+            c.execute("COMMIT")
+
+        def clerk(c: sqlite3.Connection, n: int) -> None:
+            # same shape as the services: check for a duplicate, then write
+            c.execute(begin)
+            c.execute("SELECT COUNT(*) FROM item WHERE name = ?", (f"seed {n % 10000}",)).fetchone()
+            c.execute("UPDATE item SET hits = hits + 1 WHERE id = ?", (n % 10000 + 1,))
+            c.execute("COMMIT")
+            time.sleep(0.005)
+
+        def reader(c: sqlite3.Connection, n: int) -> None:
+            c.execute("SELECT COUNT(*), SUM(hits) FROM item WHERE id % 7 = ?", (n % 7,)).fetchone()
+
+        def worker(role: str, operation) -> None:
+            c = self.connect(path, profile)
+            latencies: List[float] = []
+            errors = n = 0
+            while time.monotonic() < deadline:
+                n += 1
+                started = time.monotonic()
+                try:
+                    operation(c, n)
+                    latencies.append(time.monotonic() - started)
+                except sqlite3.OperationalError:
+                    errors += 1
+                    if c.in_transaction:
+                        c.execute("ROLLBACK")
+            c.close()
+            with lock:
+                results[role]["latencies"].extend(latencies)
+                results[role]["errors"] += errors
+
+        threads = [
+            threading.Thread(target=worker, args=(role, operation))
+            for role, operation, count in (
+                ("importer", importer, options["importers"]),
+                ("clerk", clerk, options["clerks"]),
+                ("reader", reader, options["readers"]),
+            )
+            for _ in range(count)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return results
@@ -0,0 +1,49 @@
+# Generated by Django 6.0 on 2026-10-17 11:20
+
+from django.db import migrations, models
+
+
+COUNTED_MODELS = {
+    'students': ('students', 'Student'),
+    'courses': ('courses', 'Course'),
+    'programs': ('programs', 'Program'),
+    'facilitators': ('facilitators', 'Facilitator'),
+}
+
+
+def fill_counters(apps, schema_editor):
+    DashboardCounters = apps.get_model('dashboard', 'DashboardCounters')
+    counts = {
+        field: apps.get_model(app_label, model).objects.count()
+        for field, (app_label, model) in COUNTED_MODELS.items()
+    }
+    DashboardCounters.objects.update_or_create(pk=1, defaults=counts)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0002_activity_title'),
+        ('students', '0002_alter_student_created_at_alter_student_fullname_and_more'),
+        ('courses', '0003_alter_course_options_alter_course_code_and_more'),
+        ('programs', '0003_alter_program_abbrev_alter_program_comment_and_more'),
+        ('facilitators', '0003_alter_facilitator_comment_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardCounters',
+            fields=[
+                ('id', models.PositiveSmallIntegerField(default=1, primary_key=True, serialize=False)),
+                ('students', models.BigIntegerField(default=0)),
+                ('courses', models.BigIntegerField(default=0)),
+                ('programs', models.BigIntegerField(default=0)),
+                ('facilitators', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Dashboard Counters',
+                'verbose_name_plural': 'Dashboard Counters',
+            },
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
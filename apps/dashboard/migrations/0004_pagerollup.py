@@ -0,0 +1,63 @@
+# Generated by Django 6.0 on 2026-10-17 12:40
+
+from django.db import migrations, models
+from django.db.models import Count, DateField, F, Value
+from django.db.models.functions import Coalesce, TruncDate, TruncWeek
+
+
+DIMENSIONS = {
+    'total': None,
+    'program': 'program_id',
+    'course': 'course_id',
+    'facilitator': 'course__facilitator_id',
+}
+
+
+def fill_rollups(apps, schema_editor):
+    Page = apps.get_model('stationery', 'Page')
+    PageRollup = apps.get_model('dashboard', 'PageRollup')
+    rows = []
+    for period, trunc in (('day', TruncDate), ('week', TruncWeek)):
+        for dimension, field in DIMENSIONS.items():
+            grouped = (
+                Page.objects.order_by()
+                .annotate(rollup_bucket=trunc('created_at', output_field=DateField()),
+                          rollup_key=Coalesce(F(field), Value(0)) if field else Value(0))
+                .values('rollup_bucket', 'rollup_key')
+                .annotate(n=Count('id'))
+            )
+            rows.extend(
+                PageRollup(period=period, bucket=g['rollup_bucket'], dimension=dimension,
+                           key=g['rollup_key'], count=g['n'])
+                for g in grouped
+            )
+    PageRollup.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0003_dashboardcounters'),
+        ('stationery', '0018_remove_page_legacy_lists_page_students'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PageRollup',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('period', models.CharField(choices=[('day', 'Day'), ('week', 'Week')], max_length=5)),
+                ('bucket', models.DateField(verbose_name='Period Start')),
+                ('dimension', models.CharField(choices=[('total', 'Total'), ('program', 'Program'), ('course', 'Course'), ('facilitator', 'Facilitator')], max_length=12)),
+                ('key', models.PositiveIntegerField(default=0, verbose_name='Object Id (0 = none)')),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Page Rollup',
+                'verbose_name_plural': 'Page Rollups',
+                'ordering': ['period', 'dimension', 'bucket'],
+                'constraints': [models.UniqueConstraint(fields=('period', 'dimension', 'bucket', 'key'), name='unique_page_rollup')],
+            },
+        ),
+        migrations.RunPython(fill_rollups, migrations.RunPython.noop),
+    ]
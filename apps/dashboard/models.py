@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 # Activity model
 class Activity(models.Model):
@@ -6,7 +7,8 @@ class Activity(models.Model):
     categ = models.CharField(max_length=255)
     title = models.CharField(max_length=255, null=True, default=None)
     maelezo = models.CharField(max_length=255)
-    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    # set when the entry is recorded, not when the buffered row is written
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
 
     class Meta:
         verbose_name = "Activity"
@@ -15,3 +17,51 @@ class Activity(models.Model):
 
     def __str__(self):
         return self.created_at
+
+# cached dashboard totals, a single row (id=1) kept current by apps.dashboard.counters
+class DashboardCounters(models.Model):
+    id = models.PositiveSmallIntegerField(primary_key=True, default=1)
+    students = models.BigIntegerField(default=0)
+    courses = models.BigIntegerField(default=0)
+    programs = models.BigIntegerField(default=0)
+    facilitators = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Dashboard Counters"
+        verbose_name_plural = "Dashboard Counters"
+
+    def __str__(self):
+        return f"students={self.students} courses={self.courses} programs={self.programs} facilitators={self.facilitators}"
+
+
+# cover pages created per day / week, per program, course and facilitator,
+# maintained by apps.dashboard.rollups
+class PageRollup(models.Model):
+    PERIOD_CHOICES = [
+        ("day", "Day"),
+        ("week", "Week"),
+    ]
+    DIMENSION_CHOICES = [
+        ("total", "Total"),
+        ("program", "Program"),
+        ("course", "Course"),
+        ("facilitator", "Facilitator"),
+    ]
+
+    id = models.AutoField(primary_key=True)
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    bucket = models.DateField(verbose_name="Period Start")
+    dimension = models.CharField(max_length=12, choices=DIMENSION_CHOICES)
+    key = models.PositiveIntegerField(default=0, verbose_name="Object Id (0 = none)")
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Page Rollup"
+        verbose_name_plural = "Page Rollups"
+        ordering = ["period", "dimension", "bucket"]
+        constraints = [
+            models.UniqueConstraint(fields=["period", "dimension", "bucket", "key"], name="unique_page_rollup"),
+        ]
+
+    def __str__(self):
+        return f"{self.period} {self.bucket} {self.dimension}:{self.key} = {self.count}"
@@ -0,0 +1,116 @@
+"""
+Process-wide cache of the small reference tables: program abbreviations,
+course codes and facilitator names mapped (case-insensitively) to ids.
+
+Each table is loaded with one query the first time it is needed and kept
+until its change stamp (changes.py) moves, so every worker sharing the
+cache backend reloads after a save or delete anywhere. Workers compare
+stamps at most every VERSION_CHECK_SECONDS, so another process's change
+can take that long to show up; the process that made a change drops its
+copy as soon as the change commits (receivers in signals.py).
+
+Use it where a reference is resolved or checked in bulk (imports, saving
+cover pages). Single-form validation still asks the database.
+"""
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.apps import apps
+from django.db import transaction
+
+from . import changes
+
+# table -> (model, key field)
+TABLES = {
+    "programs": ("programs.Program", "abbrev"),
+    "courses": ("courses.Course", "code"),
+    "facilitators": ("facilitators.Facilitator", "name"),
+}
+TABLE_BY_LABEL = {label: table for table, (label, _) in TABLES.items()}
+
+VERSION_CHECK_SECONDS = 1.0
+
+
+def normalize(value: Optional[str]) -> str:
+    return str(value or "").strip().casefold()
+
+
+class _Table:
+    __slots__ = ("version", "checked_at", "ids")
+
+    def __init__(self, version: int, ids: Dict[str, Tuple[int, ...]]) -> None:
+        self.version = version
+        self.checked_at = time.monotonic()
+        self.ids = ids
+
+
+class ReferenceCache:
+    def __init__(self) -> None:
+        self._tables: Dict[str, _Table] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _version(table: str) -> int:
+        return changes.stamp(TABLES[table][0])
+
+    @staticmethod
+    def _load(table: str) -> Dict[str, Tuple[int, ...]]:
+        label, field = TABLES[table]
+        ids: Dict[str, Tuple[int, ...]] = {}
+        # default ordering, so the first id is what .filter(...).first() returns
+        for obj_id, value in apps.get_model(label).objects.values_list("id", field):
+            key = normalize(value)
+            ids[key] = ids.get(key, ()) + (obj_id,)
+        return ids
+
+    def _table(self, table: str) -> Dict[str, Tuple[int, ...]]:
+        current = self._tables.get(table)
+        now = time.monotonic()
+        if current and now - current.checked_at < VERSION_CHECK_SECONDS:
+            return current.ids
+
+        version = self._version(table)
+        if current and current.version == version:
+            current.checked_at = now
+            return current.ids
+
+        with self._lock:
+            current = self._tables.get(table)
+            if current is None or current.version != version:
+                current = _Table(version, self._load(table))
+                self._tables[table] = current
+            return current.ids
+
+    # --- lookups --------------------------------------------------------------
+
+    def id_for(self, table: str, value: Optional[str]) -> Optional[int]:
+        """Id of the row whose key matches ``value`` case-insensitively."""
+        ids = self._table(table).get(normalize(value))
+        return ids[0] if ids else None
+
+    def ids_for(self, table: str, values: Iterable[Optional[str]]) -> Dict[str, int]:
+        """{normalized value: id} for the values that match a row."""
+        rows = self._table(table)
+        found = {}
+        for value in values:
+            key = normalize(value)
+            if key in rows:
+                found[key] = rows[key][0]
+        return found
+
+    def exists(self, table: str, value: Optional[str], exclude_id: Optional[int] = None) -> bool:
+        return any(obj_id != exclude_id for obj_id in self._table(table).get(normalize(value), ()))
+
+    # --- invalidation -----------------------------------------------------------
+
+    def invalidate(self, table: str) -> None:
+        """Drop this process's copy of ``table`` once the current transaction commits."""
+        def apply() -> None:
+            with self._lock:
+                self._tables.pop(table, None)
+
+        transaction.on_commit(apply)
+
+
+refdata = ReferenceCache()
@@ -0,0 +1,166 @@
+"""
+Time-series rollups of saved cover pages (stationery.Page).
+
+PageRollup holds one row per (period, bucket, dimension, key): the number
+of pages created in that day / week for a program, course or facilitator
+('total' uses key 0, and pages without the related object count under 0).
+Rows are bumped incrementally when pages are saved or deleted (signals.py)
+and rebuilt from the Page table by `manage.py rollup_pages`, which also
+corrects drift such as a course changing facilitator after the fact.
+"""
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DateField, F, Value
+from django.db.models.functions import Coalesce, TruncDate, TruncWeek
+from django.utils import timezone
+
+from apps.courses.models import Course
+from apps.facilitators.models import Facilitator
+from apps.programs.models import Program
+from apps.stationery.models import Page
+
+from .models import PageRollup
+
+PERIODS = ("day", "week")
+
+# dimension -> Page field holding the key
+DIMENSIONS = {
+    "total": None,
+    "program": "program_id",
+    "course": "course_id",
+    "facilitator": "course__facilitator_id",
+}
+
+
+def bucket_start(period: str, day: date) -> date:
+    return day - timedelta(days=day.weekday()) if period == "week" else day
+
+
+def _step(period: str) -> timedelta:
+    return timedelta(weeks=1) if period == "week" else timedelta(days=1)
+
+
+# =============================================================================
+# Incremental updates
+# =============================================================================
+
+def _bump(period: str, bucket: date, dimension: str, key: int, delta: int) -> None:
+    lookup = {"period": period, "bucket": bucket, "dimension": dimension, "key": key}
+    if PageRollup.objects.filter(**lookup).update(count=F("count") + delta) or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            PageRollup.objects.create(count=delta, **lookup)
+    except IntegrityError:
+        # Created concurrently by another request
+        PageRollup.objects.filter(**lookup).update(count=F("count") + delta)
+
+
+def record_page(page: Page, delta: int) -> None:
+    """Add ``delta`` (+1 on create, -1 on delete) to every bucket of ``page``."""
+    facilitator_id = None
+    if page.course_id:
+        facilitator_id = Course.objects.filter(id=page.course_id).values_list("facilitator_id", flat=True).first()
+    keys = {
+        "total": 0,
+        "program": page.program_id or 0,
+        "course": page.course_id or 0,
+        "facilitator": facilitator_id or 0,
+    }
+    day = timezone.localtime(page.created_at).date()
+    for period in PERIODS:
+        bucket = bucket_start(period, day)
+        for dimension, key in keys.items():
+            _bump(period, bucket, dimension, key, delta)
+
+
+# =============================================================================
+# Backfill
+# =============================================================================
+
+def rebuild(periods=PERIODS, since: Optional[date] = None) -> int:
+    """
+    Recompute rollups from the Page table, for all time or from ``since``.
+    Returns the number of rollup rows written.
+    """
+    written = 0
+    for period in periods:
+        trunc = TruncWeek if period == "week" else TruncDate
+        pages = Page.objects.all()
+        start = bucket_start(period, since) if since else None
+        if start:
+            pages = pages.filter(created_at__date__gte=start)
+
+        rows = []
+        for dimension, field in DIMENSIONS.items():
+            grouped = (
+                pages.order_by()
+                .annotate(rollup_bucket=trunc("created_at", output_field=DateField()),
+                          rollup_key=Coalesce(F(field), Value(0)) if field else Value(0))
+                .values("rollup_bucket", "rollup_key")
+                .annotate(n=Count("id"))
+            )
+            rows.extend(
+                PageRollup(period=period, bucket=g["rollup_bucket"], dimension=dimension,
+                           key=g["rollup_key"], count=g["n"])
+                for g in grouped
+            )
+
+        with transaction.atomic():
+            stale = PageRollup.objects.filter(period=period)
+            if start:
+                stale = stale.filter(bucket__gte=start)
+            stale.delete()
+            PageRollup.objects.bulk_create(rows, batch_size=500)
+        written += len(rows)
+    return written
+
+
+# =============================================================================
+# Reading
+# =============================================================================
+
+def _labels(dimension: str, keys: List[int]) -> Dict[int, str]:
+    if dimension == "program":
+        labels = {p["id"]: f"{p['abbrev']}: {p['name']}" for p in Program.objects.filter(id__in=keys).values("id", "abbrev", "name")}
+    elif dimension == "course":
+        labels = {c["id"]: f"{c['code']}: {c['name']}" for c in Course.objects.filter(id__in=keys).values("id", "code", "name")}
+    elif dimension == "facilitator":
+        labels = dict(Facilitator.objects.filter(id__in=keys).values_list("id", "name"))
+    else:
+        return {0: "All pages"}
+    labels.setdefault(0, "N/A")
+    return labels
+
+
+def series(period: str, dimension: str, buckets: int, limit: int = 10) -> Dict[str, Any]:
+    """
+    Chart-ready counts for the last ``buckets`` days/weeks: one series per
+    key, the ``limit`` largest first. Reads only the rollup rows in range.
+    """
+    step = _step(period)
+    end = bucket_start(period, timezone.localdate())
+    start = end - step * (buckets - 1)
+    labels = [start + step * i for i in range(buckets)]
+    index = {bucket: i for i, bucket in enumerate(labels)}
+
+    counts: Dict[int, List[int]] = {}
+    rows = PageRollup.objects.filter(
+        period=period, dimension=dimension, bucket__gte=start, bucket__lte=end,
+    ).values_list("bucket", "key", "count")
+    for bucket, key, count in rows:
+        counts.setdefault(key, [0] * buckets)[index[bucket]] += count
+
+    ranked = sorted(counts.items(), key=lambda item: sum(item[1]), reverse=True)[:limit]
+    names = _labels(dimension, [key for key, _ in ranked])
+    return {
+        "period": period,
+        "dimension": dimension,
+        "buckets": [bucket.isoformat() for bucket in labels],
+        "series": [
+            {"id": key, "label": names.get(key, f"Deleted ({key})"), "counts": values, "total": sum(values)}
+            for key, values in ranked
+        ],
+    }
@@ -0,0 +1,93 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.courses.models import Course
+from apps.facilitators.models import Facilitator
+from apps.programs.models import Program
+from apps.stationery.models import Page
+from apps.students.models import Student
+
+from . import changes, counters, rollups
+from .bulk import bulk_deleted, bulk_saved
+from .refdata import TABLE_BY_LABEL, refdata
+
+
+# =============================================================================
+# Dashboard counters
+# =============================================================================
+
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Program)
+@receiver(post_save, sender=Facilitator)
+def count_created(sender, instance, created, **kwargs):
+    if created and not counters.is_suspended():
+        counters.adjust(**{counters.FIELD_BY_LABEL[sender._meta.label]: 1})
+
+
+@receiver(post_delete, sender=Student)
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=Program)
+@receiver(post_delete, sender=Facilitator)
+def count_deleted(sender, instance, **kwargs):
+    if not counters.is_suspended():
+        counters.adjust(**{counters.FIELD_BY_LABEL[sender._meta.label]: -1})
+
+
+# =============================================================================
+# Change stamps and reference data cache
+# =============================================================================
+
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Program)
+@receiver(post_save, sender=Facilitator)
+@receiver(post_delete, sender=Student)
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=Program)
+@receiver(post_delete, sender=Facilitator)
+def touch_changed_table(sender, **kwargs):
+    if not counters.is_suspended():
+        changes.touch(sender._meta.label)
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Program)
+@receiver(post_save, sender=Facilitator)
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=Program)
+@receiver(post_delete, sender=Facilitator)
+def invalidate_reference_table(sender, **kwargs):
+    if not counters.is_suspended():
+        refdata.invalidate(TABLE_BY_LABEL[sender._meta.label])
+
+
+@receiver(bulk_saved)
+def touch_bulk_saved_table(sender, **kwargs):
+    label = sender._meta.label
+    changes.touch(label)
+    if label in TABLE_BY_LABEL:
+        refdata.invalidate(TABLE_BY_LABEL[label])
+
+
+@receiver(bulk_deleted)
+def touch_bulk_deleted_tables(sender, deleted, nulled, **kwargs):
+    labels = set(deleted) | set(nulled)
+    changes.touch(*labels)
+    for label in labels & set(TABLE_BY_LABEL):
+        refdata.invalidate(TABLE_BY_LABEL[label])
+
+
+# =============================================================================
+# Cover page rollups
+# =============================================================================
+
+@receiver(post_save, sender=Page)
+def rollup_page_created(sender, instance, created, **kwargs):
+    if created:
+        rollups.record_page(instance, 1)
+
+
+@receiver(post_delete, sender=Page)
+def rollup_page_deleted(sender, instance, **kwargs):
+    rollups.record_page(instance, -1)
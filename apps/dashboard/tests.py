@@ -1,3 +1,258 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.db import OperationalError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from apps.courses.models import Course
+from apps.facilitators.models import Facilitator
+from apps.programs.models import Program
+from apps.programs.views import ProgramService
+from apps.stationery.models import Page
+from apps.students.models import Student
+from apps.students.views import STUDENTS_TABLE, StudentService
+
+from . import activity, bulk, changes, counters
+from .models import Activity, DashboardCounters
+from .refdata import refdata
+
+
+class TombstoneAndPurgeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.program = Program.objects.create(name="Records Management", abbrev="BRAIM")
+        cls.other = Program.objects.create(name="Accounts", abbrev="BAC")
+        cls.students = Student.objects.bulk_create(
+            Student(fullname=f"Student {i}", regnumber=f"TPSD/{i:03d}", program=cls.program) for i in range(5)
+        )
+        cls.facilitator = Facilitator.objects.create(name="Madam Kadori")
+        cls.course = Course.objects.create(name="Typing", code="SST01", facilitator=cls.facilitator)
+        cls.page = Page.objects.create(task="Assignment", groupno=1, program=cls.program, course=cls.course)
+        counters.reconcile()
+
+    def test_tombstone_hides_rows_until_purged(self):
+        self.assertEqual(bulk.tombstone(Program, [self.program.id, 0]), 1)
+        self.assertFalse(Program.objects.filter(id=self.program.id).exists())
+        self.assertTrue(Program.all_objects.filter(id=self.program.id).exists())
+        self.assertEqual(counters.read()["programs"], 1)
+
+        # references are untouched until the purge, but read as missing
+        row = STUDENTS_TABLE.queryset().filter(id=self.students[0].id).values(*STUDENTS_TABLE.values).get()
+        self.assertEqual(row["program_id"], self.program.id)
+        self.assertEqual(STUDENTS_TABLE.row(row)["program"], "N/A")
+
+        # hiding it again finds nothing
+        self.assertEqual(bulk.tombstone(Program, [self.program.id]), 0)
+
+    def test_tombstoned_key_can_be_reused(self):
+        bulk.tombstone(Program, [self.program.id])
+        Program.objects.create(name="Records Management", abbrev="BRAIM")
+        self.assertEqual(Program.all_objects.filter(abbrev="BRAIM").count(), 2)
+
+    def test_purge_clears_references_then_deletes(self):
+        bulk.tombstone(Program, [self.program.id])
+        bulk.tombstone(Facilitator, [self.facilitator.id])
+
+        totals = bulk.purge(batch_size=2, pause=0)
+
+        self.assertEqual(totals, {"programs.Program": 1, "facilitators.Facilitator": 1})
+        self.assertFalse(Program.all_objects.filter(id=self.program.id).exists())
+        self.assertEqual(Student.objects.filter(program__isnull=True).count(), 5)
+        self.course.refresh_from_db()
+        self.page.refresh_from_db()
+        self.assertIsNone(self.course.facilitator_id)
+        self.assertIsNone(self.page.program_id)
+        self.assertEqual(self.page.course_id, self.course.id)
+        self.assertEqual(counters.reconcile(), {})
+        self.assertEqual(bulk.purge(pause=0), {})
+
+    def test_purge_removes_cascaded_rows(self):
+        self.page.students.set(self.students[:2])
+        bulk.tombstone(Student, [s.id for s in self.students[:3]])
+
+        bulk.purge(batch_size=2, pause=0)
+
+        self.assertEqual(Student.all_objects.count(), 2)
+        self.assertEqual(self.page.students.count(), 0)
+        self.assertEqual(counters.reconcile(), {})
+
+    def test_delete_all_tombstones_only_live_rows(self):
+        bulk.tombstone(Program, [self.other.id])
+        result = ProgramService.delete_multiple({"delete_type": "all"})
+        self.assertEqual(result, {"success": True, "sms": "All 1 programs deleted successfully."})
+        self.assertEqual(counters.read()["programs"], 0)
+        self.assertEqual(ProgramService.delete_multiple({"delete_type": "all"})["success"], False)
+
+    def test_delete_by_id_reports_missing_rows(self):
+        student_id = self.students[0].id
+        self.assertTrue(StudentService.delete_by_id(student_id)["success"])
+        for missing in (student_id, 999999):
+            with self.subTest(student_id=missing):
+                self.assertEqual(
+                    StudentService.delete_by_id(missing), {"success": False, "sms": "Student not found."},
+                )
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class BulkDeleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.program = Program.objects.create(name="Records Management", abbrev="BRAIM")
+        cls.students = Student.objects.bulk_create(
+            Student(fullname=f"Student {i}", regnumber=f"TPSD/{i:03d}", program=cls.program) for i in range(40)
+        )
+        counters.reconcile()
+
+    def setUp(self):
+        self.enterContext(mock.patch.object(bulk, "purge_in_background"))
+        self.touch = self.enterContext(mock.patch.object(changes, "touch", wraps=changes.touch))
+
+    def delete_students(self, students):
+        ids = ",".join(str(s.id) for s in students)
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            result = StudentService.delete_multiple({"students_list": ids})
+        return result, len(queries)
+
+    def test_selected_rows_are_deleted_as_a_set(self):
+        before = changes.stamp("students.Student")
+        _, few = self.delete_students(self.students[:2])
+        result, many = self.delete_students(self.students[2:40])
+
+        self.assertEqual(result, {"success": True, "sms": "38 students deleted successfully."})
+        self.assertEqual(many, few)
+        self.assertEqual(counters.read()["students"], 0)
+        # one stamp per delete, not one per row
+        self.assertEqual(self.touch.call_count, 2)
+        self.assertGreater(changes.stamp("students.Student"), before)
+
+    def test_references_are_stamped_with_the_deleted_table(self):
+        stamps = changes.stamps(["programs.Program", "students.Student", "courses.Course"])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(bulk.delete(Program, [self.program.id]), {"programs.Program": 1})
+
+        self.assertEqual(Student.objects.filter(program__isnull=True).count(), 40)
+        after = changes.stamps(stamps)
+        self.assertGreater(after["programs.Program"], stamps["programs.Program"])
+        self.assertGreater(after["students.Student"], stamps["students.Student"])
+        self.assertEqual(after["courses.Course"], stamps["courses.Course"])
+        self.touch.assert_called_once()
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.program = Program.objects.create(name="Records Management", abbrev="BRAIM")
+        Student.objects.bulk_create(Student(fullname=f"Student {i}", regnumber=f"TPSD/{i:03d}") for i in range(3))
+
+    def test_first_read_counts_the_tables(self):
+        DashboardCounters.objects.all().delete()
+        self.assertEqual(counters.read(), {"students": 3, "courses": 0, "programs": 1, "facilitators": 0})
+        with self.assertNumQueries(1):
+            counters.read()
+
+    def test_writes_keep_the_totals(self):
+        counters.reconcile()
+        student = Student.objects.create(fullname="Amina Juma", regnumber="TPSD/010", program=self.program)
+        Facilitator.objects.create(name="Madam Kadori")
+        bulk.save(Student, created=[Student(fullname=f"Imported {i}", regnumber=f"TPSD/1{i:02d}") for i in range(4)])
+        student.delete()
+        self.program.delete()
+
+        self.assertEqual(counters.read(), {"students": 7, "courses": 0, "programs": 0, "facilitators": 1})
+        self.assertEqual(counters.read(), counters.actual_counts())
+        self.assertEqual(counters.reconcile(), {})
+
+    def test_suspended_writes_are_not_counted(self):
+        counters.reconcile()
+        with counters.suspended():
+            Program.objects.create(name="Accounts", abbrev="BAC")
+        self.assertEqual(counters.read()["programs"], 1)
+
+        # reconcile puts the missed row back and reports what was off
+        self.assertEqual(counters.reconcile(), {"programs": -1})
+        self.assertEqual(counters.read()["programs"], 2)
+
+
+class ActivityBufferTests(TestCase):
+    def setUp(self):
+        self.buffer = activity.ActivityBuffer()
+
+    def queue(self, *titles):
+        for title in titles:
+            self.buffer.add(Activity(categ="student", title=title, maelezo="Queued in a test"))
+
+    def test_rows_are_queued_until_committed(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            activity.record(categ="student", title="Student added", maelezo="One student added")
+        self.assertEqual(len(callbacks), 1)
+        self.assertFalse(Activity.objects.exists())
+
+    def test_locked_database_requeues_the_batch(self):
+        self.queue("first", "second")
+        with mock.patch.object(Activity.objects, "bulk_create", side_effect=OperationalError("database is locked")), \
+                self.assertLogs("apps.dashboard.activity", "WARNING"):
+            self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(len(self.buffer), 2)
+
+        self.queue("third")
+        self.assertEqual(self.buffer.flush(), 3)
+        self.assertEqual(list(Activity.objects.order_by("id").values_list("title", flat=True)),
+                         ["first", "second", "third"])
+
+    def test_requeue_keeps_the_newest_rows(self):
+        self.queue("a", "b", "c", "d", "e")
+        with mock.patch.object(activity, "MAX_QUEUED_ROWS", 3), \
+                mock.patch.object(Activity.objects, "bulk_create", side_effect=OperationalError("database is locked")), \
+                self.assertLogs("apps.dashboard.activity", "WARNING") as logs:
+            self.buffer.flush()
+        self.assertEqual([row.title for row in self.buffer._rows], ["c", "d", "e"])
+        self.assertEqual(sum("Dropped activity row" in line for line in logs.output), 2)
+
+    def test_failed_batch_is_written_row_by_row(self):
+        self.queue("first", "second")
+        self.buffer.add(Activity(categ=None, title="broken", maelezo="Queued in a test"))
+        with self.assertLogs("apps.dashboard.activity", "WARNING") as logs:
+            self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(set(Activity.objects.values_list("title", flat=True)), {"first", "second"})
+        self.assertIn("'title': 'broken'", logs.output[-1])
+        self.assertEqual(len(self.buffer), 0)
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class ReferenceCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.braim = Program.objects.create(name="Records Management", abbrev="BRAIM")
+        cls.bac = Program.objects.create(name="Accounts", abbrev="BAC")
+
+    def setUp(self):
+        refdata._tables.clear()
+        self.addCleanup(refdata._tables.clear)
+
+    def test_lookups_are_served_from_the_loaded_table(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(refdata.id_for("programs", " braim "), self.braim.id)
+            self.assertEqual(refdata.ids_for("programs", ["Bac", "XYZ", None]), {"bac": self.bac.id})
+            self.assertTrue(refdata.exists("programs", "BAC"))
+            self.assertFalse(refdata.exists("programs", "BAC", exclude_id=self.bac.id))
+
+    def test_committed_changes_are_seen_at_once(self):
+        refdata.id_for("programs", "BRAIM")
+        with self.captureOnCommitCallbacks(execute=True):
+            diploma = Program.objects.create(name="Diploma in Records", abbrev="DRAIM")
+            self.bac.delete()
+        with self.assertNumQueries(1):
+            self.assertEqual(refdata.ids_for("programs", ["DRAIM", "BAC"]), {"draim": diploma.id})
+
+    def test_other_workers_changes_follow_the_stamp(self):
+        refdata.id_for("programs", "BRAIM")
+        # a write made elsewhere: no receiver in this process, only the shared stamp moves
+        Program.objects.filter(id=self.braim.id).update(abbrev="BRAIM-OLD")
+        with self.captureOnCommitCallbacks(execute=True):
+            changes.touch("programs.Program")
+
+        # served from memory until the stamp is checked again
+        self.assertEqual(refdata.id_for("programs", "BRAIM"), self.braim.id)
+        with mock.patch("apps.dashboard.refdata.VERSION_CHECK_SECONDS", 0):
+            self.assertIsNone(refdata.id_for("programs", "BRAIM"))
+            self.assertEqual(refdata.id_for("programs", "braim-old"), self.braim.id)
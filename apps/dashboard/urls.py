@@ -3,4 +3,5 @@ from . import views as v
 
 urlpatterns = [
     path('', v.dash_page, name='dashboard_page'),
+    path('metrics/pages/', v.page_metrics, name='page_metrics'),
 ]
\ No newline at end of file
@@ -1,13 +1,15 @@
 from django.shortcuts import render
 from django.views.decorators.cache import never_cache
 from django.contrib.auth.decorators import login_required
-from django.http import HttpRequest, HttpResponse
+from django.http import HttpRequest, HttpResponse, JsonResponse
 
-from .models import Activity
-from apps.students.models import Student
-from apps.courses.models import Course
-from apps.facilitators.models import Facilitator
-from apps.programs.models import Program
+from utils.db_router import reporting
+
+from .models import PageRollup
+from . import activity, counters, rollups
+
+# Default / largest number of buckets returned by page_metrics
+METRIC_BUCKETS = {"day": (30, 366), "week": (12, 104)}
 
 
 @never_cache
@@ -20,24 +22,51 @@ def dash_page(request: HttpRequest) -> HttpResponse:
         "program": ("black", "fas fa-graduation-cap"),
     }
     
-    recent_actions = Activity.objects.select_related().order_by("-created_at")[:5]
+    recent_actions = activity.recent(5)
     sorted_data = [
         {
-            "color": CATEGORY_STYLES.get(item.categ, ("blue", "fas fa-user-graduate"))[0],
-            "icon": CATEGORY_STYLES.get(item.categ, ("blue", "fas fa-user-graduate"))[1],
-            "title": item.title,
-            "info": item.maelezo,
-            "time": item.created_at,
+            "color": CATEGORY_STYLES.get(item["categ"], ("blue", "fas fa-user-graduate"))[0],
+            "icon": CATEGORY_STYLES.get(item["categ"], ("blue", "fas fa-user-graduate"))[1],
+            "title": item["title"],
+            "info": item["maelezo"],
+            "time": item["created_at"],
         }
         for item in recent_actions
     ]
     
+    totals = counters.read()
     context = {
         "recentActions": sorted_data,
-        "students": f"{Student.objects.count():,.0f}",
-        "courses": f"{Course.objects.count():,.0f}",
-        "programs": f"{Program.objects.count():,.0f}",
-        "facilitators": f"{Facilitator.objects.count():,.0f}",
+        "students": f"{totals['students']:,.0f}",
+        "courses": f"{totals['courses']:,.0f}",
+        "programs": f"{totals['programs']:,.0f}",
+        "facilitators": f"{totals['facilitators']:,.0f}",
     }
     
-    return render(request, "dashboard/home.html", context)
\ No newline at end of file
+    return render(request, "dashboard/home.html", context)
+
+
+@never_cache
+@login_required
+def page_metrics(request: HttpRequest) -> JsonResponse:
+    """
+    Cover pages created per day or week, overall or per program / course /
+    facilitator, read from the PageRollup table (never from Page itself).
+    GET params: period=day|week, dimension=total|program|course|facilitator,
+    buckets=<number of days/weeks>, limit=<number of series>.
+    """
+    period = request.GET.get("period", "day")
+    dimension = request.GET.get("dimension", "total")
+    if period not in dict(PageRollup.PERIOD_CHOICES) or dimension not in dict(PageRollup.DIMENSION_CHOICES):
+        return JsonResponse({"success": False, "sms": "Unknown period or dimension."}, status=400)
+
+    default, maximum = METRIC_BUCKETS[period]
+    try:
+        buckets = min(max(int(request.GET.get("buckets", default)), 1), maximum)
+        limit = min(max(int(request.GET.get("limit", 10)), 1), 50)
+    except ValueError:
+        return JsonResponse({"success": False, "sms": "Invalid buckets or limit."}, status=400)
+
+    with reporting():
+        data = rollups.series(period, dimension, buckets, limit)
+    return JsonResponse({"success": True, **data})
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-17 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facilitators', '0003_alter_facilitator_comment_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='facilitator',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, db_index=True, default=None, null=True, verbose_name='Deleted At'),
+        ),
+    ]
@@ -1,11 +1,18 @@
 from django.db import models
 
+from utils.softdelete import LiveManager
+
 
 class Facilitator(models.Model):
     id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=255, verbose_name="Facilitator Name", db_index=True)
     comment = models.TextField(blank=True, null=True, default=None, verbose_name="Comments")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Created At", db_index=True)
+    # set when the row is deleted; the purger removes it later (utils/softdelete.py)
+    deleted_at = models.DateTimeField(null=True, blank=True, default=None, db_index=True, verbose_name="Deleted At")
+
+    objects = LiveManager()
+    all_objects = models.Manager()
 
     class Meta:
         verbose_name = "Facilitator"
@@ -1,3 +1,49 @@
-from django.test import TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory, TestCase
 
-# Create your tests here.
+from apps.courses.models import Course
+from apps.imports.views import ImportJobService
+from utils.datatables import DataTableProcessor
+
+from .models import Facilitator
+from .views import FACILITATORS_TABLE, FacilitatorService
+
+
+class FacilitatorsTableTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for name, courses in (("Asha", 0), ("Baraka", 1), ("Chausiku", 3)):
+            facilitator = Facilitator.objects.create(name=name)
+            for i in range(courses):
+                Course.objects.create(name=f"{name} course {i}", code=f"{name[:3].upper()}{i:03d}", facilitator=facilitator)
+
+    def names(self, **params):
+        data = {"draw": "1", "start": "0", "length": "10", "order[0][column]": "3", "order[0][dir]": "desc"}
+        data.update(params)
+        request = RequestFactory().post("/facilitators/", data)
+        return [row["name"] for row in DataTableProcessor.process_request(request, FACILITATORS_TABLE)["data"]]
+
+    def test_numeric_column_sorts_by_number(self):
+        self.assertEqual(self.names(), ["Chausiku", "Baraka", "Asha"])
+
+    def test_numeric_column_filters(self):
+        for value, expected in (("1-", ["Chausiku", "Baraka"]), ("-1", ["Baraka", "Asha"]), ("3", ["Chausiku"]),
+                                ("abc", ["Chausiku", "Baraka", "Asha"])):
+            with self.subTest(value=value):
+                self.assertEqual(self.names(**{"columns[3][search][value]": value}), expected)
+
+
+class FacilitatorsImportTests(TestCase):
+    def test_blank_comment_keeps_the_existing_one(self):
+        Facilitator.objects.create(name="Madam Kadori", comment="Typing and records")
+        content = "Name,Description\nmadam kadori,\nMr Juma,Accounts\nMr,\n"
+        source = ImportJobService.open_source(SimpleUploadedFile("facilitators.csv", content.encode()))
+        self.addCleanup(source.close)
+
+        result = FacilitatorService.import_from_excel(source, update_existing=True)
+
+        self.assertEqual(result["diff"], {"inserted": 1, "updated": 0, "unchanged": 1, "failed": 1})
+        self.assertEqual(
+            dict(Facilitator.objects.values_list("name", "comment")),
+            {"Madam Kadori": "Typing and records", "Mr Juma": "Accounts"},
+        )
@@ -4,4 +4,5 @@ from . import views as v
 urlpatterns = [
     path('', v.facilitators_page, name='facilitators_page'),
     path('actions/', v.facilitators_actions, name="facilitators_actions"),
+    path('export/', v.facilitators_export, name="facilitators_export"),
 ]
@@ -5,127 +5,52 @@ from django.shortcuts import render
 from django.views.decorators.cache import never_cache
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse, HttpRequest, HttpResponse
-from django.db.models import QuerySet, Q, Count
-from django.db.models.functions import Lower
-
-import os
-import openpyxl
-from django.conf import settings
-from django.core.files.storage import FileSystemStorage
+from django.db.models import Count
 from django.db import transaction
-from datetime import datetime
 
 from .models import Facilitator
-from apps.dashboard.models import Activity
+from apps.dashboard import activity, bulk
+from apps.imports.merge import ImportDiff, ImportSpec, ParsedChunk, merge_chunk
+from apps.imports.preview import parsed_chunks
+from apps.imports.views import ImportJobService
+from utils.datatables import Column, DataTableExporter, DataTableProcessor, TableSpec
+from utils.excel_import import ImportSource, ProgressCallback, Row, cell_text, import_result, import_stopped
+from utils.softdelete import is_live
 
 logger = logging.getLogger(__name__)
 
 
 # =============================================================================
-# Database utilities
+# DataTable specification
 # =============================================================================
 
-def build_column_filter(
-    field_path: str, search_value: str, filter_kind: str = "contains"
-) -> Optional[Q]:
-    value = (search_value or "").strip()
-    if not value:
-        return None
-
-    if value.lower() == "n/a":
-        return Q(**{f"{field_path}__isnull": True})
-
-    if filter_kind == "exact":
-        try:
-            return Q(**{field_path: value})
-        except (ValueError, TypeError):
-            return None
-
-    elif filter_kind == "numeric":
-        cleaned = value.replace(",", "")
-        try:
-            if cleaned.startswith("-") and not cleaned.endswith("-"):
-                max_val = float(cleaned[1:])
-                return Q(**{f"{field_path}__lte": max_val})
-            elif cleaned.endswith("-") and not cleaned.startswith("-"):
-                min_val = float(cleaned[:-1])
-                return Q(**{f"{field_path}__gte": min_val})
-            else:
-                exact_val = float(cleaned)
-                return Q(**{field_path: exact_val})
-        except (ValueError, TypeError):
-            return None
-
-    return Q(**{f"{field_path}__icontains": value})
-
-
-class DataTableProcessor:
-    @staticmethod
-    def process_request(
-        request: HttpRequest,
-        queryset: QuerySet,
-        global_search_fields: List[str],
-        column_filter_fields: Dict[int, str],
-        column_filter_types: Dict[str, str],
-        column_sort_fields: Optional[Dict[int, str]] = None,
-    ) -> Dict[str, Any]:
-        if column_sort_fields is None:
-            column_sort_fields = column_filter_fields
-
-        total_records = queryset.count()
-
-        draw = int(request.POST.get("draw", 1))
-        start = int(request.POST.get("start", 0))
-        length = int(request.POST.get("length", 10))
-        global_search = (request.POST.get("search[value]", "") or "").strip()
-
-        filtered_qs = queryset
-
-        if global_search:
-            q_global = Q()
-            for field in global_search_fields:
-                q_global |= Q(**{f"{field}__icontains": global_search})
-            filtered_qs = filtered_qs.filter(q_global)
-
-        # Column-specific filters (robust: iterate over defined columns)
-        for col_index, field_path in column_filter_fields.items():
-            search_val = (request.POST.get(f"columns[{col_index}][search][value]", "") or "").strip()
-            if search_val:
-                filter_kind = column_filter_types.get(field_path, "contains")
-                q_filter = build_column_filter(field_path, search_val, filter_kind)
-                if q_filter:
-                    filtered_qs = filtered_qs.filter(q_filter)
-
-        filtered_count = filtered_qs.count()
-
-        # Sorting
-        order_idx = int(request.POST.get("order[0][column]", 1))
-        order_dir = request.POST.get("order[0][dir]", "asc")
-        sort_field = column_sort_fields.get(order_idx, "name")
-
-        numeric_fields = {"id", "courses_count"}
-        if sort_field in numeric_fields:
-            order_expr = f"-{sort_field}" if order_dir == "desc" else sort_field
-        else:
-            order_expr = Lower(sort_field).desc() if order_dir == "desc" else Lower(sort_field).asc()
-
-        filtered_qs = filtered_qs.order_by(order_expr)
-
-        paged_data = filtered_qs[start : start + length] if length > 0 else filtered_qs
-
-        if length < 0:
-            Activity.objects.create(
-                categ="facilitator",
-                title="Facilitators data exported",
-                maelezo="All facilitators table data has been exported"
-                )
-
-        return {
-            "draw": draw,
-            "recordsTotal": total_records,
-            "recordsFiltered": filtered_count,
-            "data": paged_data,
-        }
+def _facilitator_row(obj: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": obj["id"],
+        "name": obj["name"],
+        "courses": obj["courses_count"],
+        "comment": obj["comment"] or "N/A",
+        "action": "",
+    }
+
+
+FACILITATORS_TABLE = TableSpec(
+    label="facilitators",
+    categ="facilitator",
+    queryset=lambda: Facilitator.objects.annotate(courses_count=Count("course", filter=is_live("course"))),
+    columns=(
+        Column(2, "name"),
+        Column(3, "courses_count", filter_kind="numeric"),
+        Column(4, "comment", null_field="comment"),
+    ),
+    global_search_fields=("name", "comment"),
+    values=("id", "name", "courses_count", "comment"),
+    row=_facilitator_row,
+    numeric_sort_fields=("id", "courses_count"),
+    fulltext=(("facilitator", "id"),),
+    export_columns=(("FullName", "name"), ("Courses", "courses"), ("Comment", "comment")),
+    depends_on=("facilitators.Facilitator", "courses.Course"),
+)
 
 
 # =============================================================================
@@ -147,7 +72,7 @@ class FacilitatorService:
                 return {"success": False, "sms": "Facilitator with this name already exists."}
 
             Facilitator.objects.create(name=name, comment=comment)
-            Activity.objects.create(
+            activity.record(
                 categ="facilitator",
                 title="New facilitator added",
                 maelezo="New facilitator has been registered successfully"
@@ -175,7 +100,7 @@ class FacilitatorService:
             facilitator.comment = comment
             facilitator.save()
 
-            Activity.objects.create(
+            activity.record(
                 categ="facilitator",
                 title="Facilitator updated",
                 maelezo="Facilitator information has been updated"
@@ -190,8 +115,9 @@ class FacilitatorService:
     @staticmethod
     def delete_by_id(facilitator_id: int) -> Dict[str, Any]:
         try:
-            Facilitator.objects.filter(id=facilitator_id).delete()
-            Activity.objects.create(
+            if not bulk.tombstone(Facilitator, [facilitator_id]):
+                return {"success": False, "sms": "Facilitator not found."}
+            activity.record(
                 categ="facilitator",
                 title="Facilitator deleted",
                 maelezo="One facilitator has been removed from system"
@@ -202,90 +128,113 @@ class FacilitatorService:
             return {"success": False, "sms": "Operation failed."}
         
     @staticmethod
-    def import_from_excel(filepath: str) -> Dict[str, Any]:
-        created_count = 0
+    def import_from_excel(source: Optional[ImportSource], progress: Optional[ProgressCallback] = None,
+                          update_existing: bool = False, preview_token: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Import an upload, or the parsed rows of a checked preview when
+        ``preview_token`` is given, merging each chunk by name
+        (apps.imports.merge).
+        """
+        processed = 0
         failed = []
+        diff = ImportDiff()
+        # lowercased names of earlier rows, to report the ones repeated in the file
+        seen = set()
         try:
-            if not filepath.lower().endswith(('.xlsx', '.xls')):
-                return {"success": False, "sms": "Only Excel files (.xlsx, .xls) are accepted."}
-
-            wb = openpyxl.load_workbook(filepath, read_only=True, data_only=True)
-            sheet = wb.active
-
-            with transaction.atomic():
-                for row_num, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
-                    name = str(row[0] or '').strip() if len(row) > 0 else ''
-                    comment = str(row[1]).strip() if len(row) > 1 and row[1] else None
-
-                    if len(name) < 3:
-                        failed.append({'row': row_num, 'reason': 'Name is too short.'})
-                        continue
-                    elif Facilitator.objects.filter(name__iexact=name).exists():
-                        failed.append({'row': row_num, 'reason': 'Name already exists.'})
-                        continue
-
-                    Facilitator.objects.create(name=name, comment=comment)
-                    created_count += 1
-
-            wb.close()
-
-            sms = f'Imported {created_count} facilitator(s) successfully.'
-            if failed:
-                sms += '<br>'
-                sms += 'Failed facilitators:<br>' + '<br>'.join([
-                    f'Row {f["row"]}: {f["reason"]}'
-                    for f in failed
-                ])
-
-            success = created_count > 0 and len(failed) == 0
-            
-            if created_count > 0:
-                Activity.objects.create(
-                    categ="facilitator",
-                    title="Multiple facilitators added",
-                    maelezo=f"{created_count} facilitators has been registered from excel sheet"
-                    )
-                
-            return {'success': success, 'sms': sms}
+            for parsed in parsed_chunks(FACILITATORS_IMPORT, source, preview_token):
+                failed.extend(parsed.failed)
+                with transaction.atomic():
+                    merge_chunk(Facilitator, "name", "Name", parsed.rows, seen, failed, diff, update_existing)
+                processed += parsed.size
+                if progress:
+                    progress(processed, len(failed))
+
+            result = import_result(
+                "facilitator", diff.inserted, failed,
+                updated_count=diff.updated if update_existing else None, unchanged_count=diff.unchanged,
+            )
 
         except Exception as e:
             logger.exception("Facilitators import failed")
-            return {'success': False, 'sms': f'Error processing file: {str(e)}'}
+            result = import_stopped(
+                "facilitator", e, processed + 2, diff.inserted, failed,
+                updated_count=diff.updated if update_existing else None, unchanged_count=diff.unchanged,
+            )
+
+        # rows of committed chunks stay saved even when a later chunk fails
+        if diff.inserted > 0:
+            activity.record(
+                categ="facilitator",
+                title="Multiple facilitators added",
+                maelezo=f"{diff.inserted} facilitators has been registered from excel sheet"
+                )
+        if diff.updated > 0:
+            activity.record(
+                categ="facilitator",
+                title="Multiple facilitators updated",
+                maelezo=f"{diff.updated} facilitators has been updated from excel sheet"
+                )
+
+        return result
+
+    @staticmethod
+    def parse_chunk(chunk: List[Row]) -> ParsedChunk:
+        """
+        Row checks for one chunk of spreadsheet rows, shared by the import
+        and its preview. A blank comment cell leaves comment out: new
+        facilitators get none, existing ones keep theirs.
+        """
+        parsed = ParsedChunk(size=len(chunk))
+        for row_num, row in chunk:
+            name = cell_text(row, 0)
+            comment = cell_text(row, 1)
+
+            if len(name) < 3:
+                parsed.failed.append({'row': row_num, 'reason': 'Name is too short.'})
+                continue
+
+            parsed.rows.append((row_num, name, {"comment": comment} if comment else {}))
+        return parsed
 
     @staticmethod
     def delete_multiple(data: Dict[str, Any]) -> Dict[str, Any]:
         try:
             facils = data.get("facilitators_list", "")
-            facilitators_list = [int(x) for x in facils.split(",") if x.strip()]
+            facilitators_list = [int(x) for x in facils.split(",") if x.strip().isdigit()]
             delete_type = data.get("delete_type")
             
             if delete_type == "all":
-                get_all = Facilitator.objects.all()
-                if len(get_all) == 0:
+                if not Facilitator.objects.exists():
                     return {"success": False, "sms": "No facilitators available to delete."}
                 
-                get_all.delete()
-                Activity.objects.create(
+                deleted = bulk.tombstone(Facilitator)
+                activity.record(
                     categ="facilitator", title="All facilitators deleted",
                     maelezo="All facilitators have been erased from system"
                     )
-                return {"success": True, "sms": "All facilitators deleted successfully."}
+                return {"success": True, "sms": f"All {deleted} facilitators deleted successfully."}
             
-            for facil in facilitators_list:
-                Facilitator.objects.filter(id=facil).delete()
+            deleted = bulk.tombstone(Facilitator, facilitators_list) if facilitators_list else 0
+            if not deleted:
+                return {"success": False, "sms": "No facilitators were deleted."}
 
-            Activity.objects.create(
+            activity.record(
                 categ="facilitator", title="Multiple facilitators deleted",
-                maelezo=f"{len(facilitators_list)} facilitators have been deleted from system"
+                maelezo=f"{deleted} facilitators have been deleted from system"
                 )
-            
-            return {"success": True, "sms": f"{len(facilitators_list)} facilitators deleted successfully."}
+            return {"success": True, "sms": f"{deleted} facilitators deleted successfully."}
                 
         except Exception as e:
             logger.exception("Facilitator delete failed")
             return {"success": False, "sms": "Operation failed."}
         
 
+FACILITATORS_IMPORT = ImportSpec(
+    kind="facilitators", model=Facilitator, key_field="name", key_label="Name",
+    parse=FacilitatorService.parse_chunk,
+)
+
+
 # =============================================================================
 # Views
 # =============================================================================
@@ -294,52 +243,19 @@ class FacilitatorService:
 @login_required
 def facilitators_page(request: HttpRequest) -> HttpResponse:
     if request.method == "POST" and request.headers.get("X-Requested-With") == "XMLHttpRequest":
-        qs = Facilitator.objects.annotate(courses_count=Count("course")).all()
-
-        column_filter_fields = {
-            2: "name",
-            3: "courses_count",
-            4: "comment",
-        }
-        column_sort_fields = column_filter_fields.copy()
-        column_filter_types = {
-            "courses_count": "numeric",
-        }
-
-        result = DataTableProcessor.process_request(
-            request=request,
-            queryset=qs,
-            global_search_fields=["name", "comment"],
-            column_filter_fields=column_filter_fields,
-            column_filter_types=column_filter_types,
-            column_sort_fields=column_sort_fields,
-        )
-
-        start_idx = int(request.POST.get("start", 0))
-        rows = [
-            {
-                "count": start_idx + i + 1,
-                "id": obj.id,
-                "name": obj.name,
-                "courses": obj.courses_count,
-                "comment": obj.comment or "N/A",
-                "action": "",
-            }
-            for i, obj in enumerate(result["data"])
-        ]
-
-        return JsonResponse(
-            {
-                "draw": result["draw"],
-                "recordsTotal": result["recordsTotal"],
-                "recordsFiltered": result["recordsFiltered"],
-                "data": rows,
-            }
-        )
+        return DataTableProcessor.respond(request, FACILITATORS_TABLE)
 
     return render(request, "facilitators/facilitators.html")
 
 
+@never_cache
+@login_required
+def facilitators_export(request: HttpRequest) -> HttpResponse:
+    if request.method != "POST":
+        return JsonResponse({"success": False, "sms": "Invalid request"})
+    return DataTableExporter.export(request, FACILITATORS_TABLE)
+
+
 @never_cache
 @login_required
 def facilitators_actions(request: HttpRequest) -> JsonResponse:
@@ -347,27 +263,17 @@ def facilitators_actions(request: HttpRequest) -> JsonResponse:
         return JsonResponse({"success": False, "sms": "Invalid request"})
     
     if 'excel_file' in request.FILES:
-        uploaded_file = request.FILES['excel_file']
-        now = datetime.now().strftime("%Y-%m-%d_%H%M%S")
-        original_ext = os.path.splitext(uploaded_file.name)[1].lower()
-        new_filename = f"{now}facilitators{original_ext}"
-        fs = FileSystemStorage(location=os.path.join(settings.MEDIA_ROOT, 'tmp'))
-        
-        # Save with new name
-        filepath = fs.path(fs.save(new_filename, uploaded_file))
-        
-        try:
-            result = FacilitatorService.import_from_excel(filepath)
-            return JsonResponse(result)
-        finally:
-            if os.path.exists(filepath):
-                try:
-                    os.remove(filepath)
-                except (PermissionError, OSError):
-                    # Silently ignore
-                    pass
-                except Exception as e:
-                    logger.warning(f"Could not delete temp file {filepath}: {e}")
+        update_existing = request.POST.get("import_mode") == "upsert"
+        if request.POST.get("dry_run") == "true":
+            return JsonResponse(ImportJobService.dry_run(request.FILES['excel_file'], FACILITATORS_IMPORT, update_existing))
+        return JsonResponse(ImportJobService.start(
+            "facilitators", request.FILES['excel_file'], FacilitatorService.import_from_excel,
+            update_existing=update_existing,
+        ))
+    if request.POST.get("preview_token"):
+        return JsonResponse(ImportJobService.start_preview(
+            "facilitators", request.POST["preview_token"], FacilitatorService.import_from_excel,
+        ))
 
     post_data = request.POST
     fac_id = post_data.get("facilitator_id")
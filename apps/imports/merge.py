@@ -0,0 +1,132 @@
+"""
+Key-matched import of one chunk of rows.
+
+Each parsed row carries its key (regnumber, course code, program abbrev,
+facilitator name) and the field values it sets. One query loads the live
+rows with those keys (case-insensitively); the chunk is then split into
+inserts, updates and unchanged rows and written through bulk.save(), so a
+chunk costs the same three queries however many rows already exist.
+
+Without ``update_existing`` a row whose key exists is reported as a
+failure, as imports always did; with it the fields the row carries are
+overwritten. Fields left out of a row's values (e.g. a foreign key whose
+cell did not resolve) keep their current value.
+plan_chunk() makes the same split without writing, for import previews
+(preview.py).
+"""
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Type
+
+from django.db import models
+from django.db.models.functions import Lower
+
+from apps.dashboard import bulk
+from utils.excel_import import Row
+
+# (row number, key, {field: value})
+ParsedRow = Tuple[int, str, Dict[str, Any]]
+
+
+@dataclass
+class ParsedChunk:
+    """
+    One chunk of sheet rows after a service's row checks: ``rows`` passed
+    them, ``failed`` did not, and ``warnings`` flags accepted rows with a
+    reference that did not resolve (e.g. an unknown program abbrev).
+    ``size`` is the number of sheet rows the chunk covered.
+    """
+    size: int
+    rows: List[ParsedRow] = field(default_factory=list)
+    failed: List[Dict[str, Any]] = field(default_factory=list)
+    warnings: List[Dict[str, Any]] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class ImportSpec:
+    """
+    How a table is imported: its key and the service's row checks, which
+    turn a chunk of sheet rows into a ParsedChunk. ``warning`` names the
+    preview count of rows flagged in ParsedChunk.warnings, for tables whose
+    row checks flag any.
+    """
+    kind: str
+    model: Type[models.Model]
+    key_field: str
+    key_label: str
+    parse: Callable[[List[Row]], ParsedChunk]
+    warning: Optional[str] = None
+
+
+@dataclass
+class ImportDiff:
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+
+
+@dataclass
+class ChunkPlan:
+    """What merging a chunk would do, as (row number, instance) pairs."""
+    created: List[Tuple[int, models.Model]] = field(default_factory=list)
+    updated: List[Tuple[int, models.Model]] = field(default_factory=list)
+    unchanged: List[int] = field(default_factory=list)
+    duplicates: List[Dict[str, Any]] = field(default_factory=list)
+    fields: Set[str] = field(default_factory=set)
+
+
+def plan_chunk(model: Type[models.Model], key_field: str, key_label: str, rows: List[ParsedRow],
+               seen: Set[str], update_existing: bool = False) -> ChunkPlan:
+    """
+    Split ``rows`` into inserts, updates, unchanged rows and duplicates with
+    one query and no writes. ``seen`` carries the (lowercased) keys of
+    earlier chunks, so a key repeated in the file is reported instead of
+    applied twice.
+    """
+    keys = {key.lower() for _, key, _ in rows}
+    existing: Dict[str, models.Model] = {}
+    if keys:
+        matches = (model.objects.annotate(key_lower=Lower(key_field))
+                   .filter(key_lower__in=keys).order_by("id"))
+        for obj in matches:
+            existing.setdefault(obj.key_lower, obj)
+
+    plan = ChunkPlan()
+    for row_num, key, values in rows:
+        lowered = key.lower()
+        if lowered in seen:
+            reason = f'{key_label} is repeated in the file.' if update_existing else f'{key_label} already exists.'
+            plan.duplicates.append({'row': row_num, 'reason': reason})
+            continue
+        seen.add(lowered)
+
+        obj = existing.get(lowered)
+        if obj is None:
+            plan.created.append((row_num, model(**{key_field: key}, **values)))
+            continue
+        if not update_existing:
+            plan.duplicates.append({'row': row_num, 'reason': f'{key_label} already exists.'})
+            continue
+
+        changed = [name for name, value in values.items() if getattr(obj, name) != value]
+        if not changed:
+            plan.unchanged.append(row_num)
+            continue
+        for name in changed:
+            setattr(obj, name, values[name])
+        plan.fields.update(changed)
+        plan.updated.append((row_num, obj))
+    return plan
+
+
+def merge_chunk(model: Type[models.Model], key_field: str, key_label: str, rows: List[ParsedRow],
+                seen: Set[str], failed: List[Dict[str, Any]], diff: ImportDiff,
+                update_existing: bool = False) -> None:
+    """Insert, update or skip ``rows`` (see plan_chunk) and count them in ``diff``."""
+    plan = plan_chunk(model, key_field, key_label, rows, seen, update_existing)
+    failed.extend(plan.duplicates)
+    bulk.save(
+        model, [obj for _, obj in plan.created], [obj for _, obj in plan.updated], sorted(plan.fields),
+    )
+    diff.inserted += len(plan.created)
+    diff.updated += len(plan.updated)
+    diff.unchanged += len(plan.unchanged)
@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-17 15:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imports', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='importjob',
+            name='filepath',
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.db import models
+
+
+# background import job (Excel or CSV upload)
+class ImportJob(models.Model):
+    STATUS_CHOICES = [
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ]
+
+    id = models.AutoField(primary_key=True)
+    kind = models.CharField(max_length=50, verbose_name="Data Type")
+    filename = models.CharField(max_length=255, verbose_name="File Name")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="queued", db_index=True)
+    total_rows = models.PositiveIntegerField(null=True, default=None)
+    rows_processed = models.PositiveIntegerField(default=0)
+    rows_failed = models.PositiveIntegerField(default=0)
+    result = models.JSONField(null=True, default=None)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    started_at = models.DateTimeField(null=True, default=None)
+    finished_at = models.DateTimeField(null=True, default=None)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Import Job"
+        verbose_name_plural = "Import Jobs"
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.kind} import #{self.id}"
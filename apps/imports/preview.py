@@ -0,0 +1,205 @@
+"""
+Dry-run imports.
+
+build() reads an upload once, runs each chunk through the table's row
+checks and merge.plan_chunk() without writing, and appends every chunk
+(the parsed rows and a per-row outcome) to a file named after a token
+(IMPORT_PREVIEW_DIR, default MEDIA_ROOT/cache/imports). Only one chunk is
+held in memory at a time, whatever the file size. The cache backend keeps
+the summary and each chunk's offset in the file; page() then reads the
+preview back a page at a time, from any worker on the machine.
+
+Committing a preview feeds the stored parsed rows to the importer
+(parsed_chunks()) instead of reading the file again. Existing keys are
+still checked against the database then, since they may have changed.
+"""
+import logging
+import os
+import pickle
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from utils.excel_import import IMPORT_CHUNK_SIZE, ImportSource, Row, cell_text, iter_sheet_chunks
+
+from .merge import ChunkPlan, ImportSpec, ParsedChunk, plan_chunk
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_KEY = "imports:preview:{token}"
+
+PREVIEW_PAGE_SIZE = 50
+
+# Sheet cells shown per preview row
+PREVIEW_CELLS = 5
+
+STATUSES = ("insert", "update", "unchanged", "duplicate", "invalid")
+
+
+class PreviewExpired(Exception):
+    """The stored preview is gone (expired or evicted); the file has to be checked again."""
+
+
+def _ttl() -> int:
+    return getattr(settings, "IMPORT_PREVIEW_TTL", 1800)
+
+
+def directory() -> Path:
+    return Path(getattr(settings, "IMPORT_PREVIEW_DIR", Path(settings.MEDIA_ROOT) / "cache" / "imports"))
+
+
+def _path(token: str) -> Path:
+    # tokens come back from the client: only uuid4().hex names are accepted
+    if not re.fullmatch(r"[0-9a-f]{32}", token):
+        raise PreviewExpired("The file check has expired, please check the file again.")
+    return directory() / f"{token}.preview"
+
+
+def _prune() -> None:
+    """Remove preview files whose cache entry has expired."""
+    cutoff = time.time() - _ttl()
+    for path in directory().glob("*.preview"):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink(missing_ok=True)
+        except OSError:
+            pass
+
+
+def _outcomes(chunk: List[Row], parsed: ParsedChunk, plan: ChunkPlan) -> List[Dict[str, Any]]:
+    """One {'row', 'status', 'reason', 'warning', 'cells'} entry per sheet row of the chunk."""
+    status: Dict[int, Tuple[str, str]] = {}
+    for failure in parsed.failed:
+        status[failure['row']] = ("invalid", failure['reason'])
+    for failure in plan.duplicates:
+        status[failure['row']] = ("duplicate", failure['reason'])
+    for row_num, _ in plan.created:
+        status[row_num] = ("insert", "")
+    for row_num, _ in plan.updated:
+        status[row_num] = ("update", "")
+    for row_num in plan.unchanged:
+        status[row_num] = ("unchanged", "")
+    warnings = {warning['row']: warning['reason'] for warning in parsed.warnings}
+
+    return [
+        {
+            "row": row_num,
+            "status": status[row_num][0],
+            "reason": status[row_num][1],
+            "warning": warnings.get(row_num, ""),
+            "cells": [cell_text(row, i) for i in range(min(len(row), PREVIEW_CELLS))],
+        }
+        for row_num, row in chunk
+    ]
+
+
+def build(spec: ImportSpec, source: ImportSource, update_existing: bool = False) -> Dict[str, Any]:
+    """Check a whole upload without writing; returns the preview summary (see load())."""
+    token = uuid.uuid4().hex
+    counts = dict.fromkeys(STATUSES, 0)
+    if spec.warning:
+        counts[spec.warning] = 0
+    seen: set = set()
+    total_rows = 0
+    offsets: List[int] = []
+
+    _prune()
+    path = _path(token)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp, "wb") as f:
+            for chunk in iter_sheet_chunks(source, IMPORT_CHUNK_SIZE):
+                parsed = spec.parse(chunk)
+                plan = plan_chunk(spec.model, spec.key_field, spec.key_label, parsed.rows, seen, update_existing)
+                rows = _outcomes(chunk, parsed, plan)
+                for outcome in rows:
+                    counts[outcome["status"]] += 1
+                if spec.warning:
+                    counts[spec.warning] += len(parsed.warnings)
+
+                offsets.append(f.tell())
+                pickle.dump({"parsed": parsed, "rows": rows}, f, pickle.HIGHEST_PROTOCOL)
+                total_rows += parsed.size
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+    meta = {
+        "token": token, "kind": spec.kind, "filename": source.name,
+        "update_existing": update_existing, "total_rows": total_rows,
+        "chunks": len(offsets), "offsets": offsets, "chunk_size": IMPORT_CHUNK_SIZE, "counts": counts,
+    }
+    cache.set(PREVIEW_KEY.format(token=token), meta, _ttl())
+    return meta
+
+
+def load(token: str) -> Optional[Dict[str, Any]]:
+    """Summary of a preview: kind, filename, update_existing, total_rows, counts, ..."""
+    return cache.get(PREVIEW_KEY.format(token=token))
+
+
+def _open(token: str) -> BinaryIO:
+    try:
+        return open(_path(token), "rb")
+    except FileNotFoundError:
+        raise PreviewExpired("The file check has expired, please check the file again.") from None
+
+
+def _chunk(f: BinaryIO, meta: Dict[str, Any], index: int) -> Dict[str, Any]:
+    f.seek(meta["offsets"][index])
+    return pickle.load(f)
+
+
+def page(token: str, number: int = 1, per_page: int = PREVIEW_PAGE_SIZE) -> Optional[Dict[str, Any]]:
+    """Per-row outcomes of one preview page, read from the chunks it spans."""
+    meta = load(token)
+    if meta is None:
+        return None
+    pages = max((meta["total_rows"] + per_page - 1) // per_page, 1)
+    number = min(max(number, 1), pages)
+    start = (number - 1) * per_page
+    stop = min(start + per_page, meta["total_rows"])
+
+    rows: List[Dict[str, Any]] = []
+    size = meta["chunk_size"]
+    if stop > start:
+        with _open(token) as f:
+            for index in range(start // size, (stop - 1) // size + 1):
+                offset = index * size
+                rows.extend(_chunk(f, meta, index)["rows"][max(start - offset, 0):stop - offset])
+    return {"rows": rows, "page": number, "pages": pages, "per_page": per_page}
+
+
+def discard(token: str) -> None:
+    cache.delete(PREVIEW_KEY.format(token=token))
+    try:
+        _path(token).unlink(missing_ok=True)
+    except (OSError, PreviewExpired) as e:
+        logger.warning(f"Could not remove import preview {token}: {e}")
+
+
+def parsed_chunks(spec: ImportSpec, source: Optional[ImportSource],
+                  preview_token: Optional[str] = None) -> Iterator[ParsedChunk]:
+    """
+    Parsed chunks for an import: those of a checked preview (discarded once
+    read to the end), or parsed from the upload.
+    """
+    if not preview_token:
+        for chunk in iter_sheet_chunks(source):
+            yield spec.parse(chunk)
+        return
+
+    meta = load(preview_token)
+    if meta is None:
+        raise PreviewExpired("The file check has expired, please check the file again.")
+    with _open(preview_token) as f:
+        for index in range(meta["chunks"]):
+            yield _chunk(f, meta, index)["parsed"]
+    discard(preview_token)
@@ -0,0 +1,210 @@
+import io
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+import openpyxl
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from apps.programs.models import Program
+from apps.students.models import Student
+from apps.students.views import STUDENTS_IMPORT, StudentService
+from utils.excel_import import ImportSource, UploadRejected, iter_sheet_chunks, open_upload
+
+from . import preview
+from .views import ImportJobService
+
+HEADER = "Full Name,Regnumber,Program\n"
+
+
+def upload(rows, name="students.csv"):
+    """A CSV upload of the students import sheet."""
+    return SimpleUploadedFile(name, (HEADER + "".join(f"{row}\n" for row in rows)).encode())
+
+
+def workbook(rows, name="students.xlsx"):
+    """An .xlsx upload with a header row and ``rows``."""
+    wb = openpyxl.Workbook()
+    wb.active.append(["Full Name", "Regnumber", "Program"])
+    for row in rows:
+        wb.active.append(row)
+    data = io.BytesIO()
+    wb.save(data)
+    return SimpleUploadedFile(name, data.getvalue())
+
+
+class UploadLimitTests(SimpleTestCase):
+    def open(self, uploaded_file, max_bytes=1024 * 1024, max_rows=100):
+        source = open_upload(uploaded_file, max_bytes=max_bytes, max_rows=max_rows)
+        self.addCleanup(source.close)
+        return source
+
+    def rows(self, source, chunk_size=2):
+        return [[(row_num, list(row)) for row_num, row in chunk] for chunk in iter_sheet_chunks(source, chunk_size)]
+
+    def test_rejected_uploads(self):
+        cases = (
+            (SimpleUploadedFile("students.xls", b"\xd0\xcf\x11\xe0"), {}, "Only Excel (.xlsx) or CSV (.csv)"),
+            (SimpleUploadedFile("students.xlsx", b"not a zip file"), {}, "not a valid Excel workbook"),
+            (upload(["Amina Juma,TPSD/001,"] * 3), {"max_rows": 2}, "The file has 3 rows, the limit is 2."),
+            (workbook([["Amina Juma", "TPSD/001"]] * 3), {"max_rows": 2}, "The file has 3 rows, the limit is 2."),
+            (upload(["Amina Juma,TPSD/001,"]), {"max_bytes": 10}, "The file is too large, the limit is 10"),
+        )
+        for uploaded_file, limits, message in cases:
+            with self.subTest(name=uploaded_file.name, limits=limits):
+                with self.assertRaisesMessage(UploadRejected, message):
+                    self.open(uploaded_file, **limits)
+
+    def test_csv_rows(self):
+        # BOM, quoted comma, CRLF and an unterminated last line
+        content = 'Full Name,Regnumber\r\n"Juma, Ali",TPSD/001\r\nNeema Kombo,TPSD/002\r\nZuhura Omar,TPSD/003'
+        source = self.open(SimpleUploadedFile("STUDENTS.CSV", content.encode("utf-8-sig")))
+        self.assertEqual((source.format, source.rows), ("csv", 3))
+        self.assertEqual(self.rows(source), [
+            [(2, ["Juma, Ali", "TPSD/001"]), (3, ["Neema Kombo", "TPSD/002"])],
+            [(4, ["Zuhura Omar", "TPSD/003"])],
+        ])
+
+    def test_workbook_rows(self):
+        source = self.open(workbook([["Amina Juma", "TPSD/001", None], ["Baraka Ali", "TPSD/002", "BAC"]]))
+        self.assertEqual((source.format, source.rows), ("xlsx", 2))
+        self.assertEqual(self.rows(source, 500), [
+            [(2, ["Amina Juma", "TPSD/001", None]), (3, ["Baraka Ali", "TPSD/002", "BAC"])],
+        ])
+
+    def test_row_limit_while_streaming(self):
+        # an upload whose size was not recorded up front is counted as it is read
+        source = ImportSource(name="students.csv", format="csv", file=io.BytesIO(b"h\na\nb\nc\n"), max_rows=2)
+        with self.assertRaisesMessage(UploadRejected, "more than 2 rows"):
+            self.rows(source)
+
+
+class StudentsImportTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # committed callbacks refresh the reference cache the row checks use
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.braim = Program.objects.create(name="Records Management", abbrev="BRAIM")
+            cls.bac = Program.objects.create(name="Accounts", abbrev="BAC")
+            cls.amina = Student.objects.create(fullname="Amina Juma", regnumber="TPSD/001", program=cls.braim)
+            cls.baraka = Student.objects.create(fullname="Baraka Ali", regnumber="TPSD/002", program=cls.bac)
+
+    def source(self, rows):
+        source = ImportJobService.open_source(upload(rows))
+        self.addCleanup(source.close)
+        return source
+
+
+class UpsertImportTests(StudentsImportTestCase):
+    ROWS = [
+        "Amina Juma,TPSD/001,braim",         # unchanged
+        "Baraka Ali Mwinyi,tpsd/002,XYZ",    # renamed; unknown program keeps BAC
+        "Chausiku Said,TPSD/003,bac",        # new
+        "Chausiku Said,TPSD/003,",           # repeated in the file
+        "Al,TPSD/004,BAC",                   # too short
+    ]
+
+    def test_upsert_round_trip(self):
+        result = StudentService.import_from_excel(self.source(self.ROWS), update_existing=True)
+
+        self.assertFalse(result["success"])
+        self.assertEqual(result["diff"], {"inserted": 1, "updated": 1, "unchanged": 1, "failed": 2})
+        self.assertIn("Row 5: Regnumber is repeated in the file.", result["sms"])
+        self.assertIn("Row 6: Name or regnumber is too short.", result["sms"])
+
+        self.baraka.refresh_from_db()
+        self.assertEqual((self.baraka.fullname, self.baraka.regnumber), ("Baraka Ali Mwinyi", "TPSD/002"))
+        self.assertEqual(self.baraka.program_id, self.bac.id)
+        self.assertEqual(Student.objects.get(regnumber="TPSD/003").program_id, self.bac.id)
+        self.assertEqual(Student.objects.count(), 3)
+
+        # the same file again changes nothing
+        result = StudentService.import_from_excel(self.source(self.ROWS[:3]), update_existing=True)
+        self.assertEqual(result["diff"], {"inserted": 0, "updated": 0, "unchanged": 3, "failed": 0})
+
+    def test_existing_keys_fail_without_update(self):
+        result = StudentService.import_from_excel(self.source(["Amina Mussa,tpsd/001,BAC", "Neema Ali,TPSD/005,"]))
+
+        self.assertEqual(
+            result["sms"], "Imported 1 student(s) successfully.<br>Failed students:<br>Row 2: Regnumber already exists.",
+        )
+        self.assertNotIn("diff", result)
+        self.amina.refresh_from_db()
+        self.assertEqual((self.amina.fullname, self.amina.program_id), ("Amina Juma", self.braim.id))
+        self.assertIsNone(Student.objects.get(regnumber="TPSD/005").program_id)
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class ImportPreviewTests(StudentsImportTestCase):
+    ROWS = [
+        "Amina Juma,TPSD/001,BRAIM",
+        "Baraka Ali Mwinyi,TPSD/002,BAC",
+        *(f"Student Number {i},TPSD/{i:03d},BRAIM" for i in range(3, 8)),
+        "Al,TPSD/009,",
+        "Zuhura Omar,TPSD/010,XYZ",
+    ]
+
+    def setUp(self):
+        self.directory = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.enterContext(self.settings(IMPORT_PREVIEW_DIR=self.directory))
+        # small chunks, so pages span chunk boundaries
+        self.enterContext(mock.patch.object(preview, "IMPORT_CHUNK_SIZE", 3))
+
+    def test_dry_run_round_trip(self):
+        payload = ImportJobService.dry_run(upload(self.ROWS), STUDENTS_IMPORT, update_existing=True)
+
+        self.assertTrue(payload["success"])
+        self.assertEqual(payload["total_rows"], 9)
+        self.assertEqual(payload["counts"], {
+            "insert": 6, "update": 1, "unchanged": 1, "duplicate": 0, "invalid": 1, "unknown_program": 1,
+        })
+        # checking wrote nothing
+        self.assertEqual(Student.objects.count(), 2)
+        self.assertEqual(Student.objects.get(id=self.baraka.id).fullname, "Baraka Ali")
+
+        token = payload["token"]
+        self.assertEqual(len(payload["preview"]["rows"]), 9)
+        second = preview.page(token, 2, per_page=4)
+        self.assertEqual(second["pages"], 3)
+        self.assertEqual(
+            [(row["row"], row["status"]) for row in second["rows"]],
+            [(6, "insert"), (7, "insert"), (8, "insert"), (9, "invalid")],
+        )
+        last = preview.page(token, 99, per_page=4)
+        self.assertEqual(last["page"], 3)
+        self.assertEqual(last["rows"][0]["warning"], 'Unknown program "XYZ".')
+
+        # keys are checked again on commit
+        Student.objects.create(fullname="Student Number 3", regnumber="TPSD/003", program=self.braim)
+        result = StudentService.import_from_excel(None, update_existing=True, preview_token=token)
+
+        self.assertEqual(result["diff"], {"inserted": 5, "updated": 1, "unchanged": 2, "failed": 1})
+        self.assertIsNone(Student.objects.get(regnumber="TPSD/010").program_id)
+        self.assertIsNone(preview.load(token))
+        self.assertEqual(list(self.directory.iterdir()), [])
+
+    def test_discard_and_expired_previews(self):
+        meta = preview.build(STUDENTS_IMPORT, self.source(self.ROWS))
+        path = self.directory / f"{meta['token']}.preview"
+        self.assertTrue(path.exists())
+
+        path.unlink()
+        with self.assertRaises(preview.PreviewExpired):
+            preview.page(meta["token"])
+
+        preview.discard(meta["token"])
+        self.assertIsNone(preview.load(meta["token"]))
+        with self.assertLogs("apps.students.views", "ERROR"):
+            result = StudentService.import_from_excel(None, preview_token=meta["token"])
+        self.assertFalse(result["success"])
+        self.assertEqual(Student.objects.count(), 2)
+
+    def test_bad_tokens_are_rejected(self):
+        for token in ("../../db.sqlite3", "A" * 32, "0" * 31):
+            with self.subTest(token=token):
+                with self.assertRaises(preview.PreviewExpired):
+                    preview._path(token)
+        self.assertIsNone(preview.page("0" * 32))
+        with self.assertRaises(preview.PreviewExpired):
+            next(preview.parsed_chunks(STUDENTS_IMPORT, None, "0" * 32))
@@ -0,0 +1,7 @@
+from django.urls import path
+from . import views as v
+
+urlpatterns = [
+    path('<int:job_id>/', v.import_job_status, name='import_job_status'),
+    path('preview/<str:token>/', v.import_preview_page, name='import_preview_page'),
+]
@@ -0,0 +1,234 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Any, Callable, Dict, Optional
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.core.files.uploadedfile import UploadedFile
+from django.db import connections, transaction
+from django.http import HttpRequest, JsonResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.views.decorators.cache import never_cache
+
+from apps.dashboard import activity
+from utils.excel_import import ImportSource, UploadRejected, open_upload
+
+from . import preview
+from .merge import ImportSpec
+from .models import ImportJob
+
+logger = logging.getLogger(__name__)
+
+# importer(source, progress=callback, **options) -> {"success": bool, "sms": str};
+# source is None when the job commits a checked preview (options["preview_token"])
+Importer = Callable[..., Dict[str, Any]]
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Process-local worker pool, created on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "IMPORT_JOB_WORKERS", 1),
+                thread_name_prefix="import-job",
+            )
+    return _executor
+
+
+# =============================================================================
+# Job service
+# =============================================================================
+
+class ImportJobService:
+    @staticmethod
+    def open_source(uploaded_file: UploadedFile) -> ImportSource:
+        """open_upload() with the configured limits; raises UploadRejected."""
+        return open_upload(
+            uploaded_file,
+            max_bytes=getattr(settings, "IMPORT_MAX_UPLOAD_BYTES", 10 * 1024 * 1024),
+            max_rows=getattr(settings, "IMPORT_MAX_ROWS", 20000),
+        )
+
+    @staticmethod
+    def start(kind: str, uploaded_file: UploadedFile, importer: Importer, **options: Any) -> Dict[str, Any]:
+        """
+        Check an upload against the format, size and row limits and queue
+        its import; ``options`` are passed on to the importer. Returns the
+        response for the upload endpoints.
+        """
+        try:
+            source = ImportJobService.open_source(uploaded_file)
+        except UploadRejected as e:
+            return {"success": False, "sms": str(e)}
+        return ImportJobService.accepted(ImportJobService.submit(kind, source, importer, **options))
+
+    @staticmethod
+    def submit(kind: str, source: ImportSource, importer: Importer, **options: Any) -> ImportJob:
+        """
+        Record a queued job for an accepted upload and hand it to the worker
+        pool once the job row is committed. The job closes the source.
+        """
+        try:
+            job = ImportJob.objects.create(kind=kind, filename=source.name, total_rows=source.rows)
+        except Exception:
+            source.close()
+            raise
+        transaction.on_commit(lambda: _get_executor().submit(ImportJobService.run, job.id, source, importer, options))
+        return job
+
+    @staticmethod
+    def dry_run(uploaded_file: UploadedFile, spec: ImportSpec, update_existing: bool = False) -> Dict[str, Any]:
+        """Check a whole upload without importing it: counts, first page and token (see preview.py)."""
+        try:
+            source = ImportJobService.open_source(uploaded_file)
+        except UploadRejected as e:
+            return {"success": False, "sms": str(e)}
+        try:
+            meta = preview.build(spec, source, update_existing)
+        except UploadRejected as e:
+            return {"success": False, "sms": str(e)}
+        except Exception:
+            logger.exception(f"{spec.kind} import preview failed")
+            return {"success": False, "sms": "Could not read this file."}
+        finally:
+            source.close()
+        return ImportJobService.preview_payload(meta)
+
+    @staticmethod
+    def preview_payload(meta: Dict[str, Any]) -> Dict[str, Any]:
+        counts = meta["counts"]
+        return {
+            "success": True,
+            "token": meta["token"],
+            "filename": meta["filename"],
+            "update_existing": meta["update_existing"],
+            "total_rows": meta["total_rows"],
+            "counts": counts,
+            "importable": counts["insert"] + counts["update"] > 0,
+            "preview": preview.page(meta["token"]),
+            "page_url": reverse("import_preview_page", kwargs={"token": meta["token"]}),
+            "sms": f"Checked {meta['total_rows']} row(s), nothing has been imported yet.",
+        }
+
+    @staticmethod
+    def start_preview(kind: str, token: str, importer: Importer) -> Dict[str, Any]:
+        """Queue the import of a checked preview, reusing its parsed rows."""
+        meta = preview.load(token)
+        if meta is None or meta["kind"] != kind:
+            return {"success": False, "sms": "The file check has expired, please check the file again."}
+        job = ImportJob.objects.create(kind=kind, filename=meta["filename"], total_rows=meta["total_rows"])
+        options = {"preview_token": token, "update_existing": meta["update_existing"]}
+        transaction.on_commit(lambda: _get_executor().submit(ImportJobService.run, job.id, None, importer, options))
+        return ImportJobService.accepted(job)
+
+    @staticmethod
+    def accepted(job: ImportJob) -> Dict[str, Any]:
+        """Response returned by the upload endpoints."""
+        return {
+            "success": True,
+            "job_id": job.id,
+            "status_url": reverse("import_job_status", kwargs={"job_id": job.id}),
+            "sms": "File received, import started...",
+        }
+
+    @staticmethod
+    def run(job_id: int, source: Optional[ImportSource], importer: Importer,
+            options: Optional[Dict[str, Any]] = None) -> None:
+        """Worker entry point: runs one import and records its outcome."""
+        try:
+            ImportJob.objects.filter(id=job_id).update(
+                status="running", started_at=timezone.now(), updated_at=timezone.now(),
+            )
+
+            def progress(processed: int, failed: int) -> None:
+                ImportJob.objects.filter(id=job_id).update(
+                    rows_processed=processed, rows_failed=failed, updated_at=timezone.now(),
+                )
+
+            result = importer(source, progress=progress, **(options or {}))
+            ImportJob.objects.filter(id=job_id).update(
+                status="done", result=result, finished_at=timezone.now(), updated_at=timezone.now(),
+            )
+        except Exception:
+            logger.exception("Import job %s failed", job_id)
+            ImportJob.objects.filter(id=job_id).update(
+                status="failed", result={"success": False, "sms": "Import failed."},
+                finished_at=timezone.now(), updated_at=timezone.now(),
+            )
+        finally:
+            if source is not None:
+                source.close()
+            # Jobs run outside the request cycle, so write their log rows here
+            activity.flush()
+            connections.close_all()
+
+    @staticmethod
+    def eta_seconds(job: ImportJob) -> Optional[int]:
+        if job.status != "running" or not job.total_rows or not job.rows_processed or not job.started_at:
+            return None
+        elapsed = (timezone.now() - job.started_at).total_seconds()
+        remaining = max(job.total_rows - job.rows_processed, 0)
+        return int(remaining * elapsed / job.rows_processed)
+
+    @staticmethod
+    def status(job_id: int) -> Dict[str, Any]:
+        try:
+            job = ImportJob.objects.get(id=job_id)
+        except ImportJob.DoesNotExist:
+            return {"success": False, "sms": "Import job not found."}
+
+        # A job whose worker stopped reporting (e.g. the process was restarted)
+        stale_after = timedelta(seconds=getattr(settings, "IMPORT_JOB_STALE_AFTER", 600))
+        if job.status in ("queued", "running") and job.updated_at < timezone.now() - stale_after:
+            job.status = "failed"
+            job.result = {"success": False, "sms": "Import was interrupted, please upload the file again."}
+            job.finished_at = timezone.now()
+            job.save(update_fields=["status", "result", "finished_at", "updated_at"])
+
+        result = job.result or {}
+        return {
+            "success": True,
+            "job_id": job.id,
+            "status": job.status,
+            "finished": job.status in ("done", "failed"),
+            "total_rows": job.total_rows,
+            "rows_processed": job.rows_processed,
+            "rows_failed": job.rows_failed,
+            "eta_seconds": ImportJobService.eta_seconds(job),
+            "result": {
+                "success": result.get("success", False), "sms": result.get("sms", ""), "diff": result.get("diff"),
+            },
+        }
+
+
+# =============================================================================
+# Views
+# =============================================================================
+
+@never_cache
+@login_required
+def import_job_status(request: HttpRequest, job_id: int) -> JsonResponse:
+    return JsonResponse(ImportJobService.status(job_id))
+
+@never_cache
+@login_required
+def import_preview_page(request: HttpRequest, token: str) -> JsonResponse:
+    """One page of a checked import file: ?page=2"""
+    try:
+        number = int(request.GET.get("page", 1))
+    except ValueError:
+        number = 1
+    try:
+        result = preview.page(token, number)
+    except preview.PreviewExpired:
+        result = None
+    if result is None:
+        return JsonResponse({"success": False, "sms": "The file check has expired, please check the file again."}, status=404)
+    return JsonResponse({"success": True, **result})
@@ -0,0 +1,27 @@
+# Generated by Django 6.0 on 2026-10-17 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('programs', '0003_alter_program_abbrev_alter_program_comment_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='program',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, db_index=True, default=None, null=True, verbose_name='Deleted At'),
+        ),
+        migrations.AlterField(
+            model_name='program',
+            name='abbrev',
+            field=models.CharField(db_index=True, max_length=50, verbose_name='Abbreviation'),
+        ),
+        migrations.AddConstraint(
+            model_name='program',
+            constraint=models.UniqueConstraint(condition=models.Q(('deleted_at__isnull', True)), fields=('abbrev',), name='unique_live_program_abbrev'),
+        ),
+    ]
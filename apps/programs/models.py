@@ -1,17 +1,29 @@
 from django.db import models
 
+from utils.softdelete import LiveManager
+
 
 class Program(models.Model):
     id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=255, verbose_name="Program Name", db_index=True)
-    abbrev = models.CharField(max_length=50, unique=True, verbose_name="Abbreviation", db_index=True)
+    abbrev = models.CharField(max_length=50, verbose_name="Abbreviation", db_index=True)
     comment = models.TextField(blank=True, null=True, default=None, verbose_name="Comments")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Created At", db_index=True)
+    # set when the row is deleted; the purger removes it later (utils/softdelete.py)
+    deleted_at = models.DateTimeField(null=True, blank=True, default=None, db_index=True, verbose_name="Deleted At")
+
+    objects = LiveManager()
+    all_objects = models.Manager()
 
     class Meta:
         verbose_name = "Program"
         verbose_name_plural = "Programs"
         ordering = ["name"]
+        constraints = [
+            # tombstoned rows do not block reusing the value
+            models.UniqueConstraint(
+                fields=["abbrev"], condition=models.Q(deleted_at__isnull=True), name="unique_live_program_abbrev"),
+        ]
 
     def __str__(self):
         return self.name
\ No newline at end of file
@@ -1,3 +1,102 @@
-from django.test import TestCase
+import tempfile
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory, TestCase, override_settings
+
+from apps.imports import preview
+from apps.imports.views import ImportJobService
+from utils.datatables import DataTableProcessor
+
+from .models import Program
+from .views import PROGRAMS_IMPORT, PROGRAMS_TABLE, ProgramService
+
+
+def draw(**params):
+    """DataTables POST for the programs table; ``params`` override the defaults."""
+    data = {
+        "draw": "3", "start": "0", "length": "10", "search[value]": "",
+        "order[0][column]": "2", "order[0][dir]": "asc",
+    }
+    data.update(params)
+    request = RequestFactory().post("/programs/", data, HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+    return DataTableProcessor.process_request(request, PROGRAMS_TABLE)
+
+
+class ProgramsTableTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Program.objects.create(name="Bachelor of Records", abbrev="BRAIM", comment="evening classes")
+        Program.objects.create(name="bachelor of Accounts", abbrev="BAC")
+        Program.objects.create(name="Certificate in Typing", abbrev="CT")
+        Program.objects.create(name="Diploma in Records", abbrev="DR")
+
+    def test_counts_and_paging(self):
+        result = draw(start="1", length="2")
+        self.assertEqual(result["draw"], 3)
+        self.assertEqual(result["recordsTotal"], 4)
+        self.assertEqual(result["recordsFiltered"], 4)
+        self.assertEqual([row["count"] for row in result["data"]], [2, 3])
+        self.assertEqual([row["abbrev"] for row in result["data"]], ["BRAIM", "CT"])
+
+    def test_ordering_ignores_case(self):
+        result = draw(**{"order[0][dir]": "desc"})
+        self.assertEqual([row["abbrev"] for row in result["data"]], ["DR", "CT", "BRAIM", "BAC"])
+
+    def test_global_search(self):
+        # long enough for the FTS index, and a two-letter term on icontains
+        for term, expected in (("records", {"BRAIM", "DR"}), ("evening", {"BRAIM"}), ("ct", {"CT"})):
+            with self.subTest(term=term):
+                result = draw(**{"search[value]": term})
+                self.assertEqual({row["abbrev"] for row in result["data"]}, expected)
+                self.assertEqual(result["recordsFiltered"], len(expected))
+                self.assertEqual(result["recordsTotal"], 4)
+
+    def test_column_filters(self):
+        result = draw(**{"columns[2][search][value]": "bachelor", "columns[4][search][value]": "n/a"})
+        self.assertEqual([row["abbrev"] for row in result["data"]], ["BAC"])
+        self.assertEqual(result["data"][0]["comment"], "n/a")
+
+    def test_length_minus_one_returns_every_row(self):
+        result = draw(length="-1")
+        self.assertEqual(len(result["data"]), 4)
+
+
+def upload(*rows):
+    content = "Name,Abbreviation,Description\n" + "".join(f"{row}\n" for row in rows)
+    return SimpleUploadedFile("programs.csv", content.encode())
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class ProgramsImportTests(TestCase):
+    ROWS = ("Records Management,BRAIM,", "Accounts and Finance,bac,Day classes", "Typing,CT,", "Ty,DR,")
+
+    @classmethod
+    def setUpTestData(cls):
+        Program.objects.create(name="Records", abbrev="BRAIM", comment="evening classes")
+        Program.objects.create(name="Accounts", abbrev="BAC")
+
+    def setUp(self):
+        self.enterContext(self.settings(IMPORT_PREVIEW_DIR=self.enterContext(tempfile.TemporaryDirectory())))
+
+    def test_blank_cells_keep_existing_values(self):
+        source = ImportJobService.open_source(upload(*self.ROWS))
+        self.addCleanup(source.close)
+        result = ProgramService.import_from_excel(source, update_existing=True)
+
+        self.assertEqual(result["diff"], {"inserted": 1, "updated": 2, "unchanged": 0, "failed": 1})
+        self.assertEqual(
+            list(Program.objects.order_by("abbrev").values_list("abbrev", "name", "comment")),
+            [("BAC", "Accounts and Finance", "Day classes"), ("BRAIM", "Records Management", "evening classes"),
+             ("CT", "Typing", None)],
+        )
+
+    def test_checked_file_imports_from_its_preview(self):
+        payload = ImportJobService.dry_run(upload(*self.ROWS), PROGRAMS_IMPORT, update_existing=True)
+
+        self.assertEqual(payload["counts"], {"insert": 1, "update": 2, "unchanged": 0, "duplicate": 0, "invalid": 1})
+        self.assertEqual(Program.objects.count(), 2)
+
+        result = ProgramService.import_from_excel(None, update_existing=True, preview_token=payload["token"])
+        self.assertEqual(result["diff"], {"inserted": 1, "updated": 2, "unchanged": 0, "failed": 1})
+        self.assertEqual(Program.objects.get(abbrev="BRAIM").comment, "evening classes")
+        self.assertIsNone(preview.load(payload["token"]))
@@ -4,4 +4,5 @@ from . import views as v
 urlpatterns = [
     path('', v.programs_page, name='programs_page'),
     path('actions/', v.programs_actions, name="programs_actions"),
+    path('export/', v.programs_export, name="programs_export"),
 ]
@@ -5,99 +5,49 @@ from django.shortcuts import render
 from django.views.decorators.cache import never_cache
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse, HttpRequest, HttpResponse
-from django.db.models import QuerySet, Q
-from django.db.models.functions import Lower
-
-import os
-import openpyxl
-from django.conf import settings
-from django.core.files.storage import FileSystemStorage
 from django.db import transaction
-from datetime import datetime
 
 from .models import Program
-from apps.dashboard.models import Activity
+from apps.dashboard import activity, bulk
+from apps.imports.merge import ImportDiff, ImportSpec, ParsedChunk, merge_chunk
+from apps.imports.preview import parsed_chunks
+from apps.imports.views import ImportJobService
+from utils.datatables import Column, DataTableExporter, DataTableProcessor, TableSpec
+from utils.excel_import import ImportSource, ProgressCallback, Row, cell_text, import_result, import_stopped
 
 logger = logging.getLogger(__name__)
 
 
 # =============================================================================
-# Database utilities
+# DataTable specification
 # =============================================================================
 
-def build_column_filter(
-    field_path: str, search_value: str, filter_kind: str = "contains"
-) -> Optional[Q]:
-    value = (search_value or "").strip()
-    if not value:
-        return None
-
-    return Q(**{f"{field_path}__icontains": value})
-
-
-class DataTableProcessor:
-    @staticmethod
-    def process_request(
-        request: HttpRequest,
-        queryset: QuerySet,
-        global_search_fields: List[str],
-        column_filter_fields: Dict[int, str],
-        column_filter_types: Dict[str, str],
-        column_sort_fields: Optional[Dict[int, str]] = None,
-    ) -> Dict[str, Any]:
-        if column_sort_fields is None:
-            column_sort_fields = column_filter_fields
-
-        total_records = queryset.count()
-
-        draw = int(request.POST.get("draw", 1))
-        start = int(request.POST.get("start", 0))
-        length = int(request.POST.get("length", 10))
-        global_search = (request.POST.get("search[value]", "") or "").strip()
-
-        filtered_qs = queryset
-
-        if global_search:
-            q_global = Q()
-            for field in global_search_fields:
-                q_global |= Q(**{f"{field}__icontains": global_search})
-            filtered_qs = filtered_qs.filter(q_global)
-
-        # Column-specific filters
-        for col_index, field_path in column_filter_fields.items():
-            search_val = (request.POST.get(f"columns[{col_index}][search][value]", "") or "").strip()
-            if search_val:
-                filter_kind = column_filter_types.get(field_path, "contains")
-                q_filter = build_column_filter(field_path, search_val, filter_kind)
-                if q_filter:
-                    filtered_qs = filtered_qs.filter(q_filter)
-
-        filtered_count = filtered_qs.count()
-
-        # Sorting
-        order_idx = int(request.POST.get("order[0][column]", 1))
-        order_dir = request.POST.get("order[0][dir]", "asc")
-        sort_field = column_sort_fields.get(order_idx, "name")
-
-        order_expr = Lower(sort_field).desc() if order_dir == "desc" else Lower(sort_field).asc()
-
-        filtered_qs = filtered_qs.order_by(order_expr)
-
-        paged_data = filtered_qs[start : start + length] if length > 0 else filtered_qs
-
-        if length < 0:
-            Activity.objects.create(
-                categ="program",
-                title="Programs data exported",
-                maelezo="All programs table data has been exported"
-                )
-
-        return {
-            "draw": draw,
-            "recordsTotal": total_records,
-            "recordsFiltered": filtered_count,
-            "data": paged_data,
-        }
+def _program_row(obj: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": obj["id"],
+        "name": obj["name"],
+        "abbrev": obj["abbrev"],
+        "comment": obj["comment"] or "n/a",
+        "action": "",
+    }
+
+
+PROGRAMS_TABLE = TableSpec(
+    label="programs",
+    categ="program",
+    queryset=lambda: Program.objects.all(),
+    columns=(
+        Column(2, "name"),
+        Column(3, "abbrev"),
+        Column(4, "comment", null_field="comment"),
+    ),
+    global_search_fields=("name", "abbrev", "comment"),
+    values=("id", "name", "abbrev", "comment"),
+    row=_program_row,
+    fulltext=(("program", "id"),),
+    export_columns=(("Name", "name"), ("Abbrev", "abbrev"), ("Comment", "comment")),
+    depends_on=("programs.Program",),
+)
 
 
 # =============================================================================
@@ -120,7 +70,7 @@ class ProgramService:
                 return {"success": False, "sms": "Program with this abbreviation already exists."}
 
             Program.objects.create(name=name, abbrev=abbrev, comment=comment)
-            Activity.objects.create(
+            activity.record(
                 categ="program",
                 title="New program added",
                 maelezo="New program has been registered successfully"
@@ -150,7 +100,7 @@ class ProgramService:
             program.comment = comment
             program.save()
 
-            Activity.objects.create(
+            activity.record(
                 categ="program",
                 title="Program updated",
                 maelezo="Program information has been updated"
@@ -165,8 +115,9 @@ class ProgramService:
     @staticmethod
     def delete_by_id(program_id: int) -> Dict[str, Any]:
         try:
-            Program.objects.filter(id=program_id).delete()
-            Activity.objects.create(
+            if not bulk.tombstone(Program, [program_id]):
+                return {"success": False, "sms": "Program not found."}
+            activity.record(
                 categ="program",
                 title="Program deleted",
                 maelezo="One program has been removed from system"
@@ -177,92 +128,119 @@ class ProgramService:
             return {"success": False, "sms": "Operation failed."}
 
     @staticmethod
-    def import_from_excel(filepath: str) -> Dict[str, Any]:
-        created_count = 0
+    def import_from_excel(source: Optional[ImportSource], progress: Optional[ProgressCallback] = None,
+                          update_existing: bool = False, preview_token: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Import an upload, or the parsed rows of a checked preview when
+        ``preview_token`` is given, merging each chunk by abbrev
+        (apps.imports.merge).
+        """
+        processed = 0
         failed = []
+        diff = ImportDiff()
+        # lowercased abbrevs of earlier rows, to report the ones repeated in the file
+        seen = set()
         try:
-            if not filepath.lower().endswith(('.xlsx', '.xls')):
-                return {"success": False, "sms": "Only Excel files (.xlsx, .xls) are accepted."}
-
-            wb = openpyxl.load_workbook(filepath, read_only=True, data_only=True)
-            sheet = wb.active
-
-            with transaction.atomic():
-                for row_num, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
-                    name = str(row[0] or '').strip() if len(row) > 0 else ''
-                    abbrev = str(row[1] or '').strip() if len(row) > 1 else ''
-                    comment = str(row[2]).strip() if len(row) > 2 and row[2] else None
-
-                    if len(name) < 3:
-                        failed.append({'row': row_num, 'reason': 'Name is too short.'})
-                        continue
-                    elif not abbrev:
-                        failed.append({'row': row_num, 'reason': 'Abbrev is required.'})
-                        continue
-                    elif Program.objects.filter(abbrev__iexact=abbrev).exists():
-                        failed.append({'row': row_num, 'reason': 'Abbrev already exists.'})
-                        continue
-
-                    Program.objects.create(name=name, abbrev=abbrev, comment=comment)
-                    created_count += 1
-
-            wb.close()
-
-            sms = f'Imported {created_count} program(s) successfully.'
-            if failed:
-                sms += '<br>'
-                sms += 'Failed programs:<br>' + '<br>'.join([
-                    f'Row {f["row"]}: {f["reason"]}'
-                    for f in failed
-                ])
-
-            success = created_count > 0 and len(failed) == 0
-            
-            if created_count > 0:
-                Activity.objects.create(
-                    categ="program",
-                    title="Multiple programs added",
-                    maelezo=f"{created_count} programs has been registered"
-                    )
-                
-            return {'success': success, 'sms': sms}
+            for parsed in parsed_chunks(PROGRAMS_IMPORT, source, preview_token):
+                failed.extend(parsed.failed)
+                with transaction.atomic():
+                    merge_chunk(Program, "abbrev", "Abbrev", parsed.rows, seen, failed, diff, update_existing)
+                processed += parsed.size
+                if progress:
+                    progress(processed, len(failed))
+
+            result = import_result(
+                "program", diff.inserted, failed,
+                updated_count=diff.updated if update_existing else None, unchanged_count=diff.unchanged,
+            )
 
         except Exception as e:
             logger.exception("Program import failed")
-            return {'success': False, 'sms': f'Error processing file: {str(e)}'}
+            result = import_stopped(
+                "program", e, processed + 2, diff.inserted, failed,
+                updated_count=diff.updated if update_existing else None, unchanged_count=diff.unchanged,
+            )
+
+        # rows of committed chunks stay saved even when a later chunk fails
+        if diff.inserted > 0:
+            activity.record(
+                categ="program",
+                title="Multiple programs added",
+                maelezo=f"{diff.inserted} programs has been registered"
+                )
+        if diff.updated > 0:
+            activity.record(
+                categ="program",
+                title="Multiple programs updated",
+                maelezo=f"{diff.updated} programs has been updated from an import"
+                )
+
+        return result
+
+    @staticmethod
+    def parse_chunk(chunk: List[Row]) -> ParsedChunk:
+        """
+        Row checks for one chunk of spreadsheet rows, shared by the import
+        and its preview. A blank comment cell leaves comment out: new
+        programs get none, existing ones keep theirs.
+        """
+        parsed = ParsedChunk(size=len(chunk))
+        for row_num, row in chunk:
+            name = cell_text(row, 0)
+            abbrev = cell_text(row, 1)
+            comment = cell_text(row, 2)
+
+            if len(name) < 3:
+                parsed.failed.append({'row': row_num, 'reason': 'Name is too short.'})
+                continue
+            elif not abbrev:
+                parsed.failed.append({'row': row_num, 'reason': 'Abbrev is required.'})
+                continue
+
+            values = {"name": name}
+            if comment:
+                values["comment"] = comment
+            parsed.rows.append((row_num, abbrev, values))
+        return parsed
 
     @staticmethod
     def delete_multiple(data: Dict[str, Any]) -> Dict[str, Any]:
         try:
             programs = data.get("programs_list", "")
-            programs_list = [int(x) for x in programs.split(",") if x.strip()]
+            programs_list = [int(x) for x in programs.split(",") if x.strip().isdigit()]
             delete_type = data.get("delete_type")
             
             if delete_type == "all":
-                get_all = Program.objects.all()
-                if len(get_all) == 0:
+                if not Program.objects.exists():
                     return {"success": False, "sms": "No programs available to delete."}
                 
-                get_all.delete()
-                Activity.objects.create(
+                deleted = bulk.tombstone(Program)
+                activity.record(
                     categ="program", title="All programs deleted",
                     maelezo="All programs have been erased from system"
                     )
-                return {"success": True, "sms": "All programs deleted successfully."}
+                return {"success": True, "sms": f"All {deleted} programs deleted successfully."}
             
-            for prog in programs_list:
-                Program.objects.filter(id=prog).delete()
-            Activity.objects.create(
+            deleted = bulk.tombstone(Program, programs_list) if programs_list else 0
+            if not deleted:
+                return {"success": False, "sms": "No programs were deleted."}
+
+            activity.record(
                 categ="program", title="Multiple programs deleted",
-                maelezo=f"{len(programs_list)} programs have been deleted from system"
+                maelezo=f"{deleted} programs have been deleted from system"
                 )
-            return {"success": True, "sms": f"{len(programs_list)} programs deleted successfully."}
+            return {"success": True, "sms": f"{deleted} programs deleted successfully."}
                 
         except Exception as e:
             logger.exception("Program delete failed")
             return {"success": False, "sms": "Operation failed."}
         
 
+PROGRAMS_IMPORT = ImportSpec(
+    kind="programs", model=Program, key_field="abbrev", key_label="Abbrev", parse=ProgramService.parse_chunk,
+)
+
+
 # =============================================================================
 # Views
 # =============================================================================
@@ -271,44 +249,19 @@ class ProgramService:
 @login_required
 def programs_page(request: HttpRequest) -> HttpResponse:
     if request.method == "POST" and request.headers.get("X-Requested-With") == "XMLHttpRequest":
-        qs = Program.objects.all()
-
-        column_filter_fields = {2: "name", 3: "abbrev", 4: "comment"}
-        column_sort_fields = column_filter_fields.copy()
-        column_filter_types = { "name": "contains", "abbrev": "contains", "comment": "contains"}
-
-        result = DataTableProcessor.process_request(
-            request=request,
-            queryset=qs,
-            global_search_fields=["name", "abbrev", "comment"],
-            column_filter_fields=column_filter_fields,
-            column_filter_types=column_filter_types,
-            column_sort_fields=column_sort_fields,
-        )
-
-        start_idx = int(request.POST.get("start", 0))
-        rows = [
-            {
-                "count": start_idx + i + 1,
-                "id": obj.id,
-                "name": obj.name,
-                "abbrev": obj.abbrev,
-                "comment": obj.comment or "n/a",
-                "action": "",
-            }
-            for i, obj in enumerate(result["data"])
-        ]
-
-        return JsonResponse(
-            {
-                "draw": result["draw"], "recordsTotal": result["recordsTotal"],
-                "recordsFiltered": result["recordsFiltered"], "data": rows
-            }
-        )
+        return DataTableProcessor.respond(request, PROGRAMS_TABLE)
 
     return render(request, "programs/programs.html")
 
 
+@never_cache
+@login_required
+def programs_export(request: HttpRequest) -> HttpResponse:
+    if request.method != "POST":
+        return JsonResponse({"success": False, "sms": "Invalid request"})
+    return DataTableExporter.export(request, PROGRAMS_TABLE)
+
+
 @never_cache
 @login_required
 def programs_actions(request: HttpRequest) -> JsonResponse:
@@ -316,27 +269,17 @@ def programs_actions(request: HttpRequest) -> JsonResponse:
         return JsonResponse({"success": False, "sms": "Invalid request"})
     
     if 'excel_file' in request.FILES:
-        uploaded_file = request.FILES['excel_file']
-        now = datetime.now().strftime("%Y-%m-%d_%H%M%S")
-        original_ext = os.path.splitext(uploaded_file.name)[1].lower()
-        new_filename = f"{now}_courses{original_ext}"
-        fs = FileSystemStorage(location=os.path.join(settings.MEDIA_ROOT, 'tmp'))
-        
-        # Save with new name
-        filepath = fs.path(fs.save(new_filename, uploaded_file))
-        
-        try:
-            result = ProgramService.import_from_excel(filepath)
-            return JsonResponse(result)
-        finally:
-            if os.path.exists(filepath):
-                try:
-                    os.remove(filepath)
-                except (PermissionError, OSError):
-                    # Silently ignore
-                    pass
-                except Exception as e:
-                    logger.warning(f"Could not delete temp file {filepath}: {e}")
+        update_existing = request.POST.get("import_mode") == "upsert"
+        if request.POST.get("dry_run") == "true":
+            return JsonResponse(ImportJobService.dry_run(request.FILES['excel_file'], PROGRAMS_IMPORT, update_existing))
+        return JsonResponse(ImportJobService.start(
+            "programs", request.FILES['excel_file'], ProgramService.import_from_excel,
+            update_existing=update_existing,
+        ))
+    if request.POST.get("preview_token"):
+        return JsonResponse(ImportJobService.start_preview(
+            "programs", request.POST["preview_token"], ProgramService.import_from_excel,
+        ))
 
     post_data = request.POST
     prog_id = post_data.get("program_id")
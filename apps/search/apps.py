@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+class SearchConfig(AppConfig):
+    name = 'apps.search'
+
+    def ready(self):
+        from .fts import install_after_migrate
+        post_migrate.connect(install_after_migrate, sender=self)
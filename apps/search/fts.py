@@ -0,0 +1,153 @@
+"""
+SQLite FTS5 full-text indexes for the searchable tables.
+
+Each index is an external-content FTS5 table (the text lives only in the
+source table) using the trigram tokenizer, so a MATCH behaves like a
+case-insensitive substring search. Triggers on the source table keep the
+index in sync for every write path, including bulk_create, queryset.update()
+and queryset.delete(), which never fire Django signals.
+
+On other database vendors, or on SQLite builds without FTS5/trigram, the
+helpers report the index as unavailable and callers fall back to icontains.
+"""
+import logging
+from typing import Dict, Optional, Tuple
+
+from django.db import connections, DEFAULT_DB_ALIAS
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.db.utils import DatabaseError
+
+logger = logging.getLogger(__name__)
+
+# Trigram needs at least three characters; shorter terms use icontains.
+MIN_TERM_LENGTH = 3
+
+# index key -> (fts table, source table, indexed columns)
+INDEXES: Dict[str, Tuple[str, str, Tuple[str, ...]]] = {
+    "student": ("fts_student", "students_student", ("fullname", "regnumber")),
+    "course": ("fts_course", "courses_course", ("name", "code")),
+    "program": ("fts_program", "programs_program", ("name", "abbrev", "comment")),
+    "facilitator": ("fts_facilitator", "facilitators_facilitator", ("name", "comment")),
+    "question": ("fts_question", "stationery_question", ("content",)),
+}
+
+# lookup key -> (index key, columns): searches limited to some of an index's
+# columns. Other tables look programs and facilitators up by name only, as
+# their icontains filters did; the free-text comment is for their own tables.
+SCOPES: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "program_name": ("program", ("name", "abbrev")),
+    "facilitator_name": ("facilitator", ("name",)),
+}
+
+_available: Dict[str, bool] = {}
+
+
+def _schema_sql(key: str):
+    fts, source, cols = INDEXES[key]
+    col_list = ", ".join(cols)
+    new_vals = ", ".join(f"new.{c}" for c in cols)
+    old_vals = ", ".join(f"old.{c}" for c in cols)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{col_list}, content='{source}', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {source} BEGIN "
+        f"INSERT INTO {fts}(rowid, {col_list}) VALUES (new.id, {new_vals}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {source} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {col_list}) VALUES ('delete', old.id, {old_vals}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {col_list} ON {source} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {col_list}) VALUES ('delete', old.id, {old_vals}); "
+        f"INSERT INTO {fts}(rowid, {col_list}) VALUES (new.id, {new_vals}); END",
+    ]
+
+
+def install(using: str = DEFAULT_DB_ALIAS, rebuild: bool = False) -> bool:
+    """
+    Create the FTS tables and their triggers if missing.
+
+    Safe to call repeatedly: Django rebuilds SQLite tables on most schema
+    changes, which drops their triggers, so this runs after every migrate.
+    """
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return False
+
+    try:
+        with connection.cursor() as cursor:
+            for key, (fts, source, _) in INDEXES.items():
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=%s", [fts])
+                created = cursor.fetchone() is None
+                for sql in _schema_sql(key):
+                    cursor.execute(sql)
+                if created or rebuild:
+                    cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+    except DatabaseError:
+        logger.warning("SQLite FTS5 trigram index unavailable; search falls back to LIKE", exc_info=True)
+        return False
+
+    _available.pop(using, None)
+    return True
+
+
+def uninstall(using: str = DEFAULT_DB_ALIAS) -> None:
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for fts, _, _ in INDEXES.values():
+            for suffix in ("ai", "ad", "au"):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+            cursor.execute(f"DROP TABLE IF EXISTS {fts}")
+    _available.pop(using, None)
+
+
+def install_after_migrate(sender, using=DEFAULT_DB_ALIAS, **kwargs) -> None:
+    install(using=using)
+
+
+def is_available(using: str = DEFAULT_DB_ALIAS) -> bool:
+    if using not in _available:
+        connection = connections[using]
+        ok = False
+        if connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name IN (%s)"
+                    % ", ".join("%s" for _ in INDEXES),
+                    [fts for fts, _, _ in INDEXES.values()],
+                )
+                ok = cursor.fetchone()[0] == len(INDEXES)
+        _available[using] = ok
+    return _available[using]
+
+
+def _match_expression(term: str, columns: Tuple[str, ...] = ()) -> str:
+    # A single quoted phrase: FTS5 operators in user input are taken literally.
+    phrase = '"' + term.replace('"', '""') + '"'
+    return f"{{{' '.join(columns)}}} : {phrase}" if columns else phrase
+
+
+def match_q(key: str, term: str, path: str = "id", using: str = DEFAULT_DB_ALIAS) -> Optional[Q]:
+    """
+    Q restricting ``path`` to the rowids of ``key``'s index (or scope, see
+    SCOPES) matching ``term``, or None when the index cannot answer (caller
+    should use icontains).
+    """
+    term = (term or "").strip()
+    if len(term) < MIN_TERM_LENGTH or not is_available(using):
+        return None
+    index, columns = SCOPES.get(key, (key, ()))
+    fts = INDEXES[index][0]
+    subquery = RawSQL(f"SELECT rowid FROM {fts} WHERE {fts} MATCH %s", [_match_expression(term, columns)])
+    return Q(**{f"{path}__in": subquery})
+
+
+def search_q(sources: Tuple[Tuple[str, str], ...], term: str, using: str = DEFAULT_DB_ALIAS) -> Optional[Q]:
+    """OR of match_q over (index key, path) pairs; None if any index is unusable."""
+    combined = Q()
+    for key, path in sources:
+        q = match_q(key, term, path, using)
+        if q is None:
+            return None
+        combined |= q
+    return combined
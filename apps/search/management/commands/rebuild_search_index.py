@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from apps.search.fts import install
+
+
+class Command(BaseCommand):
+    help = "Create (if missing) and fully rebuild the SQLite FTS5 search indexes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        if install(using=options["database"], rebuild=True):
+            self.stdout.write(self.style.SUCCESS("Search indexes rebuilt."))
+        else:
+            self.stdout.write(self.style.WARNING("Full-text search is not available on this database."))
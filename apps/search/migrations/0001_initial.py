@@ -0,0 +1,28 @@
+# Generated by Django 6.0 on 2026-10-17 09:00
+
+from django.db import migrations
+
+
+def create_indexes(apps, schema_editor):
+    from apps.search.fts import install
+    install(using=schema_editor.connection.alias, rebuild=True)
+
+
+def drop_indexes(apps, schema_editor):
+    from apps.search.fts import uninstall
+    uninstall(using=schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0003_alter_course_options_alter_course_code_and_more'),
+        ('facilitators', '0003_alter_facilitator_comment_and_more'),
+        ('programs', '0003_alter_program_abbrev_alter_program_comment_and_more'),
+        ('stationery', '0015_page_title'),
+        ('students', '0002_alter_student_created_at_alter_student_fullname_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 6.0 on 2026-10-17 12:00
+
+from django.db import migrations
+
+
+def rebuild_indexes(apps, schema_editor):
+    # The table rebuilds of the soft-delete migrations dropped the triggers,
+    # and post_migrate never put them back: reinstall them and reindex the
+    # rows written in the meantime
+    from apps.search.fts import install
+    install(using=schema_editor.connection.alias, rebuild=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0004_course_deleted_at_alter_course_code_and_more'),
+        ('facilitators', '0004_facilitator_deleted_at'),
+        ('programs', '0004_program_deleted_at_alter_program_abbrev_and_more'),
+        ('search', '0001_initial'),
+        ('students', '0003_student_deleted_at_alter_student_regnumber_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_indexes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,3 @@
+# The FTS5 tables are created by fts.install(), not as models. This module
+# only exists because Django sends post_migrate to apps with a models module,
+# and the indexes' triggers must be reinstalled after every migrate.
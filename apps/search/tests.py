@@ -0,0 +1,49 @@
+from django.db import connection
+from django.test import TestCase
+
+from apps.programs.models import Program
+from apps.students.models import Student
+
+from .fts import INDEXES, is_available, match_q, search_q
+
+
+class FullTextIndexTests(TestCase):
+    def ids(self, key, term, model=Student):
+        return set(model.objects.filter(match_q(key, term)).values_list("id", flat=True))
+
+    def test_every_index_has_its_triggers_after_migrate(self):
+        self.assertTrue(is_available())
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='trigger'")
+            triggers = {name for name, in cursor.fetchall()}
+        for fts, _, _ in INDEXES.values():
+            self.assertLessEqual({f"{fts}_ai", f"{fts}_ad", f"{fts}_au"}, triggers)
+
+    def test_writes_keep_the_index_in_sync(self):
+        student = Student.objects.create(fullname="Neema Mwakyusa", regnumber="TPSD/01")
+        self.assertEqual(self.ids("student", "mwaky"), {student.id})
+
+        Student.objects.filter(id=student.id).update(fullname="Neema Kombo")
+        self.assertEqual(self.ids("student", "mwaky"), set())
+        self.assertEqual(self.ids("student", "kombo"), {student.id})
+
+        Student.objects.bulk_create([Student(fullname="Juma Kombo", regnumber="TPSD/02")])
+        self.assertEqual(len(self.ids("student", "KOMBO")), 2)
+
+        Student.all_objects.filter(id=student.id).delete()
+        self.assertEqual(len(self.ids("student", "kombo")), 1)
+
+    def test_short_terms_fall_back(self):
+        self.assertIsNone(match_q("student", "ab"))
+        self.assertIsNone(search_q((("student", "id"), ("program_name", "program_id")), " x "))
+
+    def test_operators_in_the_term_are_literal(self):
+        Student.objects.create(fullname='Said "OR" Ali', regnumber="TPSD/03")
+        self.assertEqual(len(self.ids("student", '"or" ali')), 1)
+        self.assertEqual(self.ids("student", "said NOT ali"), set())
+
+    def test_name_scope_ignores_comments(self):
+        program = Program.objects.create(name="Records Management", abbrev="BRAIM", comment="diploma route")
+        self.assertEqual(self.ids("program", "diploma", Program), {program.id})
+        self.assertEqual(self.ids("program_name", "diploma", Program), set())
+        self.assertEqual(self.ids("program_name", "braim", Program), {program.id})
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class StationeryConfig(AppConfig):
     name = 'apps.stationery'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,239 @@
+"""
+In-memory prefix index behind the cover page typeahead.
+
+Each picker (students, programs, courses) has a sorted array of
+(normalized key, id) pairs searched with bisect. An object is indexed under
+its full name starting at every word (so "mar" finds "JOHN MARK"), its
+registration number / course code / program abbreviation, and the same
+keys with punctuation removed. A lookup is one binary search plus a scan
+of the matching range, so it costs microseconds instead of queries.
+
+The index is built lazily per process and kept current by the receivers
+in signals.py. Changes also bump the picker's AUTOCOMPLETE_VERSION_KEY in
+the cache, so other processes sharing that cache rebuild that picker (and
+only that one) on their next lookup; every index is rebuilt after
+AUTOCOMPLETE_MAX_AGE seconds regardless.
+"""
+import bisect
+import heapq
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from apps.courses.models import Course
+from apps.programs.models import Program
+from apps.students.models import Student
+from utils.softdelete import live_related
+
+AUTOCOMPLETE_VERSION_KEY = "stationery:autocomplete_version:{picker}"
+
+# Largest number of matches one lookup returns
+MAX_RESULTS = 50
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def normalize(text: Optional[str]) -> str:
+    return " ".join(str(text or "").casefold().split())
+
+
+def _variants(text: Optional[str]) -> Set[str]:
+    value = normalize(text)
+    return {value, normalize(_PUNCTUATION.sub("", value))} - {""}
+
+
+def _word_suffixes(text: Optional[str]) -> Set[str]:
+    words = normalize(text).split()
+    keys = set()
+    for i in range(len(words)):
+        keys |= _variants(" ".join(words[i:]))
+    return keys
+
+
+# picker -> (rows loader, row -> display dict, row -> index keys)
+PICKERS: Dict[str, Tuple[Callable[..., Iterable[Dict[str, Any]]], Callable, Callable]] = {
+    "students": (
+        lambda **f: Student.objects.filter(**f).values("id", "fullname", "regnumber"),
+        lambda r: {"id": r["id"], "fullname": r["fullname"], "regnumber": r["regnumber"]},
+        lambda r: _word_suffixes(r["fullname"]) | _variants(r["regnumber"]),
+    ),
+    "programs": (
+        lambda **f: Program.objects.filter(**f).values("id", "name", "abbrev"),
+        lambda r: {"id": r["id"], "name": r["name"], "abbrev": r["abbrev"]},
+        lambda r: _word_suffixes(r["name"]) | _variants(r["abbrev"]),
+    ),
+    "courses": (
+        lambda **f: Course.objects.filter(**f).values("id", "name", "code", facilitator_name=live_related("facilitator", "name")),
+        lambda r: {"id": r["id"], "name": r["name"], "code": r["code"], "facilitator": r["facilitator_name"]},
+        lambda r: _word_suffixes(r["name"]) | _variants(r["code"]),
+    ),
+}
+
+
+class PrefixIndex:
+    """
+    Sorted (key, id) array for one picker. Updates and deletes leave the
+    old entries in place and mark them stale (checked against _keys); the
+    array is re-sorted from memory once stale entries pile up.
+
+    Writers hold the lock and never modify the array in place: they build a
+    new one and swap it in, so search() can scan whichever array it picked
+    up without locking.
+    """
+
+    def __init__(self, rows: Iterable[Dict[str, Any]], display: Callable, keys_of: Callable) -> None:
+        self._display = display
+        self._keys_of = keys_of
+        self._items: Dict[int, Dict[str, Any]] = {}
+        self._keys: Dict[int, Set[str]] = {}
+        self._entries: List[Tuple[str, int]] = []
+        self._stale = 0
+        self._lock = threading.Lock()
+        for row in rows:
+            self._items[row["id"]] = display(row)
+            self._keys[row["id"]] = keys_of(row)
+        self._compact()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _compact(self) -> None:
+        self._entries = sorted((key, obj_id) for obj_id, keys in self._keys.items() for key in keys)
+        self._stale = 0
+
+    def put(self, row: Dict[str, Any]) -> None:
+        self.put_many([row])
+
+    def put_many(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """(Re-)index ``rows``, building the new array once for the whole batch."""
+        rows = [(row, self._keys_of(row)) for row in rows]
+        if not rows:
+            return
+        with self._lock:
+            added: List[Tuple[str, int]] = []
+            for row, keys in rows:
+                obj_id = row["id"]
+                old = self._keys.get(obj_id, set())
+                self._items[obj_id] = self._display(row)
+                self._keys[obj_id] = keys
+                self._stale += len(old - keys)
+                added.extend((key, obj_id) for key in keys - old)
+            self._entries = list(heapq.merge(self._entries, sorted(added)))
+            self._maybe_compact()
+
+    def remove(self, obj_id: int) -> None:
+        with self._lock:
+            self._items.pop(obj_id, None)
+            self._stale += len(self._keys.pop(obj_id, ()))
+            self._maybe_compact()
+
+    def _maybe_compact(self) -> None:
+        if self._stale > max(len(self._entries) // 4, 1000):
+            self._compact()
+
+    def search(self, query: str, limit: int) -> List[Dict[str, Any]]:
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        entries = self._entries
+        found: List[Dict[str, Any]] = []
+        seen: Set[int] = set()
+        i = bisect.bisect_left(entries, (prefix,))
+        while i < len(entries) and len(found) < limit:
+            key, obj_id = entries[i]
+            if not key.startswith(prefix):
+                break
+            i += 1
+            item = self._items.get(obj_id)
+            if item is None or obj_id in seen or key not in self._keys.get(obj_id, ()):
+                continue
+            seen.add(obj_id)
+            found.append(item)
+        return found
+
+
+class Autocomplete:
+    """Lazily built PrefixIndex per picker, shared by the threads of a process."""
+
+    def __init__(self) -> None:
+        self._indexes: Dict[str, Tuple[PrefixIndex, float, Optional[int]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _version(picker: str) -> Optional[int]:
+        return cache.get(AUTOCOMPLETE_VERSION_KEY.format(picker=picker))
+
+    def index(self, picker: str) -> PrefixIndex:
+        version = self._version(picker)
+        max_age = getattr(settings, "AUTOCOMPLETE_MAX_AGE", 300)
+        current = self._indexes.get(picker)
+        if current and current[2] == version and time.monotonic() - current[1] < max_age:
+            return current[0]
+
+        with self._lock:
+            current = self._indexes.get(picker)
+            if current and current[2] == version and time.monotonic() - current[1] < max_age:
+                return current[0]
+            load, display, keys_of = PICKERS[picker]
+            index = PrefixIndex(load(), display, keys_of)
+            self._indexes[picker] = (index, time.monotonic(), version)
+            return index
+
+    def search(self, picker: str, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        return self.index(picker).search(query, min(limit, MAX_RESULTS))
+
+    # --- incremental updates -------------------------------------------------
+    # Applied once the surrounding transaction commits, so a rolled back
+    # save never reaches the index.
+
+    @staticmethod
+    def _bump(picker: str) -> int:
+        key = AUTOCOMPLETE_VERSION_KEY.format(picker=picker)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # Missing or evicted: start from a value no process has seen
+            version = time.time_ns()
+            cache.set(key, version, None)
+            return version
+
+    def _apply(self, picker: str, change: Callable[[PrefixIndex], None]) -> None:
+        version = self._bump(picker)
+        with self._lock:
+            current = self._indexes.get(picker)
+            if current:
+                change(current[0])
+                # This process already has its own change
+                self._indexes[picker] = (current[0], current[1], version)
+
+    def refresh(self, picker: str, ids: Iterable[int]) -> None:
+        """(Re-)index the given rows, e.g. after a save or a bulk insert."""
+        ids = [obj_id for obj_id in ids if obj_id is not None]
+        if not ids:
+            return
+
+        def apply() -> None:
+            rows = list(PICKERS[picker][0](id__in=ids)) if picker in self._indexes else []
+            self._apply(picker, lambda index: index.put_many(rows))
+
+        transaction.on_commit(apply)
+
+    def remove(self, picker: str, obj_id: int) -> None:
+        transaction.on_commit(lambda: self._apply(picker, lambda index: index.remove(obj_id)))
+
+    def invalidate(self, picker: str) -> None:
+        """Rebuild the picker's index on its next lookup (queryset updates)."""
+        def apply() -> None:
+            self._bump(picker)
+            with self._lock:
+                self._indexes.pop(picker, None)
+
+        transaction.on_commit(apply)
+
+
+autocomplete = Autocomplete()
@@ -0,0 +1,183 @@
+"""
+Cache of rendered cover pages.
+
+A cover is keyed by a SHA-256 of everything it prints: the Page row, the
+Program / Course / Facilitator / Student values it references and
+COVER_LAYOUT_VERSION. Editing any of those rows therefore produces a new
+key, and the old entry is never served again. Page saves and deletes also
+evict the page's entry straight away (see signals.py).
+
+Entries live in a process-local LRU and are spilled to disk under
+COVER_CACHE_DIR, so they survive restarts and are shared by workers.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from django.conf import settings
+
+from utils.pdf import PdfImage, RenderedPage
+
+logger = logging.getLogger(__name__)
+
+_FORMAT = b"COVER1\n"
+
+# Disk usage is checked after this many writes
+_PRUNE_EVERY = 100
+
+
+def _setting(name: str, default: Any) -> Any:
+    return getattr(settings, name, default)
+
+
+def cover_key(data: Dict[str, Any], layout_version: int) -> str:
+    """Content hash of one cover's data (see cover_pdf.load_pages)."""
+    payload = dict(data, students=[(s.id, s.fullname, s.regnumber) for s in data["students"]])
+    raw = json.dumps([layout_version, payload], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class CoverCache:
+    """Two-level (memory LRU + disk) store of rendered cover pages."""
+
+    def __init__(self) -> None:
+        self._memory: "OrderedDict[str, List[RenderedPage]]" = OrderedDict()
+        self._page_keys: Dict[int, str] = {}
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    # --- paths ---------------------------------------------------------------
+
+    @staticmethod
+    def directory() -> Path:
+        return Path(_setting("COVER_CACHE_DIR", Path(settings.MEDIA_ROOT) / "cache" / "covers"))
+
+    def _path(self, key: str) -> Path:
+        return self.directory() / key[:2] / f"{key}.bin"
+
+    # --- public API ----------------------------------------------------------
+
+    def get_or_render(self, page_id: int, key: str, render: Callable[[], List[RenderedPage]],
+                      images: Dict[str, PdfImage]) -> List[RenderedPage]:
+        """Cached pages for ``key``, rendering and storing them on a miss."""
+        pages = self._get_memory(key)
+        if pages is None:
+            pages = self._read_disk(key, images)
+            if pages is None:
+                pages = render()
+                self._write_disk(key, pages)
+            self._put_memory(key, pages)
+
+        with self._lock:
+            previous = self._page_keys.get(page_id)
+            self._page_keys[page_id] = key
+        if previous and previous != key:
+            self._discard(previous)
+        return pages
+
+    def evict_page(self, page_id: int) -> None:
+        """Drop the entry last rendered for a saved page."""
+        with self._lock:
+            key = self._page_keys.pop(page_id, None)
+        if key:
+            self._discard(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._page_keys.clear()
+        directory = self.directory()
+        if directory.exists():
+            for path in directory.glob("*/*.bin"):
+                path.unlink(missing_ok=True)
+
+    # --- memory --------------------------------------------------------------
+
+    def _get_memory(self, key: str) -> Optional[List[RenderedPage]]:
+        with self._lock:
+            pages = self._memory.get(key)
+            if pages is not None:
+                self._memory.move_to_end(key)
+            return pages
+
+    def _put_memory(self, key: str, pages: List[RenderedPage]) -> None:
+        max_items = _setting("COVER_CACHE_MAX_ITEMS", 256)
+        with self._lock:
+            self._memory[key] = pages
+            self._memory.move_to_end(key)
+            while len(self._memory) > max_items:
+                self._memory.popitem(last=False)
+
+    def _discard(self, key: str) -> None:
+        with self._lock:
+            self._memory.pop(key, None)
+        self._path(key).unlink(missing_ok=True)
+
+    # --- disk ----------------------------------------------------------------
+    # File layout: _FORMAT, one JSON header line describing the pages,
+    # then the compressed content streams back to back.
+
+    def _read_disk(self, key: str, images: Dict[str, PdfImage]) -> Optional[List[RenderedPage]]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                if f.readline() != _FORMAT:
+                    return None
+                header = json.loads(f.readline())
+                pages = []
+                for entry in header:
+                    content = f.read(entry["length"])
+                    used = {name: images[name] for name in entry["images"]}
+                    pages.append(RenderedPage(entry["width"], entry["height"], content, used))
+            os.utime(path)
+            return pages
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError):
+            logger.warning(f"Discarding unreadable cover cache file {path}")
+            path.unlink(missing_ok=True)
+            return None
+
+    def _write_disk(self, key: str, pages: List[RenderedPage]) -> None:
+        path = self._path(key)
+        contents = [page.content() for page in pages]
+        header = [
+            {"width": page.width, "height": page.height, "length": len(content), "images": list(page.images)}
+            for page, content in zip(pages, contents)
+        ]
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp, "wb") as f:
+                f.write(_FORMAT)
+                f.write(json.dumps(header).encode("utf-8") + b"\n")
+                for content in contents:
+                    f.write(content)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"Could not write cover cache file {path}: {e}")
+            return
+
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % _PRUNE_EVERY == 0
+        if prune:
+            self._prune_disk()
+
+    def _prune_disk(self) -> None:
+        """Keep at most COVER_CACHE_MAX_FILES files, dropping the least recently used."""
+        max_files = _setting("COVER_CACHE_MAX_FILES", 5000)
+        files = list(self.directory().glob("*/*.bin"))
+        if len(files) <= max_files:
+            return
+        files.sort(key=lambda p: p.stat().st_mtime)
+        for path in files[:len(files) - max_files]:
+            path.unlink(missing_ok=True)
+
+
+cover_cache = CoverCache()
@@ -0,0 +1,270 @@
+"""
+Server-side rendering of saved cover pages (stationery.Page) to PDF.
+
+Mirrors the printed layout of templates/stationery/cover.html: the two
+logo heading, the program/course/facilitator fields, the students table
+(or the single student block for individual tasks) and the question.
+"""
+import html
+import re
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from django.contrib.staticfiles import finders
+
+from utils.pdf import (
+    A4, FONT_BOLD, FONT_REGULAR, PdfCanvas, PdfImage, PdfWriter, RenderedPage, fit_text, wrap_text,
+)
+
+from .cover_cache import cover_cache, cover_key
+from .models import Page
+
+# Bump whenever the drawing code below changes, so cached covers are redrawn
+COVER_LAYOUT_VERSION = 1
+
+# Largest number of saved pages rendered into one document
+MAX_PAGES_PER_PDF = 200
+
+LOGOS = ("nembo.png", "tpsc.png")
+
+HEADING_LINES = (
+    "THE UNITED REPUBLIC OF TANZANIA",
+    "PRESIDENT’S OFFICE",
+    "PUBLIC SERVICE MANAGEMENT",
+    "TANZANIA PUBLIC SERVICE COLLEGE (TPSC)",
+)
+
+PAGE_W, PAGE_H = A4
+MARGIN = 28
+PADDING = 12
+CONTENT_LEFT = MARGIN + PADDING
+CONTENT_RIGHT = PAGE_W - MARGIN - PADDING
+CONTENT_BOTTOM = PAGE_H - MARGIN - PADDING
+LABEL_WIDTH = 128
+FIELD_SIZE = 12
+ROW_HEIGHT = 18
+TABLE_SIZE = 10.5
+LINE_GAP = 1.35
+
+
+# =============================================================================
+# Data loading
+# =============================================================================
+
+def format_streams(streams: Sequence[str]) -> str:
+    """Same wording as formatStreamSet() in cover.js: 'A', 'A & B', 'A, B & C'."""
+    streams = [str(s) for s in streams or []]
+    if len(streams) <= 1:
+        return "".join(streams)
+    return f"{', '.join(streams[:-1])} & {streams[-1]}"
+
+
+def question_text(markup: Optional[str]) -> str:
+    """Plain text of the rich-editor question HTML, keeping line and list breaks."""
+    if not markup:
+        return ""
+    text = re.sub(r"<\s*li\b[^>]*>", "\n• ", markup, flags=re.I)
+    # Block elements start and end a line: the editor writes "text<div>next line</div>"
+    text = re.sub(
+        r"<\s*br\s*/?>|<\s*/?\s*(p|div|li|h\d|ul|ol|blockquote|pre|table|tr)\b[^>]*>", "\n", text, flags=re.I,
+    )
+    text = html.unescape(re.sub(r"<[^>]+>", "", text))
+    lines = [" ".join(line.split()) for line in text.split("\n")]
+    return "\n".join(line for line in lines if line)
+
+
+def load_pages(page_ids: Iterable[int]) -> List[Dict[str, Any]]:
+    """
+    Cover data for the given saved pages, in the requested order, in a
+    constant number of queries (see Page.objects.with_details()).
+    """
+    ids = list(dict.fromkeys(page_ids))[:MAX_PAGES_PER_PDF]
+    pages = Page.objects.with_details().in_bulk(ids)
+
+    result = []
+    for page_id in ids:
+        pg = pages.get(page_id)
+        if pg is None:
+            continue
+        program, course = pg.program, pg.course
+        facilitator = course.facilitator if course else None
+        streams = format_streams(pg.stream_list())
+        c_class = program.abbrev if program else "N/A"
+        result.append({
+            "id": pg.id,
+            "program": program.name if program else "N/A",
+            "course": course.name if course else "N/A",
+            "code": course.code if course else "N/A",
+            "class": f"{c_class}   {streams}" if streams else c_class,
+            "facilitator": facilitator.name if facilitator else "N/A",
+            "task": pg.task,
+            "group": "group" in (pg.task or "").lower(),
+            "groupno": str(pg.groupno if pg.groupno is not None else 0),
+            "subdate": pg.submitdate or "N/A",
+            "table": pg.table,
+            "students": pg.student_list(),
+            "question": question_text(pg.question),
+        })
+    return result
+
+
+# =============================================================================
+# Layout
+# =============================================================================
+
+@lru_cache(maxsize=None)
+def _logo(name: str) -> Optional[PdfImage]:
+    path = finders.find(f"images/{name}")
+    return PdfImage.from_png(path) if path else None
+
+
+def _logo_images() -> Dict[str, PdfImage]:
+    """Logos by resource name, used to restore cached pages."""
+    return {image.name: image for image in map(_logo, LOGOS) if image}
+
+
+class _CoverLayout:
+    """Lays out one saved page, starting new PDF pages when content overflows."""
+
+    def __init__(self, data: Dict[str, Any]):
+        self.data = data
+        self.pages: List[PdfCanvas] = []
+        self.canvas: PdfCanvas = None
+        self.y = 0.0
+
+    def new_page(self) -> None:
+        self.canvas = PdfCanvas(A4)
+        self.canvas.rect(MARGIN - 4, MARGIN - 4, PAGE_W - 2 * MARGIN + 8, PAGE_H - 2 * MARGIN + 8, width=2.5)
+        self.canvas.rect(MARGIN, MARGIN, PAGE_W - 2 * MARGIN, PAGE_H - 2 * MARGIN, width=0.8)
+        self.pages.append(self.canvas)
+        self.y = MARGIN + PADDING + 16
+
+    def ensure_space(self, height: float) -> bool:
+        """Start a new page if ``height`` does not fit; True when it did."""
+        if self.y + height <= CONTENT_BOTTOM:
+            return False
+        self.new_page()
+        return True
+
+    def heading(self) -> None:
+        logo_size = 72
+        top = self.y
+        for name, x in zip(LOGOS, (CONTENT_LEFT, CONTENT_RIGHT - logo_size)):
+            image = _logo(name)
+            if image:
+                h = logo_size * image.height / image.width
+                self.canvas.image(image, x, top + (logo_size - h) / 2, logo_size, h)
+
+        size, line_h = 13.5, 19
+        text_top = top + (logo_size - line_h * len(HEADING_LINES)) / 2 + size
+        for i, line in enumerate(HEADING_LINES):
+            self.canvas.text_centered(PAGE_W / 2, text_top + i * line_h, line, FONT_BOLD, size)
+        self.y = top + logo_size + 30
+
+    def field(self, label: str, value: str) -> None:
+        line_h = FIELD_SIZE * LINE_GAP
+        lines = wrap_text(value, FONT_BOLD, FIELD_SIZE, CONTENT_RIGHT - CONTENT_LEFT - LABEL_WIDTH)
+        self.ensure_space(line_h * len(lines))
+        self.canvas.text(CONTENT_LEFT, self.y + FIELD_SIZE, label, FONT_BOLD, FIELD_SIZE)
+        for i, line in enumerate(lines):
+            self.canvas.text(CONTENT_LEFT + LABEL_WIDTH, self.y + FIELD_SIZE + i * line_h, line, FONT_BOLD, FIELD_SIZE)
+        self.y += line_h * len(lines) + 7
+
+    def fields(self) -> None:
+        d = self.data
+        self.field("PROGRAM:", d["program"])
+        self.field("COURSE:", d["course"])
+        self.field("COURSE CODE:", d["code"])
+        self.field("CLASS:", d["class"])
+        self.field("FACILITATOR:", d["facilitator"])
+        self.field("TASK:", d["task"])
+        if d["group"]:
+            self.field("GROUP No:", d["groupno"])
+        self.field("SUBMISSION DATE:", d["subdate"])
+
+        if not d["group"]:
+            student = d["students"][0] if d["students"] else None
+            self.field("STUDENT NAME:", student.fullname if student else "N/A")
+            self.field("REG NO:", student.regnumber if student else "N/A")
+            self.field("SIGNATURE:", "...........................")
+
+    def table_header(self, columns: List[float]) -> None:
+        self.table_row(columns, ("S/N", "NAMES", "REGISTRATION NUMBER", "SIGNATURES"), FONT_BOLD)
+
+    def table_row(self, columns: List[float], cells: Sequence[str], font: str = FONT_REGULAR) -> None:
+        c = self.canvas
+        top, bottom = self.y, self.y + ROW_HEIGHT
+        c.line(columns[0], top, columns[-1], top, width=0.8)
+        c.line(columns[0], bottom, columns[-1], bottom, width=0.8)
+        for x in columns:
+            c.line(x, top, x, bottom, width=0.8)
+
+        baseline = top + (ROW_HEIGHT + TABLE_SIZE * 0.7) / 2
+        c.text_centered((columns[0] + columns[1]) / 2, baseline, cells[0], font, TABLE_SIZE)
+        for i, cell in enumerate(cells[1:], start=1):
+            width = columns[i + 1] - columns[i] - 6
+            c.text(columns[i] + 3, baseline, fit_text(cell, font, TABLE_SIZE, width), font, TABLE_SIZE)
+        self.y = bottom
+
+    def students_table(self) -> None:
+        table_w = (CONTENT_RIGHT - CONTENT_LEFT) * 0.9
+        left = (PAGE_W - table_w) / 2
+        # S/N, names, registration number, signatures
+        ratios = (0.08, 0.42, 0.30, 0.20)
+        columns = [left]
+        for r in ratios:
+            columns.append(columns[-1] + table_w * r)
+
+        self.y += 10
+        self.ensure_space(ROW_HEIGHT * 2)
+        self.table_header(columns)
+
+        students = self.data["students"]
+        if not students:
+            self.table_row(columns, ("", "No students selected", "", ""))
+        for i, student in enumerate(students, start=1):
+            if self.ensure_space(ROW_HEIGHT):
+                self.table_header(columns)
+            self.table_row(columns, (str(i), student.fullname, student.regnumber, ""))
+        self.y += 14
+
+    def question(self) -> None:
+        text = self.data["question"]
+        if not text:
+            return
+        size = 11.5
+        line_h = size * LINE_GAP
+        self.ensure_space(line_h * 2)
+        self.canvas.text(CONTENT_LEFT, self.y + size, "Question(s):", FONT_BOLD, size)
+        self.y += line_h + 4
+        for line in wrap_text(text, FONT_REGULAR, size, CONTENT_RIGHT - CONTENT_LEFT - 10):
+            self.ensure_space(line_h)
+            self.canvas.text(CONTENT_LEFT + 10, self.y + size, line, FONT_REGULAR, size)
+            self.y += line_h
+
+    def render(self) -> List[RenderedPage]:
+        self.new_page()
+        self.heading()
+        self.fields()
+        if self.data["group"] and self.data["table"]:
+            self.students_table()
+        else:
+            self.y += 10
+        self.question()
+        return [page.freeze() for page in self.pages]
+
+
+def render_cover(data: Dict[str, Any]) -> List[RenderedPage]:
+    """Rendered PDF pages for one cover, served from the cover cache when possible."""
+    key = cover_key(data, COVER_LAYOUT_VERSION)
+    return cover_cache.get_or_render(data["id"], key, lambda: _CoverLayout(data).render(), _logo_images())
+
+
+def iter_cover_canvases(pages: Iterable[Dict[str, Any]]) -> Iterator[RenderedPage]:
+    for data in pages:
+        yield from render_cover(data)
+
+
+def stream_covers_pdf(pages: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """PDF bytes for the given cover data, produced page by page."""
+    return PdfWriter().stream(iter_cover_canvases(pages))
@@ -0,0 +1,56 @@
+# Generated by Django 6.0 on 2026-10-17 10:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stationery', '0015_page_title'),
+        ('students', '0002_alter_student_created_at_alter_student_fullname_and_more'),
+    ]
+
+    operations = [
+        # Keep the JSON lists around under new names until 0017 has copied them
+        migrations.RenameField(
+            model_name='page',
+            old_name='students',
+            new_name='legacy_students',
+        ),
+        migrations.RenameField(
+            model_name='page',
+            old_name='streams',
+            new_name='legacy_streams',
+        ),
+        migrations.CreateModel(
+            name='PageStudent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('page', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='stationery.page')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='students.student')),
+            ],
+            options={
+                'verbose_name': 'Page Student',
+                'verbose_name_plural': 'Page Students',
+                'ordering': ['page', 'position'],
+                'constraints': [models.UniqueConstraint(fields=('page', 'student'), name='unique_page_student')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PageStream',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stream', models.CharField(db_index=True, max_length=100)),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('page', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='streams', to='stationery.page')),
+            ],
+            options={
+                'verbose_name': 'Page Stream',
+                'verbose_name_plural': 'Page Streams',
+                'ordering': ['page', 'position'],
+                'constraints': [models.UniqueConstraint(fields=('page', 'stream'), name='unique_page_stream')],
+            },
+        ),
+    ]
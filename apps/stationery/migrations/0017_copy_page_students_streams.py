@@ -0,0 +1,66 @@
+# Generated by Django 6.0 on 2026-10-17 10:06
+
+from django.db import migrations
+
+
+def _unique(values):
+    return list(dict.fromkeys(v for v in values if v not in (None, "")))
+
+
+def copy_lists_to_tables(apps, schema_editor):
+    Page = apps.get_model('stationery', 'Page')
+    PageStudent = apps.get_model('stationery', 'PageStudent')
+    PageStream = apps.get_model('stationery', 'PageStream')
+    Student = apps.get_model('students', 'Student')
+
+    existing = set(Student.objects.values_list('id', flat=True))
+    student_rows, stream_rows = [], []
+    for page in Page.objects.only('id', 'legacy_students', 'legacy_streams').iterator():
+        student_ids = []
+        for value in page.legacy_students or []:
+            try:
+                student_ids.append(int(value))
+            except (TypeError, ValueError):
+                continue
+        # Ids of students deleted since the page was saved are dropped
+        student_ids = [sid for sid in _unique(student_ids) if sid in existing]
+        student_rows.extend(
+            PageStudent(page_id=page.id, student_id=sid, position=pos)
+            for pos, sid in enumerate(student_ids)
+        )
+        stream_rows.extend(
+            PageStream(page_id=page.id, stream=stream, position=pos)
+            for pos, stream in enumerate(_unique(str(s).strip() for s in page.legacy_streams or [] if s is not None))
+        )
+
+    PageStudent.objects.bulk_create(student_rows, batch_size=500)
+    PageStream.objects.bulk_create(stream_rows, batch_size=500)
+
+
+def copy_tables_to_lists(apps, schema_editor):
+    Page = apps.get_model('stationery', 'Page')
+    PageStudent = apps.get_model('stationery', 'PageStudent')
+    PageStream = apps.get_model('stationery', 'PageStream')
+
+    students, streams = {}, {}
+    for page_id, student_id in PageStudent.objects.order_by('page_id', 'position').values_list('page_id', 'student_id'):
+        students.setdefault(page_id, []).append(str(student_id))
+    for page_id, stream in PageStream.objects.order_by('page_id', 'position').values_list('page_id', 'stream'):
+        streams.setdefault(page_id, []).append(stream)
+
+    for page in Page.objects.only('id').iterator():
+        Page.objects.filter(id=page.id).update(
+            legacy_students=students.get(page.id, []),
+            legacy_streams=streams.get(page.id, []),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stationery', '0016_pagestudent_pagestream'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_lists_to_tables, copy_tables_to_lists),
+    ]
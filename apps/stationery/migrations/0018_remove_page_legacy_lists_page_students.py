@@ -0,0 +1,27 @@
+# Generated by Django 6.0 on 2026-10-17 10:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stationery', '0017_copy_page_students_streams'),
+        ('students', '0002_alter_student_created_at_alter_student_fullname_and_more'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='page',
+            name='legacy_students',
+        ),
+        migrations.RemoveField(
+            model_name='page',
+            name='legacy_streams',
+        ),
+        migrations.AddField(
+            model_name='page',
+            name='students',
+            field=models.ManyToManyField(related_name='pages', through='stationery.PageStudent', to='students.student'),
+        ),
+    ]
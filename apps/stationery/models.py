@@ -14,6 +14,15 @@ class Question(models.Model):
     def __str__(self):
         return self.created_at
 
+class PageQuerySet(models.QuerySet):
+    def with_details(self):
+        """Program, course, facilitator, students and streams in three queries in total."""
+        return self.select_related('program', 'course__facilitator').prefetch_related(
+            models.Prefetch('pagestudent_set', queryset=PageStudent.objects.select_related('student')),
+            'streams',
+        )
+
+
 # coverpage model
 class Page(models.Model):
     id = models.AutoField(primary_key=True)
@@ -22,17 +31,61 @@ class Page(models.Model):
     task = models.CharField(max_length=255, db_index=True)
     groupno = models.DecimalField(max_digits=3, decimal_places=0)
     submitdate = models.CharField(max_length=100, null=True, default=None)
-    streams = models.JSONField(null=True, default=None)
-    students = models.JSONField(null=True, default=None)
+    students = models.ManyToManyField('students.Student', through='PageStudent', related_name='pages')
     table = models.BooleanField(default=True)
     program = models.ForeignKey('programs.Program', on_delete=models.SET_NULL, null=True, related_name='pages')
     course = models.ForeignKey('courses.Course', on_delete=models.SET_NULL, null=True, related_name='pages')
     question = models.TextField(null=True, blank=True, default=None)
-    
+
+    objects = PageQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Page"
         verbose_name_plural = "Pages"
         ordering = ["-created_at"]
 
     def __str__(self):
-        return self.task
\ No newline at end of file
+        return self.task
+
+    def student_list(self):
+        """Students in table order (uses the with_details() prefetch when present)."""
+        return [row.student for row in self.pagestudent_set.all()]
+
+    def stream_list(self):
+        return [row.stream for row in self.streams.all()]
+
+
+# students listed on a coverpage, in table order
+class PageStudent(models.Model):
+    page = models.ForeignKey(Page, on_delete=models.CASCADE)
+    student = models.ForeignKey('students.Student', on_delete=models.CASCADE)
+    position = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Page Student"
+        verbose_name_plural = "Page Students"
+        ordering = ["page", "position"]
+        constraints = [
+            models.UniqueConstraint(fields=["page", "student"], name="unique_page_student"),
+        ]
+
+    def __str__(self):
+        return f"{self.page_id}:{self.student_id}"
+
+
+# program streams (A, B, ...) of a coverpage
+class PageStream(models.Model):
+    page = models.ForeignKey(Page, on_delete=models.CASCADE, related_name='streams')
+    stream = models.CharField(max_length=100, db_index=True)
+    position = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Page Stream"
+        verbose_name_plural = "Page Streams"
+        ordering = ["page", "position"]
+        constraints = [
+            models.UniqueConstraint(fields=["page", "stream"], name="unique_page_stream"),
+        ]
+
+    def __str__(self):
+        return self.stream
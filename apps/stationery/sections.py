@@ -0,0 +1,173 @@
+"""
+The five selectable lists on the cover page (students, programs, courses,
+questions, saved pages): their queries, keyset paging and the bootstrap
+payload the page is first rendered from.
+
+Rows are fetched as ``.values()`` projections, so no model instances are
+built and related names (the course facilitator) come from the same query.
+The first pages of the rarely-changing program and course lists are cached
+and dropped by the receivers in signals.py whenever a program, course or
+facilitator changes.
+"""
+from typing import Any, Dict, Optional
+
+from django.core.cache import cache
+from django.db.models import Q
+
+from apps.courses.models import Course
+from apps.dashboard import counters
+from apps.programs.models import Program
+from apps.search.fts import search_q
+from apps.students.models import Student
+from utils import keyset
+from utils.softdelete import live_related
+
+from .models import Page, Question
+
+# Rows per section page on the first render
+SECTION_PAGE_SIZE = 10
+
+REFERENCE_LISTS_CACHE_KEY = "stationery:cover_reference_lists"
+REFERENCE_LISTS_TTL = 600
+
+# Sections whose first page is cached
+REFERENCE_SECTIONS = ('programs', 'courses')
+
+# Cover page section lists: base queryset, keyset ordering (unique last
+# field), the projected values, search fields and the dashboard counter
+# holding the unfiltered total
+COVER_SECTIONS = {
+    'students': {
+        'queryset': lambda: Student.objects.values('id', 'fullname', 'regnumber'),
+        'ordering': ('fullname', 'id'),
+        'search_fields': ['fullname', 'regnumber'],
+        'fulltext': (('student', 'id'),),
+        'counter': 'students',
+    },
+    'programs': {
+        'queryset': lambda: Program.objects.values('id', 'name', 'abbrev'),
+        'ordering': ('name', 'id'),
+        'search_fields': ['name', 'abbrev'],
+        'fulltext': (('program_name', 'id'),),
+        'counter': 'programs',
+    },
+    'courses': {
+        'queryset': lambda: Course.objects.values('id', 'name', 'code', facilitator_name=live_related('facilitator', 'name')),
+        'ordering': ('name', 'id'),
+        'search_fields': ['name', 'code', 'facilitator_name'],
+        'fulltext': (('course', 'id'), ('facilitator_name', 'facilitator_id')),
+        'counter': 'courses',
+        'serializer': lambda row: {
+            'id': row['id'],
+            'name': row['name'],
+            'code': row['code'],
+            'facilitator': row['facilitator_name'],
+        },
+    },
+    'questions': {
+        'queryset': lambda: Question.objects.values('id', 'content', 'created_at'),
+        'ordering': ('-created_at', '-id'),
+        'search_fields': ['content'],
+        'fulltext': (('question', 'id'),),
+        'serializer': lambda row: {'id': row['id'], 'content': row['content']},
+    },
+    'pages': {
+        'queryset': lambda: Page.objects.values('id', 'task', 'title', 'created_at'),
+        'ordering': ('-created_at', '-id'),
+        'search_fields': ['task', 'title'],
+        'serializer': lambda row: {'id': row['id'], 'task': row['task'], 'title': row['title']},
+    },
+}
+
+
+def section_queryset(section_type: str, search_query: str = '', filters: Optional[Dict[str, str]] = None):
+    """Filtered queryset of one section list"""
+    config = COVER_SECTIONS[section_type]
+    queryset = config['queryset']()
+    filters = filters or {}
+
+    # Saved pages can be narrowed to one student's or one stream's pages
+    if section_type == 'pages':
+        student_id = (filters.get('student') or '').strip()
+        stream = (filters.get('stream') or '').strip()
+        if student_id.isdigit():
+            queryset = queryset.filter(pagestudent__student_id=int(student_id))
+        if stream:
+            queryset = queryset.filter(streams__stream=stream)
+
+    # Apply search filter (FTS5 index when available, LIKE otherwise)
+    if search_query:
+        fts_q = search_q(config['fulltext'], search_query) if config.get('fulltext') else None
+        if fts_q is None:
+            fts_q = Q()
+            for field in config['search_fields']:
+                fts_q |= Q(**{f'{field}__icontains': search_query})
+        queryset = queryset.filter(fts_q)
+    return queryset
+
+
+def paginate_section(section_type: str, cursor: str = None, direction: str = 'next', offset: int = 0,
+                     search_query: str = '', per_page: int = 10, filters: Optional[Dict[str, str]] = None,
+                     totals: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    """
+    One keyset page of a section list as {'items': [...], 'pagination': {...}}.
+    ``offset`` is the client's position of the first row on the requested
+    page and only feeds the "Showing x to y" label; it never reaches the
+    query. ``totals`` is a counters.read() result the caller already has.
+    """
+    config = COVER_SECTIONS[section_type]
+    queryset = section_queryset(section_type, search_query, filters)
+    page = keyset.paginate(queryset, config['ordering'], per_page, cursor, direction)
+
+    if not page.has_previous:
+        offset = 0
+    if not page.has_previous and not page.has_next:
+        # The whole list fits on this page
+        total_count, exact = len(page.items), True
+    elif not search_query and not filters and config.get('counter'):
+        total_count, exact = (totals or counters.read())[config['counter']], True
+    else:
+        total_count, exact = keyset.capped_count(queryset)
+    total_count = max(total_count, offset + len(page.items))
+
+    serializer = config.get('serializer')
+    return {
+        'items': [serializer(row) for row in page.items] if serializer else page.items,
+        'pagination': {
+            'per_page': per_page,
+            'has_next': page.has_next,
+            'has_previous': page.has_previous,
+            'next_cursor': page.next_cursor,
+            'prev_cursor': page.prev_cursor,
+            'total_count': total_count,
+            'total_label': f"{total_count:,}" if exact else f"{total_count:,}+",
+            'start_index': offset + 1 if page.items else 0,
+            'end_index': offset + len(page.items),
+        }
+    }
+
+
+def bootstrap() -> Dict[str, Dict[str, Any]]:
+    """
+    First page of every section, keyed by section type. Uncached this is
+    one counters query, one query per section and at most two capped
+    counts; the program and course pages usually come from the cache.
+    """
+    per_page = SECTION_PAGE_SIZE
+    totals = counters.read()
+    payload = cache.get(REFERENCE_LISTS_CACHE_KEY)
+    if payload is None:
+        payload = {
+            section_type: paginate_section(section_type, per_page=per_page, totals=totals)
+            for section_type in REFERENCE_SECTIONS
+        }
+        cache.set(REFERENCE_LISTS_CACHE_KEY, payload, REFERENCE_LISTS_TTL)
+
+    for section_type in COVER_SECTIONS:
+        if section_type not in payload:
+            payload[section_type] = paginate_section(section_type, per_page=per_page, totals=totals)
+    return {section_type: payload[section_type] for section_type in COVER_SECTIONS}
+
+
+def invalidate_reference_lists() -> None:
+    cache.delete(REFERENCE_LISTS_CACHE_KEY)
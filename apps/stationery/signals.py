@@ -0,0 +1,147 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from apps.courses.models import Course
+from apps.dashboard import counters
+from apps.dashboard.bulk import bulk_deleted, bulk_deleting, bulk_saved
+from apps.facilitators.models import Facilitator
+from apps.programs.models import Program
+from apps.students.models import Student
+
+from . import sections
+from .autocomplete import autocomplete
+from .cover_cache import cover_cache
+from .models import Page
+
+
+# =============================================================================
+# Rendered cover cache invalidation
+# =============================================================================
+# Covers are cached under a content hash, so stale entries are never served;
+# these receivers only free the entries of affected pages early. Referenced
+# rows use pre_delete because SET_NULL clears Page.program / Page.course
+# before post_delete runs. PageStudent / PageStream get no receivers so
+# that student deletes can still cascade to them with a single DELETE.
+
+def _evict_pages(**lookup) -> None:
+    for page_id in Page.objects.filter(**lookup).values_list("id", flat=True):
+        cover_cache.evict_page(page_id)
+
+
+@receiver(post_save, sender=Page)
+@receiver(post_delete, sender=Page)
+def evict_page_cover(sender, instance, **kwargs):
+    cover_cache.evict_page(instance.id)
+
+
+@receiver(post_save, sender=Student)
+def evict_student_covers(sender, instance, **kwargs):
+    _evict_pages(pagestudent__student_id=instance.id)
+
+
+@receiver(post_save, sender=Program)
+@receiver(pre_delete, sender=Program)
+def evict_program_covers(sender, instance, **kwargs):
+    if not counters.is_suspended():
+        _evict_pages(program_id=instance.id)
+
+
+@receiver(post_save, sender=Course)
+@receiver(pre_delete, sender=Course)
+def evict_course_covers(sender, instance, **kwargs):
+    if not counters.is_suspended():
+        _evict_pages(course_id=instance.id)
+
+
+@receiver(post_save, sender=Facilitator)
+@receiver(pre_delete, sender=Facilitator)
+def evict_facilitator_covers(sender, instance, **kwargs):
+    if not counters.is_suspended():
+        _evict_pages(course__facilitator_id=instance.id)
+
+
+# pages referencing a chunk of rows hidden by bulk.tombstone() or purged by bulk.delete()
+BULK_EVICT_LOOKUPS = {
+    Program: "program_id__in",
+    Course: "course_id__in",
+    Facilitator: "course__facilitator_id__in",
+}
+
+
+@receiver(bulk_deleting)
+def evict_bulk_deleted_covers(sender, ids, **kwargs):
+    lookup = BULK_EVICT_LOOKUPS.get(sender)
+    if lookup:
+        _evict_pages(**{lookup: ids})
+
+
+@receiver(bulk_saved)
+def evict_bulk_updated_covers(sender, updated, **kwargs):
+    lookup = "pagestudent__student_id__in" if sender is Student else BULK_EVICT_LOOKUPS.get(sender)
+    if lookup and updated:
+        _evict_pages(**{lookup: updated})
+
+
+# =============================================================================
+# Cached cover page reference lists
+# =============================================================================
+
+@receiver(post_save, sender=Program)
+@receiver(post_delete, sender=Program)
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+@receiver(post_save, sender=Facilitator)
+@receiver(post_delete, sender=Facilitator)
+def invalidate_reference_lists(sender, **kwargs):
+    if not counters.is_suspended():
+        sections.invalidate_reference_lists()
+
+
+# =============================================================================
+# Typeahead index
+# =============================================================================
+
+AUTOCOMPLETE_PICKERS = {Student: "students", Program: "programs", Course: "courses"}
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=Program)
+@receiver(post_save, sender=Course)
+def index_picker_row(sender, instance, **kwargs):
+    if not counters.is_suspended():
+        autocomplete.refresh(AUTOCOMPLETE_PICKERS[sender], [instance.id])
+
+
+@receiver(post_delete, sender=Student)
+@receiver(post_delete, sender=Program)
+@receiver(post_delete, sender=Course)
+def unindex_picker_row(sender, instance, **kwargs):
+    if not counters.is_suspended():
+        autocomplete.remove(AUTOCOMPLETE_PICKERS[sender], instance.id)
+
+
+@receiver(post_save, sender=Facilitator)
+@receiver(post_delete, sender=Facilitator)
+def reindex_facilitator_courses(sender, **kwargs):
+    # Course matches carry the facilitator name
+    if not counters.is_suspended():
+        autocomplete.invalidate("courses")
+
+
+@receiver(bulk_saved)
+def refresh_after_bulk_save(sender, created, updated, **kwargs):
+    if sender in (Program, Course, Facilitator):
+        sections.invalidate_reference_lists()
+    if sender in AUTOCOMPLETE_PICKERS:
+        autocomplete.refresh(AUTOCOMPLETE_PICKERS[sender], list(created) + list(updated))
+    elif sender is Facilitator and updated:
+        autocomplete.invalidate("courses")
+
+
+@receiver(bulk_deleted)
+def refresh_after_bulk_delete(sender, **kwargs):
+    if sender in (Program, Course, Facilitator):
+        sections.invalidate_reference_lists()
+    picker = AUTOCOMPLETE_PICKERS.get(sender) or ("courses" if sender is Facilitator else None)
+    if picker:
+        autocomplete.invalidate(picker)
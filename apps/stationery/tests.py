@@ -1,3 +1,370 @@
-from django.test import TestCase
+import re
+import tempfile
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.courses.models import Course
+from apps.facilitators.models import Facilitator
+from apps.programs.models import Program
+from apps.students.models import Student
+from utils import keyset
+
+from . import cover_pdf, views
+from .autocomplete import Autocomplete, PrefixIndex
+from .cover_cache import cover_cache
+from .cover_pdf import load_pages, question_text, render_cover
+from .models import Page, PageStudent, Question
+from .views import CrudServices
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # runs of equal names, so pages start and end inside a tie
+        names = ["Amina"] * 7 + ["Baraka"] * 5 + ["Chausiku"] * 6
+        Student.objects.bulk_create(
+            Student(fullname=name, regnumber=f"TPSD/{i:03d}") for i, name in enumerate(names)
+        )
+        stamp = timezone.now()
+        Question.objects.bulk_create(Question(content=f"Question {i}") for i in range(9))
+        Question.objects.update(created_at=stamp)
+
+    def walk(self, queryset, ordering, per_page):
+        """Ids of every page reached by following next_cursor, and the last page."""
+        pages = []
+        page = keyset.paginate(queryset, ordering, per_page)
+        while True:
+            pages.append([row.id for row in page.items])
+            if not page.has_next:
+                return pages, page
+            page = keyset.paginate(queryset, ordering, per_page, page.next_cursor, "next")
+
+    def test_forward_pages_cover_every_row_once(self):
+        ordering = ("fullname", "id")
+        expected = list(Student.objects.order_by(*ordering).values_list("id", flat=True))
+        for per_page in (1, 4, 5, 18, 50):
+            with self.subTest(per_page=per_page):
+                pages, _ = self.walk(Student.objects.all(), ordering, per_page)
+                self.assertEqual([obj_id for ids in pages for obj_id in ids], expected)
+                self.assertTrue(all(len(ids) == per_page for ids in pages[:-1]))
+
+    def test_backward_pages_mirror_forward_pages(self):
+        ordering = ("fullname", "id")
+        pages, page = self.walk(Student.objects.all(), ordering, 4)
+        seen = [pages[-1]]
+        while page.has_previous:
+            page = keyset.paginate(Student.objects.all(), ordering, 4, page.prev_cursor, "prev")
+            seen.append([row.id for row in page.items])
+        self.assertEqual(seen[::-1], pages)
+
+    def test_descending_order_with_equal_timestamps(self):
+        ordering = ("-created_at", "-id")
+        expected = list(Question.objects.order_by(*ordering).values_list("id", flat=True))
+        pages, _ = self.walk(Question.objects.all(), ordering, 4)
+        self.assertEqual([obj_id for ids in pages for obj_id in ids], expected)
+
+    def test_values_rows_and_bad_cursors(self):
+        queryset = Student.objects.values("id", "fullname")
+        first = keyset.paginate(queryset, ("fullname", "id"), 3)
+        second = keyset.paginate(queryset, ("fullname", "id"), 3, first.next_cursor)
+        self.assertNotEqual(first.items[-1]["id"], second.items[0]["id"])
+        self.assertTrue(second.has_previous)
+
+        for cursor in ("not-a-cursor", keyset.encode_cursor(["only one value"])):
+            with self.subTest(cursor=cursor):
+                page = keyset.paginate(queryset, ("fullname", "id"), 3, cursor)
+                self.assertEqual(page.items, first.items)
+                self.assertFalse(page.has_previous)
+
+    def test_capped_count(self):
+        self.assertEqual(keyset.capped_count(Student.objects.all(), cap=100), (18, True))
+        self.assertEqual(keyset.capped_count(Student.objects.all(), cap=10), (10, False))
+
+
+class QuestionTextTests(SimpleTestCase):
+    def test_block_tags_break_lines(self):
+        cases = (
+            ("Explain<div>the filing cycle</div>", "Explain\nthe filing cycle"),
+            ("<p>First</p><p>Second</p>", "First\nSecond"),
+            ("One<br>Two<BR/>Three", "One\nTwo\nThree"),
+            ("List:<ul><li>files</li><li>folders</li></ul>", "List:\n• files\n• folders"),
+            ("<h2>Part A</h2>Answer <b>all</b>&nbsp;questions", "Part A\nAnswer all questions"),
+            ("<div><br></div>", ""),
+            (None, ""),
+        )
+        for markup, expected in cases:
+            with self.subTest(markup=markup):
+                self.assertEqual(question_text(markup), expected)
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class AutocompleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.john = Student.objects.create(fullname="John Mark Mushi", regnumber="TPSD/001")
+        Student.objects.create(fullname="Mary Markus", regnumber="TPSD/002")
+        Program.objects.create(name="Records Management", abbrev="BRAIM")
+
+    def setUp(self):
+        self.autocomplete = Autocomplete()
+
+    def names(self, query, picker="students"):
+        return [item.get("fullname", item.get("name")) for item in self.autocomplete.search(picker, query)]
+
+    def test_prefixes_of_words_and_keys(self):
+        self.assertEqual(self.names("mark"), ["John Mark Mushi", "Mary Markus"])
+        self.assertEqual(self.names("MARK MU"), ["John Mark Mushi"])
+        self.assertEqual(self.names("tpsd002"), ["Mary Markus"])
+        self.assertEqual(self.names("braim", "programs"), ["Records Management"])
+        self.assertEqual(self.names("  "), [])
+
+    def test_updates_swap_the_array_searches_read(self):
+        index = self.autocomplete.index("students")
+        entries = index._entries
+        before = list(entries)
+
+        index.put({"id": self.john.id, "fullname": "John Peter", "regnumber": "TPSD/001"})
+
+        self.assertIsNot(index._entries, entries)
+        self.assertEqual(entries, before)
+        self.assertEqual(self.names("mark"), ["Mary Markus"])
+        self.assertEqual(self.names("peter"), ["John Peter"])
+
+        index.remove(self.john.id)
+        self.assertEqual(self.names("tpsd001"), [])
+
+    def test_refresh_indexes_a_batch_at_once(self):
+        index = self.autocomplete.index("students")
+        students = Student.objects.bulk_create(
+            Student(fullname=f"Neema Kombo {i}", regnumber=f"TPSD/1{i:02d}") for i in range(20)
+        )
+        Student.objects.filter(id=self.john.id).update(fullname="John Kombo")
+
+        with mock.patch.object(PrefixIndex, "put", side_effect=AssertionError("one row at a time")), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.autocomplete.refresh("students", [s.id for s in students] + [self.john.id])
+
+        self.assertEqual(index._entries, sorted(index._entries))
+        self.assertEqual(len(self.names("kombo")), 10)
+        self.assertEqual(len(self.autocomplete.search("students", "kombo", 50)), 21)
+        self.assertEqual(self.names("mark"), ["Mary Markus"])
+
+    def test_changes_rebuild_only_their_picker(self):
+        students = self.autocomplete.index("students")
+        programs = self.autocomplete.index("programs")
+
+        # another process saves a program
+        with self.captureOnCommitCallbacks(execute=True):
+            Program.objects.create(name="Accounts", abbrev="BAC")
+
+        self.assertIs(self.autocomplete.index("students"), students)
+        self.assertIsNot(self.autocomplete.index("programs"), programs)
+        self.assertEqual(self.names("acc", "programs"), ["Accounts"])
+
+
+class CoverPageSaveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.program = Program.objects.create(name="Records Management", abbrev="BRAIM")
+        cls.students = Student.objects.bulk_create(
+            Student(fullname=name, regnumber=f"TPSD/{i:03d}") for i, name in enumerate(["Amina", "Baraka", "Chausiku"])
+        )
+
+    def save(self, **data):
+        return CrudServices.save_cover_page({"task": "Assignment", "grpno": "1", **data})
+
+    def test_students_and_streams_are_stored_in_order(self):
+        a, b, c = (s.id for s in self.students)
+        result = self.save(students=f"{c},{a},{c},999999,x,{b}", streams="B, A,B,,", prog="BRAIM", table="true")
+
+        self.assertTrue(result["success"])
+        page = Page.objects.get()
+        self.assertEqual(list(page.pagestudent_set.values_list("student_id", "position")), [(c, 0), (a, 1), (b, 2)])
+        self.assertEqual(list(page.streams.values_list("stream", "position")), [("B", 0), ("A", 1)])
+        self.assertEqual(page.program_id, self.program.id)
+
+    def test_batch_load_and_lookups(self):
+        a, b, c = (s.id for s in self.students)
+        self.save(task="First", students=f"{b},{a}", streams="A")
+        self.save(task="Second", students=f"{c}", streams="A,B")
+        first, second = Page.objects.order_by("id")
+
+        with self.assertNumQueries(3):
+            pages = CrudServices.load_pages_info([first.id, second.id, 999999])
+        self.assertEqual(set(pages), {first.id, second.id})
+        self.assertEqual([s["fullname"] for s in pages[first.id]["students"]], ["Baraka", "Amina"])
+        self.assertEqual(pages[second.id]["streams"], ["A", "B"])
+        self.assertEqual(pages[second.id]["prog"], "N/A")
+
+        batch = CrudServices.load_batch_page_info(f"{second.id},x,{first.id}")
+        self.assertEqual(set(batch["pages"]), {first.id, second.id})
+        self.assertEqual(CrudServices.load_saved_page_info(999999), {"success": False, "sms": "Page not found."})
+
+        self.assertEqual({pg["task"] for pg in CrudServices.stream_pages("A")["pages"]}, {"First", "Second"})
+        self.assertEqual([pg["task"] for pg in CrudServices.stream_pages("B")["pages"]], ["Second"])
+        self.assertEqual([pg["task"] for pg in CrudServices.student_page_history(a)["pages"]], ["First"])
+
+    def test_long_stream_names_are_kept(self):
+        result = self.save(streams="Accountancy Evening, BRAIM-2A-MORNING,BRAIM-2A-MORNING2,BRAIM-2A-MORNING")
+
+        self.assertTrue(result["success"])
+        page = Page.objects.get()
+        self.assertEqual(page.stream_list(), ["Accountancy Evening", "BRAIM-2A-MORNING", "BRAIM-2A-MORNING2"])
+        found = CrudServices.stream_pages(" Accountancy Evening ")
+        self.assertEqual([pg["id"] for pg in found["pages"]], [page.id])
+        self.assertEqual(CrudServices.stream_pages("Accountanc")["pages"], [])
+
+    def test_too_long_stream_names_are_rejected(self):
+        result = self.save(streams="A," + "B" * 101)
+        self.assertEqual(result, {"success": False, "sms": "Stream names can be at most 100 characters."})
+        self.assertFalse(Page.objects.exists())
+
+
+class CoverPdfTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username="staff", fullname="Office Staff", shop=None)
+        program = Program.objects.create(name="Records Management", abbrev="BRAIM")
+        course = Course.objects.create(
+            name="Typing", code="SST01", facilitator=Facilitator.objects.create(name="Madam Kadori"),
+        )
+        students = Student.objects.bulk_create(
+            Student(fullname=f"Student Number {i}", regnumber=f"TPSD/{i:03d}") for i in range(120)
+        )
+        cls.short = Page.objects.create(task="Assignment", groupno=1, program=program, course=course,
+                                        question="<p>Explain</p><ul><li>files</li></ul>")
+        cls.long = Page.objects.create(task="Group work", groupno=2, program=program, course=course)
+        PageStudent.objects.bulk_create(
+            [PageStudent(page=cls.short, student=s, position=i) for i, s in enumerate(students[:3])]
+            + [PageStudent(page=cls.long, student=s, position=i) for i, s in enumerate(students)]
+        )
+
+    def setUp(self):
+        self.enterContext(self.settings(COVER_CACHE_DIR=self.enterContext(tempfile.TemporaryDirectory())))
+        cover_cache.clear()
+        self.addCleanup(cover_cache.clear)
+        self.client.force_login(self.user)
+
+    def test_saved_pages_print_as_one_pdf(self):
+        response = self.client.get(reverse("cover_pdf"), {"ids": f"{self.short.id},{self.long.id}"})
+
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        pdf = b"".join(response.streaming_content)
+        self.assertTrue(pdf.startswith(b"%PDF-"))
+        self.assertTrue(pdf.rstrip().endswith(b"%%EOF"))
+        pages = len(re.findall(rb"/Type /Page\b", pdf))
+        # one page for the short cover, the long student table runs over
+        self.assertGreater(pages, 2)
+        self.assertIn(f"/Count {pages}".encode(), pdf)
+
+    def test_no_pages_selected(self):
+        response = self.client.get(reverse("cover_pdf"), {"ids": "999999"})
+        self.assertEqual(response.status_code, 404)
+
+
+class CoverCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.program = Program.objects.create(name="Records Management", abbrev="BRAIM")
+        cls.student = Student.objects.create(fullname="Amina Juma", regnumber="TPSD/001", program=cls.program)
+        cls.page = Page.objects.create(task="Assignment", groupno=1, program=cls.program)
+        PageStudent.objects.create(page=cls.page, student=cls.student, position=0)
+
+    def setUp(self):
+        self.directory = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.enterContext(self.settings(COVER_CACHE_DIR=self.directory))
+        cover_cache.clear()
+        self.addCleanup(cover_cache.clear)
+        self.render = self.enterContext(
+            mock.patch.object(cover_pdf._CoverLayout, "render", autospec=True, side_effect=cover_pdf._CoverLayout.render)
+        )
+
+    def cover(self):
+        return render_cover(load_pages([self.page.id])[0])
+
+    def cached_files(self):
+        return list(self.directory.glob("*/*.bin"))
+
+    def test_hits_are_served_from_memory_then_disk(self):
+        first = self.cover()
+        self.assertIs(self.cover(), first)
+
+        # a fresh process only has the file
+        cover_cache._memory.clear()
+        again = self.cover()
+        self.assertEqual([page.content() for page in again], [page.content() for page in first])
+        self.assertEqual(self.render.call_count, 1)
+        self.assertEqual(len(self.cached_files()), 1)
+
+    def test_edits_evict_the_old_cover(self):
+        self.cover()
+        old = self.cached_files()
+
+        self.student.fullname = "Amina Juma Said"
+        self.student.save()
+        self.assertEqual(self.cached_files(), [])
+        self.assertEqual(cover_cache._memory, {})
+
+        self.cover()
+        self.assertEqual(self.render.call_count, 2)
+        self.assertNotEqual(self.cached_files(), old)
+
+        # an edit the signals do not see still changes the key
+        Program.objects.filter(id=self.program.id).update(name="Records and Archives")
+        self.cover()
+        self.assertEqual(self.render.call_count, 3)
+        self.assertEqual(len(self.cached_files()), 1)
+
+
+class PageInfoEndpointTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username="staff", fullname="Office Staff", shop=None)
+        program = Program.objects.create(name="Records Management", abbrev="BRAIM")
+        course = Course.objects.create(
+            name="Typing", code="SST01", facilitator=Facilitator.objects.create(name="Madam Kadori"),
+        )
+        students = Student.objects.bulk_create(
+            Student(fullname=f"Student Number {i}", regnumber=f"TPSD/{i:03d}") for i in range(12)
+        )
+        cls.pages = Page.objects.bulk_create(
+            Page(task=f"Assignment {i}", groupno=i, program=program, course=course) for i in range(6)
+        )
+        PageStudent.objects.bulk_create(
+            PageStudent(page=page, student=student, position=j)
+            for i, page in enumerate(cls.pages) for j, student in enumerate(students[i * 2:i * 2 + 2])
+        )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def fetch(self, pages):
+        ids = ",".join(str(pg.id) for pg in pages)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse("cover_actions"), {"pages_info": ids})
+        return response.json(), len(queries)
+
+    def test_query_count_does_not_grow_with_pages(self):
+        one, one_queries = self.fetch(self.pages[:1])
+        payload, queries = self.fetch(self.pages)
+
+        self.assertEqual(queries, one_queries)
+        self.assertTrue(payload["success"])
+        self.assertEqual(set(payload["pages"]), {str(pg.id) for pg in self.pages})
+        info = payload["pages"][str(self.pages[5].id)]
+        self.assertEqual((info["class"], info["code"], info["facil"]), ("BRAIM", "SST01", "Madam Kadori"))
+        self.assertEqual([s["regnumber"] for s in info["students"]], ["TPSD/010", "TPSD/011"])
+        self.assertEqual(one["pages"][str(self.pages[0].id)], payload["pages"][str(self.pages[0].id)])
+
+    def test_batch_is_capped(self):
+        with mock.patch.object(views, "PAGE_INFO_BATCH_LIMIT", 4):
+            payload, _ = self.fetch(self.pages)
+        self.assertEqual(len(payload["pages"]), 4)
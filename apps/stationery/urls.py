@@ -4,4 +4,6 @@ from . import views as v
 urlpatterns = [
     path('', v.cover_page, name='cover_page'),
     path('actions/', v.cover_page_actions, name='cover_actions'),
+    path('autocomplete/', v.cover_autocomplete, name='cover_autocomplete'),
+    path('pdf/', v.cover_pages_pdf, name='cover_pdf'),
 ]
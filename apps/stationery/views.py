@@ -1,23 +1,29 @@
 from django.shortcuts import render
 from django.views.decorators.cache import never_cache
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse, HttpRequest, HttpResponse
-from typing import Dict, Any
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
-from django.db.models import Q
+from django.http import JsonResponse, HttpRequest, HttpResponse, StreamingHttpResponse
+from typing import Dict, Any, List
+from django.db import transaction
 import logging
 
-from apps.programs.models import Program
-from apps.courses.models import Course
 from apps.students.models import Student
-from apps.dashboard.models import Activity
-from .models import Question, Page
+from apps.dashboard import activity
+from apps.dashboard.refdata import refdata
+from .models import Question, Page, PageStudent, PageStream
+from . import sections
+from .autocomplete import PICKERS, autocomplete
+from .cover_pdf import load_pages, stream_covers_pdf
 
 from datetime import datetime
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+# Most saved pages returned by one batch page-info request
+PAGE_INFO_BATCH_LIMIT = 100
+
+STREAM_MAX_LENGTH = PageStream._meta.get_field("stream").max_length
+
 
 # CRUD Service
 class CrudServices:
@@ -34,7 +40,7 @@ class CrudServices:
 
             Question.objects.create(content=question)
 
-            Activity.objects.create(
+            activity.record(
                 categ="student",
                 title="New question saved",
                 maelezo="One question has been added to the system"
@@ -53,30 +59,39 @@ class CrudServices:
             groupno = 0 if data.get("grpno") == "" else data.get("grpno")
             subdate = None if data.get("subdate") in ("", "N/A") else data.get("subdate")
             streams = data.get("streams")  or ""
-            streams = streams.split(',') if streams else []
+            streams = list(dict.fromkeys(s.strip() for s in streams.split(',') if s.strip()))
             students = data.get("students") or ""
-            students = students.split(',') if students else []
+            students = list(dict.fromkeys(int(s) for s in students.split(',') if s.strip().isdigit()))
             prog = None if data.get("prog") in ("", "N/A") else data.get("prog")
             course = None if data.get("course") in ("", "N/A") else data.get("course")
             quen = None if data.get("question") == "" else data.get("question")
             table = data.get('table') == 'true'
 
-            if prog:
-                prog = Program.objects.filter(abbrev__iexact=prog).first()
-            
-            if course:
-                course = Course.objects.filter(code__iexact=course).first()
+            prog = refdata.id_for("programs", prog) if prog else None
+            course = refdata.id_for("courses", course) if course else None
 
             if task == "" or len(task) < 3:
                 return {"success": False, "sms": "Task name is too short"}
 
-            Page.objects.create(
-                task=task, groupno=groupno, submitdate=subdate,
-                streams=streams, students=students, program=prog,
-                course=course, question=quen, table=table, title=title
-            )
+            if any(len(stream) > STREAM_MAX_LENGTH for stream in streams):
+                return {"success": False, "sms": f"Stream names can be at most {STREAM_MAX_LENGTH} characters."}
+
+            existing = set(Student.objects.filter(id__in=students).values_list("id", flat=True))
+            with transaction.atomic():
+                page = Page.objects.create(
+                    task=task, groupno=groupno, submitdate=subdate, program_id=prog,
+                    course_id=course, question=quen, table=table, title=title
+                )
+                PageStudent.objects.bulk_create([
+                    PageStudent(page=page, student_id=sid, position=pos)
+                    for pos, sid in enumerate(s for s in students if s in existing)
+                ])
+                PageStream.objects.bulk_create([
+                    PageStream(page=page, stream=stream, position=pos)
+                    for pos, stream in enumerate(streams)
+                ])
 
-            Activity.objects.create(
+            activity.record(
                 categ="student",
                 title="New page saved",
                 maelezo="One page has been added to the system"
@@ -87,33 +102,79 @@ class CrudServices:
             logger.exception("Failed to save")
             return {"success": False, "sms": "Failed to save this page."}
         
+    @staticmethod
+    def _page_info(pg: Page) -> Dict[str, Any]:
+        """Page payload from a Page fetched with Page.objects.with_details()."""
+        program, course = pg.program, pg.course
+        facil = course.facilitator if course else None
+        return {
+            "success": True, "prog": program.name if program else 'N/A',
+            "course": course.name if course else 'N/A', "code": course.code if course else 'N/A',
+            "class": program.abbrev if program else 'N/A', "facil": facil.name if facil else 'N/A',
+            "task": pg.task, "grpno": pg.groupno, "subdate": pg.submitdate or None,
+            "students": [
+                {"id": s.id, "fullname": s.fullname, "regnumber": s.regnumber} for s in pg.student_list()
+            ],
+            "qn": pg.question or "", "sms": "Page loaded successfully!",
+            "streams": pg.stream_list(), "table": pg.table,
+            "progId": program.id if program else 0, "courseId": course.id if course else 0,
+        }
+
+    @staticmethod
+    def load_pages_info(page_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Payloads for many saved pages in a constant number of queries: the
+        pages with program/course/facilitator joined, their students and
+        their streams.
+        """
+        pages = Page.objects.with_details().filter(id__in=page_ids)
+        return {pg.id: CrudServices._page_info(pg) for pg in pages}
+
+    @staticmethod
+    def _page_summaries(queryset) -> List[Dict[str, Any]]:
+        return [
+            {"id": pg["id"], "title": pg["title"], "task": pg["task"], "created_at": pg["created_at"]}
+            for pg in queryset.order_by("-created_at").values("id", "title", "task", "created_at")
+        ]
+
+    @staticmethod
+    def student_page_history(student_id: int) -> Dict[str, Any]:
+        """Saved cover pages that list a student (indexed join on PageStudent)."""
+        try:
+            pages = CrudServices._page_summaries(Page.objects.filter(pagestudent__student_id=int(student_id)))
+            return {"success": True, "pages": pages}
+        except Exception as e:
+            logger.exception("Student page history failed")
+            return {"success": False, "sms": "Operation failed."}
+
+    @staticmethod
+    def stream_pages(stream: str) -> Dict[str, Any]:
+        """Saved cover pages for a program stream (indexed lookup on PageStream)."""
+        try:
+            pages = CrudServices._page_summaries(Page.objects.filter(streams__stream=stream.strip()))
+            return {"success": True, "pages": pages}
+        except Exception as e:
+            logger.exception("Stream pages lookup failed")
+            return {"success": False, "sms": "Operation failed."}
+
     @staticmethod
     def load_saved_page_info(page: int) -> Dict[str, any]:
         try:
-            pg = Page.objects.get(id=page)
-            prog = pg.program.name if pg.program else 'N/A'
-            progId = pg.program.id if pg.program else 0
-            course = pg.course.name if pg.course else 'N/A'
-            courseId = pg.course.id if pg.course else 0
-            code = pg.course.code if pg.course else 'N/A'
-            c_class = pg.program.abbrev if pg.program else 'N/A'
-            facil = pg.course.facilitator if pg.course else 'N/A'
-            facil = 'N/A' if facil == 'N/A' else facil.name
-            subdate = pg.submitdate if pg.submitdate else None
-            stds = [int(x) for x in pg.students]
-            streamsList = [str(x) for x in pg.streams]
-            studentList = list(Student.objects.filter(id__in=stds).values("id", "fullname", "regnumber"))
-
-            return_data = {
-                "success": True, "prog": prog, "course": course, "code": code,
-                "class": c_class, "facil": facil, "task": pg.task, "grpno": pg.groupno,
-                "subdate": subdate, "students": studentList, "qn": pg.question or "",
-                "sms": "Page loaded successfully!", "streams": streamsList, "table": pg.table,
-                "progId": progId, "courseId": courseId,
-            }
-            return return_data
+            info = CrudServices.load_pages_info([int(page)]).get(int(page))
+            if info is None:
+                return {"success": False, "sms": "Page not found."}
+            return info
+        except Exception as e:
+            logger.exception("Page load failed")
+            return {"success": False, "sms": "Operation failed."}
+
+    @staticmethod
+    def load_batch_page_info(page_ids: str) -> Dict[str, Any]:
+        try:
+            ids = [int(x) for x in (page_ids or "").split(",") if x.strip().isdigit()][:PAGE_INFO_BATCH_LIMIT]
+            return {"success": True, "pages": CrudServices.load_pages_info(ids)}
         except Exception as e:
-            logger.exception("Question delete failed")
+            logger.exception("Batch page load failed")
             return {"success": False, "sms": "Operation failed."}
 
     @staticmethod
@@ -134,137 +195,35 @@ class CrudServices:
             logger.exception("Failed to delete page")
             return {"success": False, "sms": "Failed to delete page."}
     
-    @staticmethod
-    def paginate_queryset(queryset, page_number, per_page):
-        """Helper function to paginate any queryset"""
-        paginator = Paginator(queryset, per_page)
-    
-        try:
-            page_obj = paginator.page(page_number)
-        except PageNotAnInteger:
-            page_obj = paginator.page(1)
-        except EmptyPage:
-            page_obj = paginator.page(paginator.num_pages)
-        
-        return {
-            'items': page_obj,
-            'pagination': {
-                'current_page': page_obj.number,
-                'total_pages': paginator.num_pages,
-                'total_count': paginator.count,
-                'per_page': per_page,
-                'has_next': page_obj.has_next(),
-                'has_previous': page_obj.has_previous(),
-                'start_index': page_obj.start_index() if paginator.count > 0 else 0,
-                'end_index': page_obj.end_index() if paginator.count > 0 else 0,
-            }
-        }
-    
     @staticmethod
     def handle_pagination(request):
         """Handle AJAX pagination requests for all sections"""
         section_type = request.POST.get('section_type')
-        page_number = request.POST.get('page', 1)
-        search_query = request.POST.get('search', '').strip()
-        per_page = int(request.POST.get('per_page', 10))
-        
-        # Map section types to models and search fields
-        section_config = {
-            'students': {
-                'model': Student,
-                'order_by': 'fullname',
-                'search_fields': ['fullname', 'regnumber'],
-                'serializer': lambda obj: {
-                    'id': obj.id,
-                    'fullname': obj.fullname,
-                    'regnumber': obj.regnumber
-                }
-            },
-            'programs': {
-                'model': Program,
-                'order_by': 'name',
-                'search_fields': ['name', 'abbrev'],
-                'serializer': lambda obj: {
-                    'id': obj.id,
-                    'name': obj.name,
-                    'abbrev': obj.abbrev
-                }
-            },
-            'courses': {
-                'model': Course,
-                'order_by': 'name',
-                'search_fields': ['name', 'code', 'facilitator__name'],
-                'serializer': lambda obj: {
-                    'id': obj.id,
-                    'name': obj.name,
-                    'code': obj.code,
-                    'facilitator': obj.facilitator.name if obj.facilitator else None
-                }
-            },
-            'questions': {
-                'model': Question,
-                'order_by': '-created_at',
-                'search_fields': ['content'],
-                'serializer': lambda obj: {
-                    'id': obj.id,
-                    'content': obj.content
-                }
-            },
-            'pages': {
-                'model': Page,
-                'order_by': '-created_at',
-                'search_fields': ['task', 'title'],
-                'serializer': lambda obj: {
-                    'id': obj.id,
-                    'task': obj.task,
-                    'title': obj.title
-                }
-            }
-        }
-        
-        if section_type not in section_config:
+        if section_type not in sections.COVER_SECTIONS:
             return JsonResponse({'success': False, 'error': 'Invalid section type'}, status=400)
-        
-        config = section_config[section_type]
-        
-        # Get queryset
-        queryset = config['model'].objects.all().order_by(config['order_by'])
-        
-        # Apply search filter
-        if search_query:
-            search_q = Q()
-            for field in config['search_fields']:
-                search_q |= Q(**{f'{field}__icontains': search_query})
-            queryset = queryset.filter(search_q)
-        
-        # Paginate
-        paginator = Paginator(queryset, per_page)
-        
+
         try:
-            page_obj = paginator.page(page_number)
-        except PageNotAnInteger:
-            page_obj = paginator.page(1)
-        except EmptyPage:
-            page_obj = paginator.page(paginator.num_pages)
-        
-        # Serialize items
-        items_data = [config['serializer'](item) for item in page_obj]
-        
+            per_page = min(max(int(request.POST.get('per_page', 10)), 1), 100)
+            offset = max(int(request.POST.get('offset', 0)), 0)
+        except ValueError:
+            per_page, offset = 10, 0
+
+        filters = {key: request.POST[key] for key in ('student', 'stream') if request.POST.get(key)}
+        result = sections.paginate_section(
+            section_type,
+            cursor=request.POST.get('cursor') or None,
+            direction='prev' if request.POST.get('direction') == 'prev' else 'next',
+            offset=offset,
+            search_query=request.POST.get('search', '').strip(),
+            per_page=per_page,
+            filters=filters,
+        )
         return JsonResponse({
             'success': True,
-            'items': items_data,
-            'pagination': {
-                'current_page': page_obj.number,
-                'total_pages': paginator.num_pages,
-                'total_count': paginator.count,
-                'per_page': per_page,
-                'has_next': page_obj.has_next(),
-                'has_previous': page_obj.has_previous(),
-                'start_index': page_obj.start_index() if paginator.count > 0 else 0,
-                'end_index': page_obj.end_index() if paginator.count > 0 else 0,
-            }
+            'items': result['items'],
+            'pagination': result['pagination'],
         })
-        
+
 
 @never_cache
 @login_required
@@ -273,36 +232,53 @@ def cover_page(request: HttpRequest) -> HttpResponse:
     if request.method == 'POST' and request.POST.get('action') == 'paginate':
         return CrudServices.handle_pagination(request)
     
-    # Initial page load with pagination for all sections
-    per_page = 10
-    
-    # Get paginated data for each section
-    programs_data = CrudServices.paginate_queryset(Program.objects.all().order_by('name'), 1, per_page)
-    courses_data = CrudServices.paginate_queryset(Course.objects.all().order_by('name'), 1, per_page)
-    students_data = CrudServices.paginate_queryset(Student.objects.all().order_by('fullname'), 1, per_page)
-    questions_data = CrudServices.paginate_queryset(Question.objects.all().order_by('-created_at'), 1, per_page)
-    pages_data = CrudServices.paginate_queryset(Page.objects.all().order_by('-created_at'), 1, per_page)
-    
-    data = {
-        # Pass both items and pagination info separately
-        'programs': programs_data['items'],
-        'programs_pagination': programs_data['pagination'],
-        
-        'courses': courses_data['items'],
-        'courses_pagination': courses_data['pagination'],
-        
-        'students': students_data['items'],
-        'students_pagination': students_data['pagination'],
-        
-        'questions': questions_data['items'],
-        'questions_pagination': questions_data['pagination'],
-        
-        'pages': pages_data['items'],
-        'pages_pagination': pages_data['pagination'],
-    }
+    # Initial page load: first page of every section, also handed to the
+    # front-end as JSON to hydrate its pagination state from
+    payload = sections.bootstrap()
+    data = {'cover_bootstrap': payload}
+    for section_type, section in payload.items():
+        data[section_type] = section['items']
+        data[f'{section_type}_pagination'] = section['pagination']
 
     return render(request, 'stationery/cover.html', data)
 
+@never_cache
+@login_required
+def cover_autocomplete(request: HttpRequest) -> JsonResponse:
+    """Typeahead matches for a cover page picker: ?kind=students&q=jo&limit=10"""
+    kind = request.GET.get("kind")
+    if kind not in PICKERS:
+        return JsonResponse({"success": False, "sms": "Invalid picker"}, status=400)
+    try:
+        limit = max(int(request.GET.get("limit", 10)), 1)
+    except ValueError:
+        limit = 10
+
+    items = autocomplete.search(kind, request.GET.get("q", ""), limit)
+    return JsonResponse({"success": True, "items": items})
+
+@never_cache
+@login_required
+def cover_pages_pdf(request: HttpRequest) -> HttpResponse:
+    """Saved cover pages as one PDF: ?ids=1,2,3 (or repeated ids=)."""
+    page_ids = []
+    for value in request.GET.getlist("ids"):
+        page_ids.extend(int(x) for x in value.split(",") if x.strip().isdigit())
+
+    pages = load_pages(page_ids)
+    if not pages:
+        return JsonResponse({"success": False, "sms": "No saved pages selected."}, status=404)
+
+    activity.record(
+        categ="student",
+        title="Cover pages printed",
+        maelezo=f"{len(pages)} saved page(s) have been exported to PDF"
+        )
+
+    response = StreamingHttpResponse(stream_covers_pdf(pages), content_type="application/pdf")
+    response["Content-Disposition"] = 'inline; filename="cover-pages.pdf"'
+    return response
+
 @never_cache
 @login_required
 def cover_page_actions(request: HttpRequest) -> JsonResponse:
@@ -314,11 +290,20 @@ def cover_page_actions(request: HttpRequest) -> JsonResponse:
     pg_delete = post_data.get("page_delete")
     pg_save = post_data.get("save_page")
     pg_info = post_data.get("page_info")
+    pgs_info = post_data.get("pages_info")
+    std_pages = post_data.get("student_pages")
+    strm_pages = post_data.get("stream_pages")
     
     if pg_save:
         return JsonResponse(CrudServices.save_cover_page(post_data))
     if pg_info:
         return JsonResponse(CrudServices.load_saved_page_info(pg_info))
+    if pgs_info:
+        return JsonResponse(CrudServices.load_batch_page_info(pgs_info))
+    if std_pages:
+        return JsonResponse(CrudServices.student_page_history(std_pages))
+    if strm_pages:
+        return JsonResponse(CrudServices.stream_pages(strm_pages))
     if pg_delete:
         return JsonResponse(CrudServices.delete_page(pg_delete))
     if qn_delete:
@@ -0,0 +1,28 @@
+# Generated by Django 6.0 on 2026-10-17 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('programs', '0004_program_deleted_at_alter_program_abbrev_and_more'),
+        ('students', '0002_alter_student_created_at_alter_student_fullname_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, db_index=True, default=None, null=True, verbose_name='Deleted At'),
+        ),
+        migrations.AlterField(
+            model_name='student',
+            name='regnumber',
+            field=models.CharField(db_index=True, max_length=50, verbose_name='Registration Number'),
+        ),
+        migrations.AddConstraint(
+            model_name='student',
+            constraint=models.UniqueConstraint(condition=models.Q(('deleted_at__isnull', True)), fields=('regnumber',), name='unique_live_student_regnumber'),
+        ),
+    ]
@@ -1,19 +1,31 @@
 from django.db import models
 
+from utils.softdelete import LiveManager
+
 
 class Student(models.Model):
     id = models.AutoField(primary_key=True)
     fullname = models.CharField(max_length=255, verbose_name="Full Name", db_index=True)
-    regnumber = models.CharField(max_length=50, unique=True, verbose_name="Registration Number", db_index=True)
+    regnumber = models.CharField(max_length=50, verbose_name="Registration Number", db_index=True)
     program = models.ForeignKey(
         'programs.Program', on_delete=models.SET_NULL, blank=True,
         null=True, related_name='students', verbose_name="Program")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Created At", db_index=True)
+    # set when the row is deleted; the purger removes it later (utils/softdelete.py)
+    deleted_at = models.DateTimeField(null=True, blank=True, default=None, db_index=True, verbose_name="Deleted At")
+
+    objects = LiveManager()
+    all_objects = models.Manager()
 
     class Meta:
         verbose_name = "Student"
         verbose_name_plural = "Students"
         ordering = ['fullname']
+        constraints = [
+            # tombstoned rows do not block reusing the value
+            models.UniqueConstraint(
+                fields=["regnumber"], condition=models.Q(deleted_at__isnull=True), name="unique_live_student_regnumber"),
+        ]
 
     def __str__(self):
         return self.fullname
\ No newline at end of file
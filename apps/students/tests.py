@@ -1,3 +1,207 @@
-from django.test import TestCase
+import csv
+import io
+from unittest import mock
 
-# Create your tests here.
+import openpyxl
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.imports.merge import merge_chunk
+from apps.programs.models import Program
+from utils import datatables, db_router
+from utils.excel_import import IMPORT_CHUNK_SIZE, open_upload
+
+from . import views
+from .models import Student
+from .views import StudentService
+
+
+class StudentsImportTests(TestCase):
+    def source(self, count):
+        rows = "".join(f"Student Number {i},TPSD/{i:04d},\n" for i in range(count))
+        uploaded_file = SimpleUploadedFile("students.csv", f"Full Name,Regnumber,Program\n{rows}".encode())
+        source = open_upload(uploaded_file, max_bytes=1024 * 1024, max_rows=10000)
+        self.addCleanup(source.close)
+        return source
+
+    def test_failure_reports_the_rows_already_saved(self):
+        calls = []
+
+        def merge_then_fail(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 2:
+                raise OperationalError("database is locked")
+            merge_chunk(*args, **kwargs)
+
+        with mock.patch.object(views, "merge_chunk", merge_then_fail), self.assertLogs(views.logger, "ERROR"):
+            result = StudentService.import_from_excel(self.source(IMPORT_CHUNK_SIZE + 10), update_existing=True)
+
+        next_row = IMPORT_CHUNK_SIZE + 2
+        self.assertFalse(result["success"])
+        self.assertEqual(result["stopped_at_row"], next_row)
+        self.assertEqual(result["sms"], (
+            f"Error processing file at row {next_row}: database is locked"
+            f"<br>{IMPORT_CHUNK_SIZE} student(s) from the rows above it were saved. Import the file again to add the rest."
+        ))
+        self.assertEqual(result["diff"], {"inserted": IMPORT_CHUNK_SIZE, "updated": 0, "unchanged": 0, "failed": 0})
+        self.assertEqual(Student.objects.count(), IMPORT_CHUNK_SIZE)
+
+        # the second run finishes the file and leaves the saved rows alone
+        result = StudentService.import_from_excel(self.source(IMPORT_CHUNK_SIZE + 10), update_existing=True)
+        self.assertEqual(result["diff"], {"inserted": 10, "updated": 0, "unchanged": IMPORT_CHUNK_SIZE, "failed": 0})
+        self.assertEqual(Student.objects.count(), IMPORT_CHUNK_SIZE + 10)
+
+
+@override_settings(REPORTING_DB_ALIAS=None)
+class StudentsExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username="staff", fullname="Office Staff", shop=None)
+        program = Program.objects.create(name="Records Management", abbrev="BRAIM")
+        Student.objects.bulk_create(
+            Student(fullname=f"Student Number {i:02d}", regnumber=f"TPSD/{i:03d}", program=program if i % 2 else None)
+            for i in range(25)
+        )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        # several fetches per export
+        self.enterContext(mock.patch.object(datatables, "EXPORT_CHUNK_SIZE", 10))
+
+    def export(self, export_format, **params):
+        return self.client.post(reverse("students_export"), {"format": export_format, **params})
+
+    def test_csv_streams_every_row(self):
+        response = self.export("csv")
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        content = b"".join(response.streaming_content).decode("utf-8")
+        self.assertTrue(content.startswith("\ufeff"))
+        rows = list(csv.reader(io.StringIO(content[1:])))
+        self.assertEqual(rows[0], ["S/N", "Student Name", "RegNumber", "Program"])
+        self.assertEqual(len(rows), 26)
+        self.assertEqual(rows[1], ["1", "Student Number 00", "TPSD/000", "N/A"])
+        self.assertEqual(rows[25], ["25", "Student Number 24", "TPSD/024", "N/A"])
+        self.assertEqual(rows[2][3], "BRAIM: Records Management")
+
+    def test_xlsx_follows_the_table_filters(self):
+        response = self.export("xlsx", **{"columns[3][search][value]": "TPSD/01", "order[0][column]": "2",
+                                          "order[0][dir]": "desc"})
+
+        content = b"".join(response.streaming_content)
+        rows = list(openpyxl.load_workbook(io.BytesIO(content), read_only=True).active.values)
+        self.assertEqual(rows[0], ("S/N", "Student Name", "RegNumber", "Program"))
+        self.assertEqual([row[2] for row in rows[1:]], [f"TPSD/{i:03d}" for i in range(19, 9, -1)])
+
+    def test_unknown_format(self):
+        response = self.export("pdf")
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class StudentsPageCachingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username="staff", fullname="Office Staff", shop=None)
+        Student.objects.bulk_create(Student(fullname=f"Student {i}", regnumber=f"TPSD/{i:03d}") for i in range(3))
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def draw(self, etag=None, **params):
+        headers = {"X-Requested-With": "XMLHttpRequest"}
+        if etag:
+            headers["If-None-Match"] = etag
+        with CaptureQueriesContext(connections["default"]) as queries:
+            response = self.client.post(reverse("students_page"), {"draw": "1", "length": "10", **params},
+                                        headers=headers)
+        read_table = any('"students_student"' in q["sql"] for q in queries)
+        return response, read_table
+
+    def test_unchanged_table_answers_not_modified(self):
+        response, _ = self.draw()
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.assertIn("Last-Modified", response)
+
+        # draw is left out of the tag; nothing is queried for a 304
+        response, read_table = self.draw(etag, draw="7")
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(read_table)
+
+        response, read_table = self.draw(etag, **{"search[value]": "Student 1"})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(read_table)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Student.objects.create(fullname="Neema Kombo", regnumber="TPSD/010")
+        response, _ = self.draw(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.json()["recordsTotal"], 4)
+
+    def test_program_options_are_cached_until_programs_change(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Program.objects.create(name="Records Management", abbrev="BRAIM")
+        self.assertContains(self.client.get(reverse("students_page")), "Records Management")
+
+        with CaptureQueriesContext(connections["default"]) as queries:
+            self.client.get(reverse("students_page"))
+        self.assertFalse(any('"programs_program"' in q["sql"] for q in queries))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Program.objects.create(name="Accounts", abbrev="BAC")
+        self.assertContains(self.client.get(reverse("students_page")), "Accounts")
+
+
+class ReportingExportTests(TransactionTestCase):
+    # the reporting alias mirrors the default test database, and reads
+    # through its own connection, so the rows have to be committed
+    databases = {"default", "reporting"}
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(username="staff", fullname="Office Staff", shop=None)
+        Student.objects.bulk_create(Student(fullname=f"Student {i}", regnumber=f"TPSD/{i:03d}") for i in range(3))
+        self.client.force_login(user)
+        self.refresh = self.enterContext(mock.patch.object(db_router, "_refresh_in_background"))
+
+    def export(self, lag):
+        """Exported names and the SQL each alias ran, with the snapshot ``lag`` seconds behind."""
+        with mock.patch.object(db_router, "replica_lag", return_value=lag), \
+                CaptureQueriesContext(connections["default"]) as default, \
+                CaptureQueriesContext(connections["reporting"]) as reporting:
+            response = self.client.post(reverse("students_export"), {"format": "csv"})
+            content = b"".join(response.streaming_content).decode("utf-8-sig")
+        names = [row[1] for row in list(csv.reader(io.StringIO(content)))[1:]]
+        return names, [q["sql"] for q in default], [q["sql"] for q in reporting]
+
+    def test_fresh_snapshot_serves_the_export(self):
+        names, default, reporting = self.export(lag=5.0)
+        self.assertEqual(names, ["Student 0", "Student 1", "Student 2"])
+        self.assertEqual(len(reporting), 1)
+        self.assertIn('FROM "students_student"', reporting[0])
+        self.assertFalse(any('FROM "students_student"' in sql for sql in default))
+        self.refresh.assert_not_called()
+
+    def test_stale_or_missing_snapshot_falls_back_to_default(self):
+        for lag in (301.0, None):
+            with self.subTest(lag=lag):
+                names, default, reporting = self.export(lag)
+                self.assertEqual(len(names), 3)
+                self.assertEqual(reporting, [])
+                self.assertTrue(any('FROM "students_student"' in sql for sql in default))
+        self.assertEqual(self.refresh.call_count, 2)
+
+    def test_only_reads_inside_reporting_block_are_routed(self):
+        with mock.patch.object(db_router, "replica_lag", return_value=0.0):
+            with db_router.reporting() as alias:
+                self.assertEqual(alias, "reporting")
+                self.assertEqual(Student.objects.db, "reporting")
+                self.assertEqual(Student.objects.db_manager().db, "reporting")
+                self.assertEqual(db_router.ReportingRouter().db_for_write(Student), "default")
+        self.assertEqual(Student.objects.db, "default")
@@ -4,4 +4,5 @@ from . import views as v
 urlpatterns = [
     path('', v.students_page, name='students_page'),
     path('actions/', v.students_actions, name="students_actions"),
+    path('export/', v.students_export, name="students_export"),
 ]
@@ -5,104 +5,63 @@ from django.shortcuts import render
 from django.views.decorators.cache import never_cache
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse, HttpRequest, HttpResponse
-from django.db.models import QuerySet, Q, Value, CharField
-from django.db.models.functions import Lower, Concat
-
-import os
-import openpyxl
-from django.conf import settings
-from django.core.files.storage import FileSystemStorage
+from django.db.models import Case, CharField, Q, Value, When
+from django.db.models.functions import Concat
 from django.db import transaction
-from datetime import datetime
 
 from .models import Student
 from apps.programs.models import Program
-from apps.dashboard.models import Activity
+from apps.dashboard import activity, bulk, changes
+from apps.dashboard.refdata import normalize, refdata
+from apps.imports.merge import ImportDiff, ImportSpec, ParsedChunk, merge_chunk
+from apps.imports.preview import parsed_chunks
+from apps.imports.views import ImportJobService
+from utils.datatables import Column, DataTableExporter, DataTableProcessor, TableSpec
+from utils.excel_import import ImportSource, ProgressCallback, Row, cell_text, import_result, import_stopped
+from utils.softdelete import is_live
 
 logger = logging.getLogger(__name__)
 
 
 # =============================================================================
-# Database utilities
+# DataTable specification
 # =============================================================================
 
-def build_column_filter(
-    field_path: str,
-    search_value: str,
-    filter_kind: str = "contains"
-) -> Optional[Q]:
-    value = (search_value or "").strip()
-    if not value:
-        return None
-    
-    if value.lower() in ("n/a", "na", "none", "-"):
-        if field_path in ("program_display", "program__name", "program__abbrev"):
-            return Q(program__isnull=True)
-
-    return Q(**{f"{field_path}__icontains": value})
-
-
-class DataTableProcessor:
-    @staticmethod
-    def process_request(
-        request: HttpRequest,
-        queryset: QuerySet,
-        global_search_fields: List[str],
-        column_filter_fields: Dict[int, str],
-        column_filter_types: Dict[str, str],
-        column_sort_fields: Optional[Dict[int, str]] = None,
-    ) -> Dict[str, Any]:
-        if column_sort_fields is None:
-            column_sort_fields = column_filter_fields
-
-        total_records = queryset.count()
-
-        draw = int(request.POST.get("draw", 1))
-        start = int(request.POST.get("start", 0))
-        length = int(request.POST.get("length", 10))
-        global_search = (request.POST.get("search[value]", "") or "").strip()
-
-        filtered_qs = queryset
-
-        if global_search:
-            q_global = Q()
-            for field in global_search_fields:
-                q_global |= Q(**{f"{field}__icontains": global_search})
-            filtered_qs = filtered_qs.filter(q_global)
-
-        # Column-specific filters
-        for col_index, field_path in column_filter_fields.items():
-            search_val = (request.POST.get(f"columns[{col_index}][search][value]", "") or "").strip()
-            if search_val:
-                filter_kind = column_filter_types.get(field_path, "contains")
-                q_filter = build_column_filter(field_path, search_val, filter_kind)
-                if q_filter:
-                    filtered_qs = filtered_qs.filter(q_filter)
-
-        filtered_count = filtered_qs.count()
-
-        # Sorting
-        order_idx = int(request.POST.get("order[0][column]", 1))
-        order_dir = request.POST.get("order[0][dir]", "asc")
-        sort_field = column_sort_fields.get(order_idx, "fullname")
-
-        order_expr = Lower(sort_field).desc() if order_dir == "desc" else Lower(sort_field).asc()
-
-        filtered_qs = filtered_qs.order_by(order_expr)
-
-        paged_data = filtered_qs[start:start + length] if length > 0 else filtered_qs
-
-        if length < 0:
-            Activity.objects.create(
-                categ="student",
-                title="Students data exported",
-                maelezo="All students table data has been exported"
-                )
-
-        return {
-            "draw": draw, "recordsTotal": total_records,
-            "recordsFiltered": filtered_count, "data": paged_data,
-        }
+def _student_row(obj: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": obj["id"],
+        "fullname": obj["fullname"],
+        "regnumber": obj["regnumber"],
+        "program": obj["program_display"] or "N/A",
+        "program_id": obj["program_id"] if obj["program_display"] else "",
+        "action": "",
+    }
+
+
+STUDENTS_TABLE = TableSpec(
+    label="students",
+    categ="student",
+    queryset=lambda: Student.objects.annotate(
+        # NULL without a program or while the program is tombstoned
+        program_display=Case(
+            When(Q(program__isnull=False) & is_live("program"), then=Concat(
+                'program__abbrev', Value(': '), 'program__name', output_field=CharField()
+                )),
+            default=None,
+            )),
+    columns=(
+        Column(2, "fullname"),
+        Column(3, "regnumber"),
+        Column(4, "program_display", null_field="program_display"),
+    ),
+    global_search_fields=("fullname", "regnumber", "program_display"),
+    values=("id", "fullname", "regnumber", "program_id", "program_display"),
+    row=_student_row,
+    default_sort="fullname",
+    fulltext=(("student", "id"), ("program_name", "program_id")),
+    export_columns=(("Student Name", "fullname"), ("RegNumber", "regnumber"), ("Program", "program")),
+    depends_on=("students.Student", "programs.Program"),
+)
 
 
 # =============================================================================
@@ -134,7 +93,7 @@ class StudentService:
                     return {"success": False, "sms": "Selected program not found."}
 
             Student.objects.create(fullname=fullname, regnumber=regnumber, program=program)
-            Activity.objects.create(
+            activity.record(
                 categ="student",
                 title="New student added",
                 maelezo="New student has been registered successfully"
@@ -173,7 +132,7 @@ class StudentService:
             student.program = program
             student.save()
 
-            Activity.objects.create(
+            activity.record(
                 categ="student",
                 title="Student updated",
                 maelezo="Student information has been updated"
@@ -189,8 +148,9 @@ class StudentService:
     @staticmethod
     def delete_by_id(student_id: int) -> Dict[str, Any]:
         try:
-            Student.objects.filter(id=student_id).delete()
-            Activity.objects.create(
+            if not bulk.tombstone(Student, [student_id]):
+                return {"success": False, "sms": "Student not found."}
+            activity.record(
                 categ="student",
                 title="Student deleted",
                 maelezo="One student has been removed from system"
@@ -201,86 +161,112 @@ class StudentService:
             return {"success": False, "sms": "Operation failed."}
     
     @staticmethod
-    def import_from_excel(filepath: str) -> Dict[str, Any]:
-        created_count = 0
+    def import_from_excel(source: Optional[ImportSource], progress: Optional[ProgressCallback] = None,
+                          update_existing: bool = False, preview_token: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Import an upload, or the parsed rows of a checked preview when
+        ``preview_token`` is given, merging each chunk by regnumber
+        (apps.imports.merge).
+        """
+        processed = 0
         failed = []
+        diff = ImportDiff()
         try:
-            if not filepath.lower().endswith(('.xlsx', '.xls')):
-                return {"success": False, "sms": "Only Excel files (.xlsx, .xls) are accepted."}
-
-            wb = openpyxl.load_workbook(filepath, read_only=True, data_only=True)
-            sheet = wb.active
-
-            with transaction.atomic():
-                for row_num, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
-                    name = str(row[0] or '').strip() if len(row) > 0 else ''
-                    reg = str(row[1] or '').strip() if len(row) > 1 else ''
-                    prog = str(row[2]).strip() if len(row) > 2 and row[2] else None
-                    
-                    if prog:
-                        prog = Program.objects.filter(abbrev__iexact=prog).first()
-
-                    if len(name) < 3 or len(reg) < 3:
-                        failed.append({'row': row_num, 'reason': 'Name or regnumber is too short.'})
-                        continue
-                    elif Student.objects.filter(regnumber__iexact=reg).exists():
-                        failed.append({'row': row_num, 'reason': 'Regnumber already exists.'})
-                        continue
-
-                    Student.objects.create(fullname=name, regnumber=reg, program=prog)
-                    created_count += 1
-
-            wb.close()
-
-            sms = f'Imported {created_count} student(s) successfully.'
-            if failed:
-                sms += '<br>'
-                sms += 'Failed students:<br>' + '<br>'.join([
-                    f'Row {f["row"]}: {f["reason"]}'
-                    for f in failed
-                ])
-
-            success = created_count > 0 and len(failed) == 0
-            
-            if created_count > 0:
-                Activity.objects.create(
-                    categ="student",
-                    title="Multiple students added",
-                    maelezo=f"{created_count} students has been registered"
-                    )
-                
-            return {'success': success, 'sms': sms}
+            # lowercased regnumbers of earlier chunks, to report the ones repeated in the file
+            seen_regnumbers = set()
+            for parsed in parsed_chunks(STUDENTS_IMPORT, source, preview_token):
+                failed.extend(parsed.failed)
+                with transaction.atomic():
+                    merge_chunk(Student, "regnumber", "Regnumber", parsed.rows, seen_regnumbers,
+                                failed, diff, update_existing)
+                processed += parsed.size
+                if progress:
+                    progress(processed, len(failed))
+
+            result = import_result(
+                "student", diff.inserted, failed,
+                updated_count=diff.updated if update_existing else None, unchanged_count=diff.unchanged,
+            )
 
         except Exception as e:
             logger.exception("Students import failed")
-            return {'success': False, 'sms': f'Error processing file: {str(e)}'}
+            result = import_stopped(
+                "student", e, processed + 2, diff.inserted, failed,
+                updated_count=diff.updated if update_existing else None, unchanged_count=diff.unchanged,
+            )
+
+        # rows of committed chunks stay saved even when a later chunk fails
+        if diff.inserted > 0:
+            activity.record(
+                categ="student",
+                title="Multiple students added",
+                maelezo=f"{diff.inserted} students has been registered"
+                )
+        if diff.updated > 0:
+            activity.record(
+                categ="student",
+                title="Multiple students updated",
+                maelezo=f"{diff.updated} students has been updated from an import"
+                )
+
+        return result
+
+    @staticmethod
+    def parse_chunk(chunk: List[Row]) -> ParsedChunk:
+        """
+        Row checks for one chunk of spreadsheet rows, shared by the import
+        and its preview. Program abbrevs resolve from the reference cache;
+        an unknown one is flagged. A row without a resolved program leaves
+        program_id out: new students get none, existing ones keep theirs.
+        """
+        parsed = ParsedChunk(size=len(chunk))
+        cells = [
+            (row_num, cell_text(row, 0), cell_text(row, 1), cell_text(row, 2))
+            for row_num, row in chunk
+        ]
+        programs = refdata.ids_for("programs", {prog for _, _, _, prog in cells if prog})
+
+        for row_num, name, reg, prog in cells:
+            if len(name) < 3 or len(reg) < 3:
+                parsed.failed.append({'row': row_num, 'reason': 'Name or regnumber is too short.'})
+                continue
+
+            values = {"fullname": name}
+            program_id = programs.get(normalize(prog)) if prog else None
+            if program_id is not None:
+                values["program_id"] = program_id
+            elif prog:
+                parsed.warnings.append({'row': row_num, 'reason': f'Unknown program "{prog}".'})
+            parsed.rows.append((row_num, reg, values))
+        return parsed
     
     @staticmethod
     def delete_multiple(data: Dict[str, Any]) -> Dict[str, Any]:
         try:
             stds = data.get("students_list", "")
-            students_list = [int(x) for x in stds.split(",") if x.strip()]
+            students_list = [int(x) for x in stds.split(",") if x.strip().isdigit()]
             delete_type = data.get("delete_type")
             
             if delete_type == "all":
-                get_all = Student.objects.all()
-                if len(get_all) == 0:
+                if not Student.objects.exists():
                     return {"success": False, "sms": "No students available to delete."}
                 
-                get_all.delete()
-                Activity.objects.create(
+                deleted = bulk.tombstone(Student)
+                activity.record(
                     categ="student", title="All students deleted",
                     maelezo="All students have been erased from system"
                     )
-                return {"success": True, "sms": "All students deleted successfully."}
+                return {"success": True, "sms": f"All {deleted} students deleted successfully."}
             
-            for st in students_list:
-                Student.objects.filter(id=st).delete()
-            Activity.objects.create(
+            deleted = bulk.tombstone(Student, students_list) if students_list else 0
+            if not deleted:
+                return {"success": False, "sms": "No students were deleted."}
+
+            activity.record(
                 categ="student", title="Multiple students deleted",
-                maelezo=f"{len(students_list)} students have been deleted from system"
+                maelezo=f"{deleted} students have been deleted from system"
                 )
-            return {"success": True, "sms": f"{len(students_list)} students deleted successfully."}
+            return {"success": True, "sms": f"{deleted} students deleted successfully."}
                 
         except Exception as e:
             logger.exception("Student delete failed")
@@ -327,9 +313,10 @@ class StudentService:
 
             # transfer students
             students_updated = studentsList.update(program=endProg)
+            changes.touch("students.Student")
 
             if students_updated > 0:
-                Activity.objects.create(
+                activity.record(
                     categ="student", title="Multiple students transfered",
                     maelezo=f"{students_updated} students have been transfered to new program"
                     )
@@ -341,6 +328,12 @@ class StudentService:
             return {"success": False, "sms": "Operation failed."}
 
 
+STUDENTS_IMPORT = ImportSpec(
+    kind="students", model=Student, key_field="regnumber", key_label="Regnumber",
+    parse=StudentService.parse_chunk, warning="unknown_program",
+)
+
+
 # =============================================================================
 # Views
 # =============================================================================
@@ -349,47 +342,21 @@ class StudentService:
 @login_required
 def students_page(request: HttpRequest) -> HttpResponse:
     if request.method == "POST" and request.headers.get("X-Requested-With") == "XMLHttpRequest":
-        qs = Student.objects.select_related("program").annotate(
-            program_display=Concat(
-                'program__abbrev', Value(': '), 'program__name', output_field=CharField()
-                )).all()
-
-        column_filter_fields = {2: "fullname", 3: "regnumber", 4: "program_display"}
-        column_sort_fields = column_filter_fields.copy()
-        column_filter_types = {"fullname": "contains", "regnumber": "contains", "program_display": "contains"}
-
-        result = DataTableProcessor.process_request(
-            request=request, queryset=qs,
-            global_search_fields=["fullname", "regnumber", "program_display"],
-            column_filter_fields=column_filter_fields,
-            column_filter_types=column_filter_types,
-            column_sort_fields=column_sort_fields,
-        )
-
-        start_idx = int(request.POST.get("start", 0))
-        rows = [
-            {
-                "count": start_idx + i + 1,
-                "id": obj.id,
-                "fullname": obj.fullname,
-                "regnumber": obj.regnumber,
-                "program": obj.program_display if obj.program else "N/A",
-                "program_id": obj.program.id if obj.program else "",
-                "action": "",
-            }
-            for i, obj in enumerate(result["data"])
-        ]
-
-        return JsonResponse(
-            {
-                "draw": result["draw"],
-                "recordsTotal": result["recordsTotal"],
-                "recordsFiltered": result["recordsFiltered"],
-                "data": rows,
-            }
-        )
+        return DataTableProcessor.respond(request, STUDENTS_TABLE)
     
-    return render(request, "students/students.html", {"programs": Program.objects.all().order_by("name")})
+    # the option lists are cached fragments; the queryset only runs on a miss
+    return render(request, "students/students.html", {
+        "programs": Program.objects.all().order_by("name"),
+        "programs_version": changes.stamp("programs.Program"),
+    })
+
+
+@never_cache
+@login_required
+def students_export(request: HttpRequest) -> HttpResponse:
+    if request.method != "POST":
+        return JsonResponse({"success": False, "sms": "Invalid request"})
+    return DataTableExporter.export(request, STUDENTS_TABLE)
 
 
 @never_cache
@@ -399,27 +366,17 @@ def students_actions(request: HttpRequest) -> JsonResponse:
         return JsonResponse({"success": False, "sms": "Invalid request"})
     
     if 'excel_file' in request.FILES:
-        uploaded_file = request.FILES['excel_file']
-        now = datetime.now().strftime("%Y-%m-%d_%H%M%S")
-        original_ext = os.path.splitext(uploaded_file.name)[1].lower()
-        new_filename = f"{now}_students{original_ext}"
-        fs = FileSystemStorage(location=os.path.join(settings.MEDIA_ROOT, 'tmp'))
-        
-        # Save with new name
-        filepath = fs.path(fs.save(new_filename, uploaded_file))
-        
-        try:
-            result = StudentService.import_from_excel(filepath)
-            return JsonResponse(result)
-        finally:
-            if os.path.exists(filepath):
-                try:
-                    os.remove(filepath)
-                except (PermissionError, OSError):
-                    # Silently ignore
-                    pass
-                except Exception as e:
-                    logger.warning(f"Could not delete temp file {filepath}: {e}")
+        update_existing = request.POST.get("import_mode") == "upsert"
+        if request.POST.get("dry_run") == "true":
+            return JsonResponse(ImportJobService.dry_run(request.FILES['excel_file'], STUDENTS_IMPORT, update_existing))
+        return JsonResponse(ImportJobService.start(
+            "students", request.FILES['excel_file'], StudentService.import_from_excel,
+            update_existing=update_existing,
+        ))
+    if request.POST.get("preview_token"):
+        return JsonResponse(ImportJobService.start_preview(
+            "students", request.POST["preview_token"], StudentService.import_from_excel,
+        ))
 
     post_data = request.POST
     student_id = post_data.get("student_id")
@@ -5,7 +5,8 @@ from django.urls import reverse
 from django.views.decorators.cache import never_cache
 from django.views.decorators.http import require_POST
 from django.http import JsonResponse, HttpRequest, HttpResponse
-from django.db.models import Sum, F, QuerySet
+from django.db.models import Sum, F, Q, QuerySet, Value, CharField, Case, When
+from django.db.models.functions import Cast, Coalesce
 from django.contrib.auth import login, logout, authenticate
 from django.shortcuts import redirect, render
 from django.contrib.auth.decorators import login_required
@@ -13,7 +14,7 @@ from dateutil.parser import parse
 
 from .forms import LoginForm, UserRegistrationForm, UserUpdateForm
 from .models import CustomUser
-from utils.util_functions import admin_required, format_phone, conv_timezone, filter_items, format_number
+from utils.util_functions import admin_required, format_phone, conv_timezone, format_number
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -363,6 +364,16 @@ class DataTablesService:
         'status': 'exact'
     }
     
+    # Column name -> (text expression for filtering, field for sorting / numeric filters)
+    COLUMN_QUERY_FIELDS = {
+        'id': ('id_text', 'id'),
+        'fullname': ('fullname', 'fullname'),
+        'username': ('username', 'username'),
+        'regdate': ('regdate_text', 'created_at'),
+        'phone': ('phone_display', 'phone_display'),
+        'status': ('status', 'status'),
+    }
+    
     @staticmethod
     def parse_datatables_request(request: HttpRequest) -> Dict[str, Any]:
         """
@@ -421,111 +432,163 @@ class DataTablesService:
         return queryset
     
     @staticmethod
-    def prepare_user_data(queryset: QuerySet) -> List[Dict[str, Any]]:
+    def annotate_columns(queryset: QuerySet) -> QuerySet:
         """
-        Convert user queryset to list of dicts for DataTables
+        Add the display values the table filters and sorts on, so that all
+        the work can be expressed in SQL
         
         Args:
             queryset: User queryset
             
         Returns:
-            List of user data dicts
-        """
-        return [
-            {
-                'id': user.id,
-                'regdate': user.created_at,
-                'fullname': user.fullname,
-                'username': user.username,
-                'phone': user.phone if user.phone else "N/A",
-                'status': "active" if user.is_active else "inactive",
-                'info': reverse('user_details', kwargs={'userid': int(user.id)})
-            }
-            for user in queryset
-        ]
+            Annotated queryset
+        """
+        return queryset.annotate(
+            id_text=Cast('id', CharField()),
+            regdate_text=Cast('created_at', CharField()),
+            phone_display=Coalesce('phone', Value('N/A'), output_field=CharField()),
+            status=Case(
+                When(is_active=True, then=Value('active')),
+                default=Value('inactive'),
+                output_field=CharField(),
+            ),
+        )
     
     @staticmethod
-    def apply_sorting(data: List[Dict], order_column_index: int, order_dir: str) -> List[Dict]:
+    def apply_sorting(queryset: QuerySet, order_column_index: int, order_dir: str) -> QuerySet:
         """
-        Apply sorting to data list
+        Apply sorting to queryset
         
         Args:
-            data: List of data dicts
+            queryset: Annotated user queryset
             order_column_index: Column index to sort by
             order_dir: Sort direction ('asc' or 'desc')
             
         Returns:
-            Sorted data list
+            Ordered queryset
         """
         order_column_name = DataTablesService.USER_COLUMN_MAPPING.get(order_column_index, 'regdate')
-        reverse_order = order_dir != 'asc'
+        sort_field = DataTablesService.COLUMN_QUERY_FIELDS[order_column_name][1]
+        prefix = '' if order_dir == 'asc' else '-'
         
-        return sorted(data, key=lambda x: x[order_column_name], reverse=reverse_order)
+        return queryset.order_by(f'{prefix}{sort_field}', f'{prefix}id')
     
     @staticmethod
-    def apply_column_filtering(data: List[Dict], request: HttpRequest) -> List[Dict]:
+    def build_column_filter(column_field: str, column_search: str, filter_type: str) -> Optional[Q]:
+        """
+        SQL equivalent of utils.util_functions.filter_items for one column
+        
+        Args:
+            column_field: Column name from USER_COLUMN_MAPPING
+            column_search: Search term typed in the column filter
+            filter_type: 'contains', 'exact' or 'numeric'
+            
+        Returns:
+            Q object, or None when the term can never match
+        """
+        text_field, value_field = DataTablesService.COLUMN_QUERY_FIELDS[column_field]
+        
+        if filter_type == 'exact':
+            return Q(**{f'{text_field}__iexact': column_search})
+        
+        if filter_type == 'numeric':
+            cleaned = column_search.replace(',', '')
+            if column_search.startswith('-') and cleaned[1:].isdigit():
+                return Q(**{f'{value_field}__lte': float(cleaned[1:])})
+            if column_search.endswith('-') and cleaned[:-1].isdigit():
+                return Q(**{f'{value_field}__gte': float(cleaned[:-1])})
+            if cleaned.replace('.', '', 1).isdigit():
+                return Q(**{value_field: float(cleaned)})
+            return None
+        
+        return Q(**{f'{text_field}__icontains': column_search})
+    
+    @staticmethod
+    def apply_column_filtering(queryset: QuerySet, request: HttpRequest) -> QuerySet:
         """
         Apply individual column filtering
         
         Args:
-            data: List of data dicts
+            queryset: Annotated user queryset
             request: HTTP request object
             
         Returns:
-            Filtered data list
+            Filtered queryset
         """
-        filtered_data = data
-        
         for i in range(len(DataTablesService.USER_COLUMN_MAPPING)):
             column_search = request.POST.get(f'columns[{i}][search][value]', '')
             if column_search:
                 column_field = DataTablesService.USER_COLUMN_MAPPING.get(i)
                 if column_field:
                     filter_type = DataTablesService.COLUMN_FILTER_TYPES.get(column_field, 'contains')
-                    filtered_data = [
-                        item for item in filtered_data 
-                        if filter_items(column_field, column_search, item, filter_type)
-                    ]
+                    q_filter = DataTablesService.build_column_filter(column_field, column_search, filter_type)
+                    if q_filter is None:
+                        return queryset.none()
+                    queryset = queryset.filter(q_filter)
         
-        return filtered_data
+        return queryset
     
     @staticmethod
-    def apply_global_search(data: List[Dict], search_value: str) -> List[Dict]:
+    def apply_global_search(queryset: QuerySet, search_value: str) -> QuerySet:
         """
         Apply global search filtering
         
         Args:
-            data: List of data dicts
+            queryset: Annotated user queryset
             search_value: Search term
             
         Returns:
-            Filtered data list
+            Filtered queryset
         """
         if not search_value:
-            return data
+            return queryset
         
-        search_lower = search_value.lower()
-        return [
-            item for item in data 
-            if any(str(value).lower().find(search_lower) != -1 for value in item.values())
-        ]
+        search_q = Q()
+        for text_field, _ in DataTablesService.COLUMN_QUERY_FIELDS.values():
+            search_q |= Q(**{f'{text_field}__icontains': search_value})
+        return queryset.filter(search_q)
     
     @staticmethod
-    def paginate_data(data: List[Dict], start: int, length: int) -> List[Dict]:
+    def paginate_data(queryset: QuerySet, start: int, length: int) -> QuerySet:
         """
-        Apply pagination to data
+        Apply pagination to queryset (LIMIT/OFFSET)
         
         Args:
-            data: List of data dicts
+            queryset: Ordered user queryset
             start: Start index
             length: Page length
             
         Returns:
-            Paginated data list
+            Sliced queryset
         """
         if length < 0:
-            return data
-        return data[start:start + length]
+            return queryset
+        return queryset[start:start + length]
+    
+    @staticmethod
+    def prepare_user_data(queryset: QuerySet) -> List[Dict[str, Any]]:
+        """
+        Convert the visible page of users to list of dicts for DataTables
+        
+        Args:
+            queryset: Sliced user queryset
+            
+        Returns:
+            List of user data dicts
+        """
+        rows = queryset.values('id', 'created_at', 'fullname', 'username', 'phone', 'status')
+        return [
+            {
+                'id': user['id'],
+                'regdate': user['created_at'],
+                'fullname': user['fullname'],
+                'username': user['username'],
+                'phone': user['phone'] if user['phone'] else "N/A",
+                'status': user['status'],
+                'info': reverse('user_details', kwargs={'userid': int(user['id'])})
+            }
+            for user in rows
+        ]
     
     @staticmethod
     def format_final_data(data: List[Dict], start: int, length: int) -> List[Dict]:
@@ -620,32 +683,32 @@ def users_page(request: HttpRequest) -> HttpResponse:
                 queryset, params['start_date_str'], params['end_date_str']
             )
             
-            # Prepare base data
-            base_data = DataTablesService.prepare_user_data(queryset)
-            total_records = len(base_data)
-            
-            # Apply sorting
-            base_data = DataTablesService.apply_sorting(
-                base_data, params['order_column_index'], params['order_dir']
-            )
+            # Annotate display columns and count
+            queryset = DataTablesService.annotate_columns(queryset)
+            total_records = queryset.count()
             
             # Apply column filtering
-            base_data = DataTablesService.apply_column_filtering(base_data, request)
+            queryset = DataTablesService.apply_column_filtering(queryset, request)
             
             # Apply global search
-            base_data = DataTablesService.apply_global_search(base_data, params['search_value'])
+            queryset = DataTablesService.apply_global_search(queryset, params['search_value'])
             
             # Calculate filtered record count
-            records_filtered = len(base_data)
+            records_filtered = queryset.count()
+            
+            # Apply sorting
+            queryset = DataTablesService.apply_sorting(
+                queryset, params['order_column_index'], params['order_dir']
+            )
             
             # Apply pagination
-            paginated_data = DataTablesService.paginate_data(
-                base_data, params['start'], params['length']
+            paginated_qs = DataTablesService.paginate_data(
+                queryset, params['start'], params['length']
             )
             
-            # Format final data
+            # Fetch and format only the visible page
             final_data = DataTablesService.format_final_data(
-                paginated_data, params['start'], params['length']
+                DataTablesService.prepare_user_data(paginated_qs), params['start'], params['length']
             )
             
             # Prepare AJAX response
@@ -24,6 +24,8 @@ INSTALLED_APPS = [
     'apps.courses',
     'apps.students',
     'apps.stationery',
+    'apps.search',
+    'apps.imports',
     'django.contrib.humanize',
 ]
 
@@ -36,6 +38,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'apps.dashboard.activity.ActivityFlushMiddleware',
 ]
 
 ROOT_URLCONF = 'meddy.urls'
@@ -59,11 +62,82 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'meddy.wsgi.application'
 
+# PRAGMAs run on every new SQLite connection: WAL lets readers work while an
+# import is writing, busy_timeout (ms) makes writers wait for the lock
+# instead of failing with "database is locked". WAL mode is persistent; the
+# bundled database is stored in it, so connecting leaves the file untouched
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 20000,
+    'mmap_size': 268435456,
+    'cache_size': -65536,
+    'temp_store': 'MEMORY',
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'meddy_stationery.sqlite3',
-    }
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # take the write lock when atomic() starts, so a transaction that
+            # reads first cannot fail later when it upgrades to a writer
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+            'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+        },
+    },
+    # read-only copy used by the file exports and dashboard metrics; a
+    # SQLite snapshot refreshed with `manage.py refresh_reporting_db` (or
+    # automatically once stale), or point it at a PostgreSQL replica
+    'reporting': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'meddy_reporting.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'OPTIONS': {
+            'timeout': 20,
+            'init_command': 'PRAGMA query_only=ON;PRAGMA mmap_size=268435456',
+        },
+        # tests read the default test database through this alias
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+# reporting reads (utils/db_router.py) fall back to 'default' when the
+# reporting database is more than REPORTING_MAX_STALENESS seconds behind
+DATABASE_ROUTERS = ['utils.db_router.ReportingRouter']
+REPORTING_DB_ALIAS = 'reporting'
+REPORTING_MAX_STALENESS = 300
+
+# cache backend, picked with the MEDDY_CACHE environment variable:
+# 'file' (default, shared by the workers of one machine), 'redis'
+# (MEDDY_REDIS_URL; needs the redis package) or 'locmem' (per process, only
+# for a single-process server). Change stamps, reference data and the
+# typeahead index are only coherent across workers with a shared backend
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'meddy',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('MEDDY_REDIS_URL', 'redis://127.0.0.1:6379/1'),
+    },
+}
+CACHES = {
+    'default': {
+        'TIMEOUT': 300,
+        'KEY_PREFIX': 'meddy',
+        **CACHE_BACKENDS[os.environ.get('MEDDY_CACHE', 'file')],
+    },
 }
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -97,6 +171,42 @@ STORAGES = {
 MEDIA_URL = "/uploads/"
 MEDIA_ROOT = BASE_DIR / "uploads"
 
+# background imports: worker threads per process, and seconds without
+# progress after which a queued/running job is reported as interrupted
+IMPORT_JOB_WORKERS = 1
+IMPORT_JOB_STALE_AFTER = 600
+
+# import uploads (.xlsx or .csv) larger than IMPORT_MAX_UPLOAD_BYTES or with
+# more than IMPORT_MAX_ROWS data rows are refused before parsing
+IMPORT_MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+IMPORT_MAX_ROWS = 20000
+
+# checked (dry-run) import files are kept this many seconds, for paging
+# through the preview and importing without re-reading the file; the parsed
+# rows are stored under IMPORT_PREVIEW_DIR (defaults to MEDIA_ROOT/cache/imports)
+IMPORT_PREVIEW_TTL = 1800
+
+# rendered cover pages: in-memory LRU size per process, and the on-disk
+# spill (defaults to MEDIA_ROOT/cache/covers) with its file limit
+COVER_CACHE_MAX_ITEMS = 256
+COVER_CACHE_MAX_FILES = 5000
+
+# activity log: buffered rows are written in batches of ACTIVITY_BUFFER_SIZE,
+# after ACTIVITY_FLUSH_SECONDS or at request end; rows older than
+# ACTIVITY_RETENTION_DAYS are moved to ACTIVITY_ARCHIVE_DIR by
+# `manage.py archive_activity`; the dashboard reads the newest
+# ACTIVITY_RECENT_SIZE entries from the cache
+ACTIVITY_BUFFER_SIZE = 50
+ACTIVITY_FLUSH_SECONDS = 5
+ACTIVITY_RETENTION_DAYS = 365
+ACTIVITY_ARCHIVE_DIR = BASE_DIR / "archive" / "activity"
+ACTIVITY_RECENT_SIZE = 20
+ACTIVITY_RECENT_TTL = 300
+
+# cover page typeahead: seconds before a process rebuilds its in-memory
+# prefix index even without a change signal
+AUTOCOMPLETE_MAX_AGE = 300
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -16,4 +16,5 @@ urlpatterns = [
     path('courses/', include('apps.courses.urls')),
     path('students/', include('apps.students.urls')),
     path('cover-page/', include('apps.stationery.urls')),
+    path('imports/', include('apps.imports.urls')),
 ]
@@ -20,6 +20,7 @@ class CoursesManager {
       deleteCourseModal: "#delete_course_modal",
       searchField: "#search_course_field",
       coursesPageUrl: "#courses_page_url",
+      coursesExportUrl: "#courses_export_url",
       deleteMultipleModal: "#delete_all_courses",
 
       // Form fields
@@ -37,6 +38,9 @@ class CoursesManager {
       excelCourseForm: "#excel_course_form",
       excelCourseBtn: "#excel_course_btn",
       excelFile: "#course_excel_file",
+      importUpdate: "#course_import_update",
+      checkFileBtn: "#course_check_btn",
+      importPreview: "#course_import_preview",
       modeToggle: 'input[name="entry_mode"]',
       singleContainer: "#single_entry_container",
       multiContainer: "#multi_entry_container",
@@ -303,6 +307,64 @@ class CoursesManager {
 
       this.handleExcelSubmit(form, submitBtn, formSms);
     });
+
+    $(this.selectors.checkFileBtn).on("click", () => {
+      this.handleFileCheck($(`${this.selectors.excelCourseForm} .formsms`));
+    });
+
+    // A new file or mode needs a new check
+    $(`${this.selectors.excelFile}, ${this.selectors.importUpdate}`).on("change", () => {
+      this.previewToken = null;
+      $(this.selectors.importPreview).empty();
+    });
+  }
+
+  /**
+   * Check the selected file without importing it and show the preview
+   */
+  handleFileCheck(formSms) {
+    const fileInput = $(this.selectors.excelFile)[0];
+    if (!fileInput.files.length) {
+      this.displayAlert(formSms, false, "Choose a file to check.");
+      return;
+    }
+
+    const formData = new FormData();
+    formData.append("excel_file", fileInput.files[0]);
+    formData.append("dry_run", "true");
+    if ($(this.selectors.importUpdate).is(":checked")) {
+      formData.append("import_mode", "upsert");
+    }
+    const checkBtn = $(this.selectors.checkFileBtn);
+
+    $.ajax({
+      type: "POST",
+      url: $(this.selectors.excelCourseForm).attr("action"),
+      data: formData,
+      dataType: "json",
+      contentType: false,
+      processData: false,
+      headers: { "X-CSRFToken": this.config.csrfToken },
+      beforeSend: () => {
+        checkBtn.html("<i class='fas fa-spinner fa-pulse'></i>").prop("disabled", true);
+      },
+      success: (response) => {
+        checkBtn.html("Check file").prop("disabled", false);
+        if (!response.success) {
+          this.displayAlert(formSms, false, response.sms);
+          return;
+        }
+
+        formSms.html("");
+        // Upload then imports the checked rows instead of sending the file again
+        this.previewToken = response.importable ? response.token : null;
+        new ImportPreview($(this.selectors.importPreview), response).render();
+      },
+      error: () => {
+        checkBtn.html("Check file").prop("disabled", false);
+        this.displayAlert(formSms, false, "Server error while checking the file.");
+      },
+    });
   }
 
   /**
@@ -311,7 +373,14 @@ class CoursesManager {
   handleExcelSubmit(form, submitBtn, formSms) {
     const fileInput = $(this.selectors.excelFile)[0];
     const formData = new FormData();
-    formData.append("excel_file", fileInput.files[0]);
+    if (this.previewToken) {
+      formData.append("preview_token", this.previewToken);
+    } else {
+      formData.append("excel_file", fileInput.files[0]);
+      if ($(this.selectors.importUpdate).is(":checked")) {
+        formData.append("import_mode", "upsert");
+      }
+    }
 
     $.ajax({
       type: "POST",
@@ -327,10 +396,33 @@ class CoursesManager {
           .attr("type", "button");
       },
       success: (response) => {
-        submitBtn.html("Upload").attr("type", "submit");
-        this.displayAlert(formSms, response.success, response.sms);
         form[0].reset();
-        this.table.draw();
+        this.previewToken = null;
+        $(this.selectors.importPreview).empty();
+
+        if (!response.status_url) {
+          submitBtn.html("Upload").attr("type", "submit");
+          this.displayAlert(formSms, response.success, response.sms);
+          return;
+        }
+
+        formSms.html(`<small class="text-muted">${response.sms}</small>`);
+        new ImportJobPoller(response.status_url, {
+          onProgress: (job) => {
+            formSms.html(
+              `<small class="text-muted"><i class='fas fa-spinner fa-pulse'></i> ${ImportJobPoller.describe(job)}</small>`,
+            );
+          },
+          onDone: (job) => {
+            submitBtn.html("Upload").attr("type", "submit");
+            this.displayAlert(formSms, job.result.success, job.result.sms);
+            this.table.draw();
+          },
+          onError: (message) => {
+            submitBtn.html("Upload").attr("type", "submit");
+            this.displayAlert(formSms, false, message);
+          },
+        }).start();
       },
       error: () => {
         submitBtn.html("Upload").attr("type", "submit");
@@ -580,12 +672,10 @@ class CoursesManager {
       fixedHeader: true,
       processing: true,
       serverSide: true,
-      ajax: {
-        url: $(this.selectors.coursesPageUrl).val(),
-        type: "POST",
-        dataType: "json",
-        headers: { "X-CSRFToken": this.config.csrfToken },
-      },
+      ajax: ConditionalTableAjax.create(
+        $(this.selectors.coursesPageUrl).val(),
+        this.config.csrfToken,
+      ),
       columns: [
         { data: null },
         { data: "count" },
@@ -692,10 +782,16 @@ class CoursesManager {
         ...baseConfig,
       },
       {
-        extend: "excel",
         text: "<i class='fas fa-file-excel'></i>",
         titleAttr: "Export to Excel",
-        ...baseConfig,
+        className: baseConfig.className,
+        action: (e, dt) => this.downloadExport(dt, "xlsx"),
+      },
+      {
+        text: "<i class='fas fa-file-csv'></i>",
+        titleAttr: "Export to CSV",
+        className: baseConfig.className,
+        action: (e, dt) => this.downloadExport(dt, "csv"),
       },
       {
         extend: "print",
@@ -747,6 +843,13 @@ class CoursesManager {
     }
   }
 
+  /**
+   * Excel/CSV are generated server-side from the current filters and sort
+   */
+  downloadExport(dt, format) {
+    TableExport.download($(this.selectors.coursesExportUrl).val(), dt, format, this.config.csrfToken);
+  }
+
   getExportAction() {
     return function (e, dt, button, config) {
       var self = this;
@@ -765,14 +868,6 @@ class CoursesManager {
               button,
               config,
             );
-          } else if (button[0].className.indexOf("buttons-excel") >= 0) {
-            $.fn.dataTable.ext.buttons.excelHtml5.action.call(
-              self,
-              e,
-              dt,
-              button,
-              config,
-            );
           } else if (button[0].className.indexOf("buttons-pdf") >= 0) {
             $.fn.dataTable.ext.buttons.pdfHtml5.action.call(
               self,
@@ -97,6 +97,203 @@ class MasterLayoutManager {
   }
 }
 
+/* Polls a background Excel import job until it finishes */
+class ImportJobPoller {
+  constructor(statusUrl, { onProgress, onDone, onError, interval = 1000 }) {
+    this.statusUrl = statusUrl;
+    this.onProgress = onProgress || (() => {});
+    this.onDone = onDone || (() => {});
+    this.onError = onError || (() => {});
+    this.interval = interval;
+  }
+
+  /**
+   * Start polling the status endpoint
+   */
+  start() {
+    $.ajax({
+      type: "GET",
+      url: this.statusUrl,
+      dataType: "json",
+      success: (job) => {
+        if (!job.success) {
+          this.onError(job.sms);
+        } else if (job.finished) {
+          this.onDone(job);
+        } else {
+          this.onProgress(job);
+          setTimeout(() => this.start(), this.interval);
+        }
+      },
+      error: () => this.onError("Lost connection while importing."),
+    });
+  }
+
+  /**
+   * Human readable progress line, e.g. "1,500 / 5,000 rows (12 failed), ~20s left"
+   */
+  static describe(job) {
+    if (job.status === "queued") return "Waiting to start...";
+
+    let text = job.rows_processed.toLocaleString();
+    if (job.total_rows) text += ` / ${job.total_rows.toLocaleString()}`;
+    text += " rows";
+    if (job.rows_failed) text += ` (${job.rows_failed.toLocaleString()} failed)`;
+    if (job.eta_seconds !== null) text += `, ~${job.eta_seconds}s left`;
+    return text;
+  }
+}
+
+/* Shows the result of a dry-run import check: counts and a paged list of rows */
+class ImportPreview {
+  constructor(container, result) {
+    this.container = container;
+    this.result = result;
+  }
+
+  /**
+   * Render the counts and a page of rows ({rows, page, pages})
+   */
+  render(page = this.result.preview) {
+    const counts = $("<div>", { class: "mb-2" });
+    Object.entries(this.result.counts).forEach(([status, count]) => {
+      counts.append(
+        $("<span>", { class: "badge bg-light text-dark border me-1" }).text(
+          `${status.replace(/_/g, " ")}: ${count.toLocaleString()}`,
+        ),
+      );
+    });
+
+    const body = $("<tbody>");
+    page.rows.forEach((row) => {
+      body.append(
+        $("<tr>").append(
+          $("<td>").text(row.row),
+          $("<td>").text(row.status),
+          $("<td>").text(row.cells.join(", ")),
+          $("<td>").text(row.reason || row.warning),
+        ),
+      );
+    });
+
+    const pager = $("<div>", { class: "d-flex justify-content-between align-items-center small" }).append(
+      this.pageButton("Previous", page.page - 1, page.page <= 1),
+      $("<span>").text(`Page ${page.page} of ${page.pages}`),
+      this.pageButton("Next", page.page + 1, page.page >= page.pages),
+    );
+
+    this.container.empty().append(
+      $("<small>", { class: "text-muted d-block mb-1" }).text(this.result.sms),
+      counts,
+      $("<div>", { class: "table-responsive", style: "max-height: 300px" }).append(
+        $("<table>", { class: "table table-sm small mb-1" }).append(
+          $("<thead>").append($("<tr>").append("<th>Row</th><th>Status</th><th>Cells</th><th>Note</th>")),
+          body,
+        ),
+      ),
+      pager,
+    );
+  }
+
+  pageButton(label, number, disabled) {
+    return $("<button>", { type: "button", class: "btn btn-sm btn-link", disabled: disabled })
+      .text(label)
+      .on("click", () => this.load(number));
+  }
+
+  /**
+   * Fetch and render another page of the preview
+   */
+  load(number) {
+    $.ajax({
+      type: "GET",
+      url: this.result.page_url,
+      data: { page: number },
+      dataType: "json",
+      success: (page) => this.render(page),
+      error: (xhr) => {
+        const message = xhr.responseJSON ? xhr.responseJSON.sms : "Could not load the file check.";
+        this.container.html($("<small>", { class: "text-danger" }).text(message));
+      },
+    });
+  }
+}
+
+/* Downloads a server-side CSV/XLSX export of a DataTable, using its current filters and sort */
+class TableExport {
+  /**
+   * Submit the table's current ajax params to the export endpoint as a
+   * regular form post, so the browser handles the file download.
+   */
+  static download(exportUrl, dt, format, csrfToken) {
+    const params = { ...dt.ajax.params(), format: format, csrfmiddlewaretoken: csrfToken };
+    const form = $("<form>", { method: "POST", action: exportUrl }).hide();
+
+    $.param(params)
+      .split("&")
+      .forEach((pair) => {
+        const [name, value = ""] = pair.split("=").map((part) => decodeURIComponent(part.replace(/\+/g, " ")));
+        form.append($("<input>", { type: "hidden", name: name, value: value }));
+      });
+
+    form.appendTo("body").trigger("submit").remove();
+  }
+}
+
+/* DataTables ajax source that revalidates pages it has already fetched */
+class ConditionalTableAjax {
+  /**
+   * Returns a DataTables `ajax` function posting to `url`. Responses are
+   * kept per request (minus `draw`) with their ETag; asking again sends
+   * If-None-Match, and a 304 redraws from the kept copy.
+   */
+  static create(url, csrfToken, maxEntries = 30) {
+    const pages = new Map();
+
+    return (data, callback) => {
+      const { draw, ...params } = data;
+      const key = JSON.stringify(params);
+      const cached = pages.get(key);
+      const headers = { "X-CSRFToken": csrfToken };
+      if (cached) {
+        headers["If-None-Match"] = cached.etag;
+      }
+
+      $.ajax({
+        url: url,
+        type: "POST",
+        data: data,
+        dataType: "json",
+        headers: headers,
+        success: (json, status, xhr) => {
+          if (xhr.status === 304 && cached) {
+            callback({ ...cached.json, draw: draw });
+            return;
+          }
+          const etag = xhr.getResponseHeader("ETag");
+          pages.delete(key);
+          if (etag) {
+            pages.set(key, { etag: etag, json: json });
+            if (pages.size > maxEntries) {
+              pages.delete(pages.keys().next().value);
+            }
+          }
+          callback(json);
+        },
+        error: (xhr) => {
+          callback({
+            draw: draw,
+            recordsTotal: 0,
+            recordsFiltered: 0,
+            data: [],
+            error: `Could not load table data (${xhr.status}).`,
+          });
+        },
+      });
+    };
+  }
+}
+
 // Initialize when DOM is ready
 $(document).ready(function () {
   window.masterLayout = new MasterLayoutManager();
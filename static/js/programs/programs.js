@@ -16,6 +16,7 @@ class ProgramsManager {
       deleteProgramModal: "#delete_program_modal",
       searchField: "#search_program_field",
       programsPageUrl: "#programs_page_url",
+      programsExportUrl: "#programs_export_url",
       deleteMultipleModal: "#delete_all_programs",
 
       // Form fields
@@ -31,6 +32,9 @@ class ProgramsManager {
       excelProgramForm: "#excel_program_form",
       excelProgramBtn: "#excel_program_btn",
       excelFile: "#program_excel_file",
+      importUpdate: "#program_import_update",
+      checkFileBtn: "#program_check_btn",
+      importPreview: "#program_import_preview",
       modeToggle: 'input[name="entry_mode"]',
       singleContainer: "#single_entry_container",
       multiContainer: "#multi_entry_container",
@@ -223,6 +227,64 @@ class ProgramsManager {
 
       this.handleExcelSubmit(form, submitBtn, formSms);
     });
+
+    $(this.selectors.checkFileBtn).on("click", () => {
+      this.handleFileCheck($(`${this.selectors.excelProgramForm} .formsms`));
+    });
+
+    // A new file or mode needs a new check
+    $(`${this.selectors.excelFile}, ${this.selectors.importUpdate}`).on("change", () => {
+      this.previewToken = null;
+      $(this.selectors.importPreview).empty();
+    });
+  }
+
+  /**
+   * Check the selected file without importing it and show the preview
+   */
+  handleFileCheck(formSms) {
+    const fileInput = $(this.selectors.excelFile)[0];
+    if (!fileInput.files.length) {
+      this.displayAlert(formSms, false, "Choose a file to check.");
+      return;
+    }
+
+    const formData = new FormData();
+    formData.append("excel_file", fileInput.files[0]);
+    formData.append("dry_run", "true");
+    if ($(this.selectors.importUpdate).is(":checked")) {
+      formData.append("import_mode", "upsert");
+    }
+    const checkBtn = $(this.selectors.checkFileBtn);
+
+    $.ajax({
+      type: "POST",
+      url: $(this.selectors.excelProgramForm).attr("action"),
+      data: formData,
+      dataType: "json",
+      contentType: false,
+      processData: false,
+      headers: { "X-CSRFToken": this.config.csrfToken },
+      beforeSend: () => {
+        checkBtn.html("<i class='fas fa-spinner fa-pulse'></i>").prop("disabled", true);
+      },
+      success: (response) => {
+        checkBtn.html("Check file").prop("disabled", false);
+        if (!response.success) {
+          this.displayAlert(formSms, false, response.sms);
+          return;
+        }
+
+        formSms.html("");
+        // Upload then imports the checked rows instead of sending the file again
+        this.previewToken = response.importable ? response.token : null;
+        new ImportPreview($(this.selectors.importPreview), response).render();
+      },
+      error: () => {
+        checkBtn.html("Check file").prop("disabled", false);
+        this.displayAlert(formSms, false, "Server error while checking the file.");
+      },
+    });
   }
 
   /**
@@ -231,7 +293,14 @@ class ProgramsManager {
   handleExcelSubmit(form, submitBtn, formSms) {
     const fileInput = $(this.selectors.excelFile)[0];
     const formData = new FormData();
-    formData.append("excel_file", fileInput.files[0]);
+    if (this.previewToken) {
+      formData.append("preview_token", this.previewToken);
+    } else {
+      formData.append("excel_file", fileInput.files[0]);
+      if ($(this.selectors.importUpdate).is(":checked")) {
+        formData.append("import_mode", "upsert");
+      }
+    }
 
     $.ajax({
       type: "POST",
@@ -247,10 +316,33 @@ class ProgramsManager {
           .attr("type", "button");
       },
       success: (response) => {
-        submitBtn.html("Upload").attr("type", "submit");
-        this.displayAlert(formSms, response.success, response.sms);
         form[0].reset();
-        this.table.draw();
+        this.previewToken = null;
+        $(this.selectors.importPreview).empty();
+
+        if (!response.status_url) {
+          submitBtn.html("Upload").attr("type", "submit");
+          this.displayAlert(formSms, response.success, response.sms);
+          return;
+        }
+
+        formSms.html(`<small class="text-muted">${response.sms}</small>`);
+        new ImportJobPoller(response.status_url, {
+          onProgress: (job) => {
+            formSms.html(
+              `<small class="text-muted"><i class='fas fa-spinner fa-pulse'></i> ${ImportJobPoller.describe(job)}</small>`,
+            );
+          },
+          onDone: (job) => {
+            submitBtn.html("Upload").attr("type", "submit");
+            this.displayAlert(formSms, job.result.success, job.result.sms);
+            this.table.draw();
+          },
+          onError: (message) => {
+            submitBtn.html("Upload").attr("type", "submit");
+            this.displayAlert(formSms, false, message);
+          },
+        }).start();
       },
       error: () => {
         submitBtn.html("Upload").attr("type", "submit");
@@ -424,12 +516,10 @@ class ProgramsManager {
       fixedHeader: true,
       processing: true,
       serverSide: true,
-      ajax: {
-        url: $(this.selectors.programsPageUrl).val(),
-        type: "POST",
-        dataType: "json",
-        headers: { "X-CSRFToken": this.config.csrfToken },
-      },
+      ajax: ConditionalTableAjax.create(
+        $(this.selectors.programsPageUrl).val(),
+        this.config.csrfToken,
+      ),
       columns: [
         { data: null },
         { data: "count" },
@@ -529,10 +619,16 @@ class ProgramsManager {
         ...baseConfig,
       },
       {
-        extend: "excel",
         text: "<i class='fas fa-file-excel'></i>",
         titleAttr: "Export to Excel",
-        ...baseConfig,
+        className: baseConfig.className,
+        action: (e, dt) => this.downloadExport(dt, "xlsx"),
+      },
+      {
+        text: "<i class='fas fa-file-csv'></i>",
+        titleAttr: "Export to CSV",
+        className: baseConfig.className,
+        action: (e, dt) => this.downloadExport(dt, "csv"),
       },
       {
         extend: "print",
@@ -584,6 +680,13 @@ class ProgramsManager {
     }
   }
 
+  /**
+   * Excel/CSV are generated server-side from the current filters and sort
+   */
+  downloadExport(dt, format) {
+    TableExport.download($(this.selectors.programsExportUrl).val(), dt, format, this.config.csrfToken);
+  }
+
   getExportAction() {
     return function (e, dt, button, config) {
       var self = this;
@@ -602,14 +705,6 @@ class ProgramsManager {
               button,
               config,
             );
-          } else if (button[0].className.indexOf("buttons-excel") >= 0) {
-            $.fn.dataTable.ext.buttons.excelHtml5.action.call(
-              self,
-              e,
-              dt,
-              button,
-              config,
-            );
           } else if (button[0].className.indexOf("buttons-pdf") >= 0) {
             $.fn.dataTable.ext.buttons.pdfHtml5.action.call(
               self,
@@ -45,9 +45,11 @@ class CoverPageManager {
       studentsTable: "#students_table",
       actionsUrl: "#actions_url",
       coverPageUrl: "#cover_page_url",
+      coverPdfUrl: "#cover_pdf_url",
 
       // Buttons
       btnSavePage: "#btn_save_page",
+      btnPagesPdf: "#btn_pages_pdf",
       btnSaveQuestion: "#saveQsnBtn",
       btnNewQuestion: "#newQuestionBtn",
       btnClearStudents: "#btn_clear_all_students",
@@ -60,12 +62,19 @@ class CoverPageManager {
       questionPreview: "#div_question div",
     };
 
+    // Saved page id -> page info, preloaded for the visible saved-pages list
+    this.pageInfoCache = new Map();
+
     this.init();
   }
 
   init() {
     this.initializePaginationManagers();
     this.setupEventListeners();
+    const bootPages = window.coverBootstrap?.pages?.items;
+    this.preloadPageInfo(
+      bootPages ? bootPages.map((pg) => pg.id) : this.listedPageIds(),
+    );
   }
 
   // Pagination Setup
@@ -79,8 +88,9 @@ class CoverPageManager {
         "#btn_next_student",
         ".custom-section:has(.students) .pagination-info span",
         "students",
-        window.initialPaginationData?.students,
+        window.coverBootstrap?.students?.pagination,
         this.renderStudents.bind(this),
+        true,
       ),
       programs: this.createPaginationManager(
         "programs",
@@ -90,8 +100,9 @@ class CoverPageManager {
         "#btn_next_prog",
         ".custom-section:has(.programs) .pagination-info span",
         "programs",
-        window.initialPaginationData?.programs,
+        window.coverBootstrap?.programs?.pagination,
         this.renderPrograms.bind(this),
+        true,
       ),
       courses: this.createPaginationManager(
         "courses",
@@ -101,8 +112,9 @@ class CoverPageManager {
         "#btn_next_course",
         ".custom-section:has(.courses) .pagination-info span",
         "courses",
-        window.initialPaginationData?.courses,
+        window.coverBootstrap?.courses?.pagination,
         this.renderCourses.bind(this),
+        true,
       ),
       questions: this.createPaginationManager(
         "questions",
@@ -112,7 +124,7 @@ class CoverPageManager {
         "#btn_next_qn",
         ".custom-section:has(.questions) .pagination-info span",
         "questions",
-        window.initialPaginationData?.questions,
+        window.coverBootstrap?.questions?.pagination,
         this.renderQuestions.bind(this),
       ),
       pages: this.createPaginationManager(
@@ -123,7 +135,7 @@ class CoverPageManager {
         "#btn_next_page",
         ".custom-section:has(.pages) .pagination-info span",
         "pages",
-        window.initialPaginationData?.pages,
+        window.coverBootstrap?.pages?.pagination,
         this.renderPages.bind(this),
       ),
     };
@@ -139,6 +151,7 @@ class CoverPageManager {
     label,
     initialData,
     renderFn,
+    autocomplete = false,
   ) {
     return new PaginationManager({
       sectionType,
@@ -150,6 +163,7 @@ class CoverPageManager {
       itemLabel: label,
       initialPagination: initialData,
       renderCallback: renderFn,
+      autocomplete,
     });
   }
 
@@ -256,6 +270,41 @@ class CoverPageManager {
                 </div>`;
     });
     $container.html(html);
+    this.preloadPageInfo(pages.map((pg) => pg.id));
+  }
+
+  listedPageIds() {
+    return $(this.selectors.pagesList)
+      .find(".item-delete")
+      .map((i, el) => $(el).data("pg"))
+      .get();
+  }
+
+  /**
+   * Fetch the info of all listed saved pages in one request
+   */
+  preloadPageInfo(ids) {
+    this.pageInfoCache.clear();
+    if (ids.length === 0) return;
+
+    const formData = new FormData();
+    formData.append("pages_info", ids.join(","));
+
+    $.ajax({
+      type: "POST",
+      url: $(this.selectors.actionsUrl).val(),
+      data: formData,
+      dataType: "json",
+      contentType: false,
+      processData: false,
+      headers: { "X-CSRFToken": getCSRFToken() },
+      success: (response) => {
+        if (!response.success) return;
+        Object.entries(response.pages).forEach(([id, info]) => {
+          this.pageInfoCache.set(parseInt(id), info);
+        });
+      },
+    });
   }
 
   createEmptyState(icon, message) {
@@ -384,6 +433,9 @@ class CoverPageManager {
     // Save entire page
     $(this.selectors.btnSavePage).on("click", () => this.savePage());
 
+    // Batch PDF of the saved pages currently listed
+    $(this.selectors.btnPagesPdf).on("click", () => this.printSavedPages());
+
     // Editable fields click → modal
     $(".body div.txt_content span").on("click", function () {
       self.openEditModal($(this));
@@ -758,8 +810,8 @@ class CoverPageManager {
         if (response.success) {
           $deleteIcon.closest(".item").remove();
           isQuestion
-            ? this.pagination.questions.loadPage(1)
-            : this.pagination.pages.loadPage(1);
+            ? this.pagination.questions.loadFirst()
+            : this.pagination.pages.loadFirst();
         } else {
           $deleteIcon.attr("class", originalClass);
         }
@@ -798,7 +850,7 @@ class CoverPageManager {
           () => $("#qs_status_div").addClass("d-none").removeClass("d-block"),
           5000,
         );
-        this.pagination.questions.loadPage(1);
+        this.pagination.questions.loadFirst();
       },
       error: () => {
         $btn.html(originalText);
@@ -890,7 +942,7 @@ class CoverPageManager {
       headers: { "X-CSRFToken": getCSRFToken() },
       success: (response) => {
         $btn.html(originalText);
-        this.pagination.pages.loadPage(1);
+        this.pagination.pages.loadFirst();
         alert(response.sms);
       },
       error: () => {
@@ -900,7 +952,24 @@ class CoverPageManager {
     });
   }
 
+  printSavedPages() {
+    const ids = this.listedPageIds();
+
+    if (ids.length === 0) {
+      alert("No saved pages to print");
+      return;
+    }
+
+    const url = $(this.selectors.coverPdfUrl).val() + "?ids=" + ids.join(",");
+    window.open(url, "_blank");
+  }
+
   loadSavedPage(pageId) {
+    if (this.pageInfoCache.has(pageId)) {
+      this.applySavedPage(this.pageInfoCache.get(pageId));
+      return;
+    }
+
     const formData = new FormData();
     formData.append("page_info", pageId);
 
@@ -912,49 +981,50 @@ class CoverPageManager {
       contentType: false,
       processData: false,
       headers: { "X-CSRFToken": getCSRFToken() },
-      success: (response) => {
-        const pg = response;
-        this.clearAllStudents();
-        this.selectedStreams.clear();
-
-        $(".pagepannel .stream-pill").removeClass("active");
-        pg.streams.forEach((stream) => {
-          this.selectedStreams.add(stream);
-          $(`#pillsList span[data-strm="${stream}"]`).addClass("active");
-        });
+      success: (response) => this.applySavedPage(response),
+      error: () => alert("Failed to load saved page"),
+    });
+  }
 
-        this.handleTaskTypeChange(
-          pg.task.toLowerCase().includes("group") ? "group" : "individual",
-        );
-        this.updateProgram(pg.prog, pg.class);
-        this.updateCourse(pg.course, pg.code, pg.facil);
-        this.updateGroupNumber(pg.grpno);
-
-        const formattedDate = this.formatDisplayDate(pg.subdate);
-        const $icon = $(this.selectors.divSubmissionDate).find("span").detach();
-        $(this.selectors.divSubmissionDate).html(formattedDate).append($icon);
-
-        $(this.selectors.richEditor).html(pg.qn);
-        this.updateQuestionPreview();
-
-        pg.students.forEach((student) => {
-          this.toggleStudentSelection(
-            student.id,
-            student.fullname,
-            student.regnumber,
-            false,
-            pg.table,
-          );
-        });
+  applySavedPage(pg) {
+    this.clearAllStudents();
+    this.selectedStreams.clear();
 
-        this.selectedProgram = parseInt(pg.progId);
-        this.selectedCourse = parseInt(pg.courseId);
+    $(".pagepannel .stream-pill").removeClass("active");
+    pg.streams.forEach((stream) => {
+      this.selectedStreams.add(stream);
+      $(`#pillsList span[data-strm="${stream}"]`).addClass("active");
+    });
 
-        this.pagination.programs.loadPage(1);
-        this.pagination.courses.loadPage(1);
-      },
-      error: () => alert("Failed to load saved page"),
+    this.handleTaskTypeChange(
+      pg.task.toLowerCase().includes("group") ? "group" : "individual",
+    );
+    this.updateProgram(pg.prog, pg.class);
+    this.updateCourse(pg.course, pg.code, pg.facil);
+    this.updateGroupNumber(pg.grpno);
+
+    const formattedDate = this.formatDisplayDate(pg.subdate);
+    const $icon = $(this.selectors.divSubmissionDate).find("span").detach();
+    $(this.selectors.divSubmissionDate).html(formattedDate).append($icon);
+
+    $(this.selectors.richEditor).html(pg.qn);
+    this.updateQuestionPreview();
+
+    pg.students.forEach((student) => {
+      this.toggleStudentSelection(
+        student.id,
+        student.fullname,
+        student.regnumber,
+        false,
+        pg.table,
+      );
     });
+
+    this.selectedProgram = parseInt(pg.progId);
+    this.selectedCourse = parseInt(pg.courseId);
+
+    this.pagination.programs.loadFirst();
+    this.pagination.courses.loadFirst();
   }
 
   openEditModal($span) {
@@ -1042,10 +1112,17 @@ class PaginationManager {
     this.renderCallback = config.renderCallback;
     this.itemLabel = config.itemLabel || "items";
     this.initialPagination = config.initialPagination;
-
-    // default values
-    this.currentPage = 1;
-    this.totalPages = 1;
+    // pickers answer typed queries from the server's prefix index
+    this.autocomplete = Boolean(config.autocomplete);
+    this.autocompleteRequest = null;
+
+    // default values; pages are addressed by opaque keyset cursors
+    this.nextCursor = null;
+    this.prevCursor = null;
+    this.hasNext = false;
+    this.hasPrevious = false;
+    this.startIndex = 0;
+    this.endIndex = 0;
     this.totalCount = 0;
     this.searchQuery = "";
     this.perPage = 10;
@@ -1064,15 +1141,15 @@ class PaginationManager {
     // event listeners
     $(document).on("click", this.prevBtnSelector, function (e) {
       e.preventDefault();
-      if (self.currentPage > 1) {
-        self.loadPage(self.currentPage - 1);
+      if (self.hasPrevious) {
+        self.loadPrevious();
       }
     });
 
     $(document).on("click", this.nextBtnSelector, function (e) {
       e.preventDefault();
-      if (self.currentPage < self.totalPages) {
-        self.loadPage(self.currentPage + 1);
+      if (self.hasNext) {
+        self.loadNext();
       }
     });
 
@@ -1080,14 +1157,70 @@ class PaginationManager {
     $(document).on(
       "input",
       this.searchInputSelector,
-      this.debounce(function () {
-        self.searchQuery = $(self.searchInputSelector).val().trim();
-        self.currentPage = 1;
-        self.loadPage(1);
-      }, 300),
+      this.debounce(
+        function () {
+          self.searchQuery = $(self.searchInputSelector).val().trim();
+          if (self.autocomplete && self.searchQuery) {
+            self.loadMatches();
+          } else {
+            self.loadFirst();
+          }
+        },
+        this.autocomplete ? 150 : 300,
+      ),
     );
   }
 
+  loadMatches() {
+    const url = $("#cover_autocomplete_url").val();
+    if (!url) {
+      this.loadFirst();
+      return;
+    }
+
+    // only the answer to the latest keystroke matters
+    if (this.autocompleteRequest) {
+      this.autocompleteRequest.abort();
+    }
+    const query = this.searchQuery;
+
+    this.autocompleteRequest = $.ajax({
+      type: "GET",
+      url: url,
+      data: { kind: this.sectionType, q: query, limit: this.perPage },
+      dataType: "json",
+      success: (response) => {
+        if (!response.success || query !== this.searchQuery) {
+          return;
+        }
+        this.renderCallback(response.items);
+        const count = response.items.length;
+        this.updatePaginationState({
+          per_page: this.perPage,
+          has_next: false,
+          has_previous: false,
+          next_cursor: null,
+          prev_cursor: null,
+          total_count: count,
+          total_label: count >= this.perPage ? `${count}+` : `${count}`,
+          start_index: count ? 1 : 0,
+          end_index: count,
+        });
+      },
+      error: (xhr, status) => {
+        if (status !== "abort") {
+          // fall back to the paginated search
+          this.loadFirst();
+        }
+      },
+      complete: (xhr) => {
+        if (this.autocompleteRequest === xhr) {
+          this.autocompleteRequest = null;
+        }
+      },
+    });
+  }
+
   debounce(func, wait) {
     let timeout;
     return function executedFunction(...args) {
@@ -1100,11 +1233,29 @@ class PaginationManager {
     };
   }
 
-  loadPage(page) {
+  loadFirst() {
+    this.loadPage(null, "next", 0);
+  }
+
+  loadNext() {
+    this.loadPage(this.nextCursor, "next", this.endIndex);
+  }
+
+  loadPrevious() {
+    this.loadPage(
+      this.prevCursor,
+      "prev",
+      Math.max(this.startIndex - 1 - this.perPage, 0),
+    );
+  }
+
+  loadPage(cursor, direction, offset) {
     const formData = new FormData();
     formData.append("action", "paginate");
     formData.append("section_type", this.sectionType);
-    formData.append("page", page);
+    formData.append("cursor", cursor || "");
+    formData.append("direction", direction);
+    formData.append("offset", offset);
     formData.append("search", this.searchQuery);
     formData.append("per_page", this.perPage);
 
@@ -1154,15 +1305,20 @@ class PaginationManager {
   }
 
   updatePaginationState(pagination) {
-    this.currentPage = pagination.current_page;
-    this.totalPages = pagination.total_pages;
+    this.nextCursor = pagination.next_cursor;
+    this.prevCursor = pagination.prev_cursor;
+    this.hasNext = pagination.has_next;
+    this.hasPrevious = pagination.has_previous;
+    this.startIndex = pagination.start_index;
+    this.endIndex = pagination.end_index;
     this.totalCount = pagination.total_count;
+    this.perPage = pagination.per_page || this.perPage;
 
     // Update info text
     const infoText =
       pagination.total_count === 0
         ? `No ${this.itemLabel} found`
-        : `Showing ${pagination.start_index} to ${pagination.end_index} of ${pagination.total_count}`;
+        : `Showing ${pagination.start_index} to ${pagination.end_index} of ${pagination.total_label}`;
 
     $(this.paginationInfoSelector).text(infoText);
 
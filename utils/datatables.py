@@ -0,0 +1,370 @@
+import csv
+import hashlib
+import tempfile
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import openpyxl
+from django.db.models import Q, QuerySet
+from django.db.models.functions import Lower
+from django.http import (
+    FileResponse, HttpRequest, HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse,
+)
+from django.utils.http import http_date, parse_etags, quote_etag
+
+from apps.dashboard import activity, changes
+from apps.search.fts import search_q
+from utils.db_router import reporting_alias
+
+# Values typed into a column filter that mean "no value" (IS NULL)
+NULL_TOKENS = ("n/a", "na", "none", "-")
+
+# Rows fetched per round-trip while streaming an export
+EXPORT_CHUNK_SIZE = 2000
+
+
+# =============================================================================
+# Table specification
+# =============================================================================
+
+@dataclass(frozen=True)
+class Column:
+    """
+    One filterable / sortable DataTables column.
+
+    index       -- column position as sent by DataTables (columns[<index>])
+    field       -- ORM path used for the column filter
+    sort_field  -- ORM path used for ordering (defaults to ``field``)
+    filter_kind -- 'contains', 'exact' or 'numeric'
+    null_field  -- ORM path checked with IS NULL when the user types 'n/a';
+                   None disables the shortcut for this column
+    """
+    index: int
+    field: str
+    sort_field: Optional[str] = None
+    filter_kind: str = "contains"
+    null_field: Optional[str] = None
+
+    @property
+    def order_path(self) -> str:
+        return self.sort_field or self.field
+
+
+@dataclass(frozen=True)
+class TableSpec:
+    """
+    Declarative description of a server-side DataTable.
+
+    queryset      -- callable returning the base (unfiltered) queryset
+    values        -- fields fetched with ``.values()``; rows never become model instances
+    row           -- builds one JSON row from a values() dict
+    label / categ -- used for the "data exported" activity entry
+    fulltext      -- (index or scope key, ORM path) pairs answering the global search
+                     through the FTS5 indexes; global_search_fields is the
+                     icontains fallback when the index cannot be used
+    export_columns -- (header, row key) pairs written by the file exports
+    depends_on    -- labels of the models the rows are built from; their
+                     change stamps (apps.dashboard.changes) let unchanged
+                     pages be answered with 304 Not Modified
+    """
+    label: str
+    categ: str
+    queryset: Callable[[], QuerySet]
+    columns: Tuple[Column, ...]
+    global_search_fields: Tuple[str, ...]
+    values: Tuple[str, ...]
+    row: Callable[[Dict[str, Any]], Dict[str, Any]]
+    default_sort: str = "name"
+    numeric_sort_fields: Tuple[str, ...] = field(default=("id",))
+    fulltext: Tuple[Tuple[str, str], ...] = ()
+    export_columns: Tuple[Tuple[str, str], ...] = ()
+    depends_on: Tuple[str, ...] = ()
+
+    def column(self, index: int) -> Optional[Column]:
+        for col in self.columns:
+            if col.index == index:
+                return col
+        return None
+
+
+@dataclass(frozen=True)
+class DataTableParams:
+    draw: int
+    start: int
+    length: int
+    search: str
+    order_column: int
+    order_dir: str
+    column_search: Dict[int, str]
+
+
+# =============================================================================
+# Query building
+# =============================================================================
+
+def _to_int(value: Any, default: int) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def build_column_filter(column: Column, search_value: str) -> Optional[Q]:
+    """
+    Build a Q object for a column-specific filter.
+    Supports:
+      - 'contains' for text
+      - 'exact' for IDs / foreign keys
+      - 'numeric' with '-10' (<= 10), '10-' (>= 10) or '10' (== 10)
+      - 'n/a' → IS NULL on columns that declare a null_field
+    """
+    value = (search_value or "").strip()
+    if not value:
+        return None
+
+    if column.null_field and value.lower() in NULL_TOKENS:
+        return Q(**{f"{column.null_field}__isnull": True})
+
+    if column.filter_kind == "exact":
+        return Q(**{column.field: value})
+
+    if column.filter_kind == "numeric":
+        cleaned = value.replace(",", "")
+        try:
+            if cleaned.startswith("-") and not cleaned.endswith("-"):
+                return Q(**{f"{column.field}__lte": float(cleaned[1:])})
+            if cleaned.endswith("-") and not cleaned.startswith("-"):
+                return Q(**{f"{column.field}__gte": float(cleaned[:-1])})
+            return Q(**{column.field: float(cleaned)})
+        except (ValueError, TypeError):
+            return None
+
+    return Q(**{f"{column.field}__icontains": value})
+
+
+def log_export(spec: TableSpec) -> None:
+    activity.record(
+        categ=spec.categ,
+        title=f"{spec.label.capitalize()} data exported",
+        maelezo=f"All {spec.label} table data has been exported",
+    )
+
+
+class DataTableProcessor:
+    """
+    Shared server-side processing for DataTables: filtering, sorting,
+    counting and paging are all done by the database, and only the
+    projected columns of the visible page are fetched.
+    """
+
+    @staticmethod
+    def parse_request(request: HttpRequest, spec: TableSpec) -> DataTableParams:
+        post = request.POST
+        column_search = {}
+        for col in spec.columns:
+            value = (post.get(f"columns[{col.index}][search][value]", "") or "").strip()
+            if value:
+                column_search[col.index] = value
+
+        return DataTableParams(
+            draw=_to_int(post.get("draw"), 1),
+            start=max(_to_int(post.get("start"), 0), 0),
+            length=_to_int(post.get("length"), 10),
+            search=(post.get("search[value]", "") or "").strip(),
+            order_column=_to_int(post.get("order[0][column]"), -1),
+            order_dir="desc" if post.get("order[0][dir]") == "desc" else "asc",
+            column_search=column_search,
+        )
+
+    @staticmethod
+    def filter_queryset(spec: TableSpec, queryset: QuerySet, params: DataTableParams) -> Tuple[QuerySet, bool]:
+        """Apply global search and column filters. Returns (queryset, was_filtered)."""
+        conditions = Q()
+        filtered = False
+
+        if params.search:
+            q_global = search_q(spec.fulltext, params.search, queryset.db) if spec.fulltext else None
+            if q_global is None:
+                q_global = Q()
+                for path in spec.global_search_fields:
+                    q_global |= Q(**{f"{path}__icontains": params.search})
+            conditions &= q_global
+            filtered = True
+
+        for index, value in params.column_search.items():
+            q_filter = build_column_filter(spec.column(index), value)
+            if q_filter is not None:
+                conditions &= q_filter
+                filtered = True
+
+        if filtered:
+            queryset = queryset.filter(conditions)
+        return queryset, filtered
+
+    @staticmethod
+    def order_queryset(spec: TableSpec, queryset: QuerySet, params: DataTableParams) -> QuerySet:
+        """Order by the requested column with 'id' as a stable tie-breaker."""
+        column = spec.column(params.order_column)
+        sort_field = column.order_path if column else spec.default_sort
+        descending = params.order_dir == "desc"
+
+        if sort_field in spec.numeric_sort_fields:
+            order_expr = f"-{sort_field}" if descending else sort_field
+        else:
+            order_expr = Lower(sort_field).desc() if descending else Lower(sort_field).asc()
+
+        return queryset.order_by(order_expr, "-id" if descending else "id")
+
+    @staticmethod
+    def build_queryset(spec: TableSpec, params: DataTableParams) -> Tuple[QuerySet, QuerySet, bool]:
+        """Returns (base_qs, ordered_filtered_qs, was_filtered)."""
+        base_qs = spec.queryset()
+        filtered_qs, filtered = DataTableProcessor.filter_queryset(spec, base_qs, params)
+        return base_qs, DataTableProcessor.order_queryset(spec, filtered_qs, params), filtered
+
+    @staticmethod
+    def process_request(request: HttpRequest, spec: TableSpec) -> Dict[str, Any]:
+        """Main entry point: returns the complete DataTables JSON payload."""
+        params = DataTableProcessor.parse_request(request, spec)
+        # Table draws read the default database: staff must see their own
+        # writes straight away, so only exports go to the reporting copy
+        base_qs, ordered_qs, filtered = DataTableProcessor.build_queryset(spec, params)
+
+        total_records = base_qs.count()
+        filtered_count = ordered_qs.count() if filtered else total_records
+
+        projected = ordered_qs.values(*spec.values)
+        if params.length > 0:
+            page: List[Dict[str, Any]] = list(projected[params.start:params.start + params.length])
+        else:
+            page = list(projected)
+        if params.length <= 0:
+            log_export(spec)
+
+        rows = [
+            {"count": params.start + i + 1, **spec.row(values)}
+            for i, values in enumerate(page)
+        ]
+
+        return {
+            "draw": params.draw,
+            "recordsTotal": total_records,
+            "recordsFiltered": filtered_count,
+            "data": rows,
+        }
+
+    @staticmethod
+    def data_version(spec: TableSpec) -> Optional[int]:
+        """
+        Stamp (ns) that changes whenever the table's rows can have changed,
+        or None when that cannot be told.
+        """
+        if not spec.depends_on:
+            return None
+        return changes.stamp(*spec.depends_on)
+
+    @staticmethod
+    def respond(request: HttpRequest, spec: TableSpec) -> HttpResponse:
+        """
+        process_request() as a JsonResponse carrying ETag / Last-Modified.
+        The ETag covers the data version and every request parameter but
+        ``draw``, so a client that sends it back in If-None-Match gets a
+        304 (and reuses its copy) until the rows or the request change.
+        """
+        # read before the query: a write landing in between only costs a miss
+        version = DataTableProcessor.data_version(spec)
+        if version is None:
+            return JsonResponse(DataTableProcessor.process_request(request, spec))
+
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{spec.label}|{version}".encode())
+        for key, values in sorted(request.POST.lists()):
+            if key not in ("draw", "csrfmiddlewaretoken"):
+                digest.update(f"|{key}={values}".encode())
+        etag = quote_etag(digest.hexdigest())
+        last_modified = http_date(version // 1_000_000_000)
+
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            response = HttpResponseNotModified()
+        else:
+            response = JsonResponse(DataTableProcessor.process_request(request, spec))
+        response["ETag"] = etag
+        response["Last-Modified"] = last_modified
+        return response
+
+
+# =============================================================================
+# File exports
+# =============================================================================
+
+class _Echo:
+    """File-like object whose write() hands the line back to csv.writer's caller."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+class DataTableExporter:
+    """
+    Server-side CSV / XLSX export of a DataTable, honouring the same filter
+    and sort parameters as the table draw. Rows are streamed from the
+    database with .iterator(), so memory use does not grow with table size.
+    """
+
+    @staticmethod
+    def iter_rows(spec: TableSpec, params: DataTableParams) -> Iterator[List[Any]]:
+        # Streamed after the view returns, so the alias is pinned here
+        _, ordered_qs, _ = DataTableProcessor.build_queryset(spec, params)
+        values_qs = ordered_qs.using(reporting_alias()).values(*spec.values).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        for count, values in enumerate(values_qs, start=1):
+            row = spec.row(values)
+            yield [count] + [row[key] for _, key in spec.export_columns]
+
+    @staticmethod
+    def headers(spec: TableSpec) -> List[str]:
+        return ["S/N"] + [header for header, _ in spec.export_columns]
+
+    @staticmethod
+    def csv_response(spec: TableSpec, params: DataTableParams) -> StreamingHttpResponse:
+        writer = csv.writer(_Echo())
+
+        def stream() -> Iterator[str]:
+            yield "\ufeff"  # BOM so Excel opens the file as UTF-8
+            yield writer.writerow(DataTableExporter.headers(spec))
+            for row in DataTableExporter.iter_rows(spec, params):
+                yield writer.writerow(row)
+
+        response = StreamingHttpResponse(stream(), content_type="text/csv; charset=utf-8")
+        response["Content-Disposition"] = f'attachment; filename="{spec.label}-meddy-stationery.csv"'
+        return response
+
+    @staticmethod
+    def xlsx_response(spec: TableSpec, params: DataTableParams) -> FileResponse:
+        # write_only keeps rows out of memory; the finished workbook is
+        # spooled to a temporary file and streamed back from there.
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet(title=spec.label.capitalize())
+        ws.append(DataTableExporter.headers(spec))
+        for row in DataTableExporter.iter_rows(spec, params):
+            ws.append(row)
+
+        tmp = tempfile.TemporaryFile()
+        wb.save(tmp)
+        tmp.seek(0)
+        return FileResponse(
+            tmp, as_attachment=True, filename=f"{spec.label}-meddy-stationery.xlsx",
+            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
+
+    @staticmethod
+    def export(request: HttpRequest, spec: TableSpec) -> HttpResponse:
+        """Entry point for the export views; 'format' is 'csv' or 'xlsx'."""
+        export_format = request.POST.get("format", "xlsx")
+        if export_format not in ("csv", "xlsx"):
+            return JsonResponse({"success": False, "sms": "Unsupported export format."}, status=400)
+
+        params = DataTableProcessor.parse_request(request, spec)
+        log_export(spec)
+        if export_format == "csv":
+            return DataTableExporter.csv_response(spec, params)
+        return DataTableExporter.xlsx_response(spec, params)
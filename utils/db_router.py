@@ -0,0 +1,170 @@
+"""
+Routing of read-only reporting queries to a secondary database.
+
+REPORTING_DB_ALIAS names a DATABASES entry holding a copy of the default
+database: either a SQLite snapshot refreshed through the backup API
+(refresh_snapshot(), `manage.py refresh_reporting_db`) or a PostgreSQL
+streaming replica. Only reads that tolerate stale data (file exports,
+page-view rollups and dashboard metrics) opt in with ``with reporting():``
+or ``queryset.using(reporting_alias())``; interactive table draws,
+everything else and every write stay on the default database.
+
+When the copy is more than REPORTING_MAX_STALENESS seconds behind, missing
+or unreachable, reads fall back to the default database. A stale SQLite
+snapshot is also refreshed in a background thread.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional, Tuple
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.utils import DatabaseError
+
+logger = logging.getLogger(__name__)
+
+# Seconds a measured replica lag is reused before it is checked again
+LAG_CHECK_SECONDS = 5
+
+_reporting: ContextVar[Optional[str]] = ContextVar("reporting_db", default=None)
+_lag_cache: Dict[str, Tuple[float, Optional[float]]] = {}
+_refresh_lock = threading.Lock()
+
+
+def _reporting_db() -> Optional[str]:
+    alias = getattr(settings, "REPORTING_DB_ALIAS", None)
+    return alias if alias in settings.DATABASES and alias != DEFAULT_DB_ALIAS else None
+
+
+def _snapshot_marker(alias: str) -> str:
+    """File touched after each completed refresh of a SQLite snapshot."""
+    return f"{connections[alias].settings_dict['NAME']}.refreshed"
+
+
+def _measure_lag(alias: str) -> Optional[float]:
+    """Seconds the copy is behind the default database, None when unusable."""
+    vendor = connections[alias].vendor
+    if vendor == "sqlite":
+        try:
+            return max(time.time() - os.path.getmtime(_snapshot_marker(alias)), 0.0)
+        except OSError:
+            return None
+    try:
+        with connections[alias].cursor() as cursor:
+            if vendor == "postgresql":
+                cursor.execute("SELECT EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())")
+                lag = cursor.fetchone()[0]
+                # NULL when the server is not replaying WAL, i.e. it is a primary
+                return float(lag) if lag is not None else 0.0
+            cursor.execute("SELECT 1")
+            return 0.0
+    except DatabaseError as e:
+        logger.warning(f"Reporting database '{alias}' is unavailable: {e}")
+        return None
+
+
+def replica_lag(alias: str) -> Optional[float]:
+    now = time.monotonic()
+    checked_at, lag = _lag_cache.get(alias, (0.0, None))
+    if now - checked_at >= LAG_CHECK_SECONDS or alias not in _lag_cache:
+        lag = _measure_lag(alias)
+        _lag_cache[alias] = (now, lag)
+    return lag
+
+
+def reporting_alias() -> str:
+    """The alias reporting reads should use right now."""
+    alias = _reporting_db()
+    if alias is None:
+        return DEFAULT_DB_ALIAS
+
+    lag = replica_lag(alias)
+    if lag is not None and lag <= getattr(settings, "REPORTING_MAX_STALENESS", 300):
+        return alias
+    if connections[alias].vendor == "sqlite":
+        _refresh_in_background(alias)
+    return DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def reporting() -> Iterator[str]:
+    """
+    Send the reads made inside the block to the reporting database. Nested
+    blocks keep the database chosen by the outermost one.
+    """
+    token = _reporting.set(_reporting.get() or reporting_alias())
+    try:
+        yield _reporting.get()
+    finally:
+        _reporting.reset(token)
+
+
+# =============================================================================
+# SQLite snapshot
+# =============================================================================
+
+def refresh_snapshot(alias: Optional[str] = None) -> bool:
+    """
+    Copy the default SQLite database into the reporting snapshot with the
+    online backup API. Returns False if there is no SQLite snapshot to
+    refresh or another refresh is already running.
+    """
+    alias = alias or _reporting_db()
+    if alias is None or connections[alias].vendor != "sqlite" or connections[DEFAULT_DB_ALIAS].vendor != "sqlite":
+        return False
+    if not _refresh_lock.acquire(blocking=False):
+        return False
+
+    target = connections[alias].settings_dict["NAME"]
+    try:
+        started = time.monotonic()
+        source = sqlite3.connect(connections[DEFAULT_DB_ALIAS].settings_dict["NAME"])
+        destination = sqlite3.connect(target, timeout=60)
+        try:
+            source.backup(destination)
+        finally:
+            destination.close()
+            source.close()
+        with open(_snapshot_marker(alias), "w") as marker:
+            marker.write(f"{time.time()}\n")
+        _lag_cache.pop(alias, None)
+        logger.info(f"Reporting snapshot '{alias}' refreshed in {time.monotonic() - started:.2f}s")
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"Could not refresh reporting snapshot '{alias}': {e}")
+        return False
+    finally:
+        _refresh_lock.release()
+
+
+def _refresh_in_background(alias: str) -> None:
+    if not _refresh_lock.locked():
+        threading.Thread(target=refresh_snapshot, args=(alias,), daemon=True).start()
+
+
+# =============================================================================
+# Router
+# =============================================================================
+
+class ReportingRouter:
+    """
+    Reads inside reporting() go to the reporting database; all writes go
+    to default, and the reporting copy is never migrated.
+    """
+
+    def db_for_read(self, model, **hints) -> Optional[str]:
+        return _reporting.get()
+
+    def db_for_write(self, model, **hints) -> str:
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints) -> Optional[bool]:
+        return False if db == _reporting_db() else None
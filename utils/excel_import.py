@@ -0,0 +1,219 @@
+"""
+Reading uploaded import files (.xlsx or .csv) in row chunks.
+
+open_upload() checks an upload against the size and row limits before any
+row is parsed and returns an ImportSource: a handle on the uploaded data
+that stays readable after the request ends, so the background import job
+reads the upload itself instead of a copy under MEDIA_ROOT.
+iter_sheet_chunks() then streams the rows (openpyxl read-only mode for
+workbooks, the csv module for CSV files).
+"""
+import csv
+import io
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import openpyxl
+from django.core.files.uploadedfile import UploadedFile
+from django.template.defaultfilters import filesizeformat
+
+# Rows handled per validation query / bulk insert. Kept well below SQLite's
+# bound-parameter limit for the IN (...) lookups.
+IMPORT_CHUNK_SIZE = 500
+
+Row = Tuple[int, Sequence[Any]]
+
+# progress(rows_processed, rows_failed), called after each committed chunk
+ProgressCallback = Callable[[int, int], None]
+
+# Accepted upload formats, by file extension
+UPLOAD_FORMATS = {".xlsx": "xlsx", ".csv": "csv"}
+
+# Uploads kept in memory up to this size when they have to be copied
+SPOOL_MAX_MEMORY = 5 * 1024 * 1024
+
+_CSV_READ_BLOCK = 1024 * 1024
+
+
+class UploadRejected(Exception):
+    """An upload refused before parsing; the message is shown to the user."""
+
+
+@dataclass
+class ImportSource:
+    """
+    An accepted upload. ``rows`` is the number of data rows (header
+    excluded) counted up front, or None when the workbook does not record
+    its dimensions; ``max_rows`` is then enforced while streaming.
+    """
+    name: str
+    format: str
+    file: BinaryIO
+    rows: Optional[int] = None
+    max_rows: Optional[int] = None
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def cell_text(row: Sequence[Any], index: int) -> str:
+    """Stripped text of a cell, '' when the cell is missing or empty."""
+    if len(row) > index and row[index] is not None:
+        return str(row[index]).strip()
+    return ''
+
+
+def _detach(uploaded_file: UploadedFile) -> BinaryIO:
+    """A binary handle on the upload that outlives the request."""
+    if hasattr(uploaded_file, "temporary_file_path"):
+        # Django deletes its temporary file when the request ends; a handle
+        # opened before that keeps the data readable until it is closed
+        try:
+            return open(uploaded_file.temporary_file_path(), "rb")
+        except OSError:
+            pass  # the platform refuses a second handle, copy it instead
+    uploaded_file.seek(0)
+    spooled = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    for block in uploaded_file.chunks():
+        spooled.write(block)
+    spooled.seek(0)
+    return spooled
+
+
+def _count_rows(file: BinaryIO, fmt: str) -> Optional[int]:
+    """Data rows of an upload without parsing it: sheet dimensions or CSV line count."""
+    file.seek(0)
+    try:
+        if fmt == "xlsx":
+            try:
+                wb = openpyxl.load_workbook(file, read_only=True, data_only=True)
+            except Exception:
+                raise UploadRejected("The file is not a valid Excel workbook.")
+            try:
+                max_row = wb.active.max_row
+            finally:
+                wb.close()
+            return max(max_row - 1, 0) if max_row else None
+
+        lines, last = 0, b"\n"
+        for block in iter(lambda: file.read(_CSV_READ_BLOCK), b""):
+            lines += block.count(b"\n")
+            last = block[-1:]
+        # an unterminated last line, minus the header
+        return max(lines + (last != b"\n") - 1, 0)
+    finally:
+        file.seek(0)
+
+
+def open_upload(uploaded_file: UploadedFile, max_bytes: int, max_rows: int) -> ImportSource:
+    """
+    Accept an upload for import, or raise UploadRejected when its format is
+    not supported or it exceeds ``max_bytes`` / ``max_rows``.
+    """
+    fmt = UPLOAD_FORMATS.get(os.path.splitext(uploaded_file.name or "")[1].lower())
+    if fmt is None:
+        raise UploadRejected("Only Excel (.xlsx) or CSV (.csv) files are accepted.")
+    if uploaded_file.size > max_bytes:
+        raise UploadRejected(f"The file is too large, the limit is {filesizeformat(max_bytes)}.")
+
+    file = _detach(uploaded_file)
+    try:
+        rows = _count_rows(file, fmt)
+        if rows is not None and rows > max_rows:
+            raise UploadRejected(f"The file has {rows} rows, the limit is {max_rows}.")
+    except Exception:
+        file.close()
+        raise
+    return ImportSource(name=uploaded_file.name, format=fmt, file=file, rows=rows, max_rows=max_rows)
+
+
+def _iter_rows(source: ImportSource) -> Iterator[Sequence[Any]]:
+    """Data rows of the upload (header skipped)."""
+    source.file.seek(0)
+    if source.format == "csv":
+        text = io.TextIOWrapper(source.file, encoding="utf-8-sig", errors="replace", newline="")
+        try:
+            rows = csv.reader(text)
+            next(rows, None)
+            yield from rows
+        finally:
+            text.detach()
+        return
+
+    wb = openpyxl.load_workbook(source.file, read_only=True, data_only=True)
+    try:
+        yield from wb.active.iter_rows(min_row=2, values_only=True)
+    finally:
+        wb.close()
+
+
+def iter_sheet_chunks(source: ImportSource, chunk_size: int = IMPORT_CHUNK_SIZE) -> Iterator[List[Row]]:
+    """Stream the upload's data rows in chunks of (row_number, values) pairs."""
+    max_rows = source.max_rows if source.rows is None else None
+    chunk: List[Row] = []
+    for row_num, row in enumerate(_iter_rows(source), start=2):
+        if max_rows is not None and row_num - 1 > max_rows:
+            raise UploadRejected(f"The file has more than {max_rows} rows.")
+        chunk.append((row_num, row))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def import_result(noun: str, created_count: int, failed: List[Dict[str, Any]],
+                  updated_count: Optional[int] = None, unchanged_count: int = 0) -> Dict[str, Any]:
+    """
+    Build the {'success', 'sms'} payload shared by the importers. Upsert
+    imports pass ``updated_count`` and get a 'diff' summary added.
+    """
+    if updated_count is None:
+        sms = f'Imported {created_count} {noun}(s) successfully.'
+        applied = created_count
+    else:
+        sms = (f'Added {created_count}, updated {updated_count} and left '
+               f'{unchanged_count} unchanged {noun}(s).')
+        applied = created_count + updated_count + unchanged_count
+    if failed:
+        sms += '<br>'
+        sms += f'Failed {noun}s:<br>' + '<br>'.join([
+            f'Row {f["row"]}: {f["reason"]}'
+            for f in sorted(failed, key=lambda f: f['row'])
+        ])
+
+    success = applied > 0 and len(failed) == 0
+    result = {'success': success, 'sms': sms}
+    if updated_count is not None:
+        result['diff'] = {
+            'inserted': created_count, 'updated': updated_count,
+            'unchanged': unchanged_count, 'failed': len(failed),
+        }
+    return result
+
+
+def import_stopped(noun: str, error: Exception, next_row: int, created_count: int,
+                   failed: List[Dict[str, Any]], updated_count: Optional[int] = None,
+                   unchanged_count: int = 0) -> Dict[str, Any]:
+    """
+    The payload for an import that raised part way through. Every chunk
+    commits on its own (progress stays visible and SQLite's write lock is
+    not held for the whole file), so the rows before ``next_row`` stay
+    saved; the message says so instead of a bare failure.
+    """
+    sms = f'Error processing file at row {next_row}: {error}'
+    saved = created_count + (updated_count or 0)
+    if saved:
+        sms += (f'<br>{saved} {noun}(s) from the rows above it were saved. '
+                f'Import the file again to add the rest.')
+    else:
+        sms += '<br>Nothing was imported.'
+    result = {'success': False, 'sms': sms, 'stopped_at_row': next_row}
+    if updated_count is not None:
+        result['diff'] = {
+            'inserted': created_count, 'updated': updated_count,
+            'unchanged': unchanged_count, 'failed': len(failed),
+        }
+    return result
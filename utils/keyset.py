@@ -0,0 +1,128 @@
+"""
+Keyset (seek) pagination.
+
+Instead of OFFSET, each page is fetched with a WHERE clause that starts
+right after (or before) the boundary row of the page the client is on, so
+every page costs the same index range scan however deep the client pages.
+The boundary row's sort values travel as an opaque cursor string.
+
+The ordering must end with a unique field (normally 'id' / '-id') so that
+every row has exactly one position.
+"""
+import base64
+import json
+from dataclasses import dataclass
+from typing import Any, List, Optional, Sequence, Tuple
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q, QuerySet
+
+# Largest COUNT done for the "of N" label; above it the total is shown as N+
+COUNT_CAP = 1000
+
+
+@dataclass(frozen=True)
+class KeysetPage:
+    items: List[Any]
+    has_next: bool
+    has_previous: bool
+    next_cursor: Optional[str]
+    prev_cursor: Optional[str]
+
+
+def _parse_ordering(ordering: Sequence[str]) -> List[Tuple[str, bool]]:
+    """[('fullname', False), ('id', False)] for ('fullname', 'id'); True = descending."""
+    return [(o.lstrip("-"), o.startswith("-")) for o in ordering]
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps([v.isoformat() if hasattr(v, "isoformat") else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(queryset: QuerySet, ordering: Sequence[str], cursor: str) -> Optional[List[Any]]:
+    """Sort values stored in ``cursor``, or None if it is not a valid cursor for this ordering."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        fields = _parse_ordering(ordering)
+        if not isinstance(values, list) or len(values) != len(fields):
+            return None
+        opts = queryset.model._meta
+        return [opts.get_field(name).to_python(value) for (name, _), value in zip(fields, values)]
+    except (ValueError, TypeError, ValidationError):
+        return None
+
+
+def seek_q(ordering: Sequence[str], values: Sequence[Any], forward: bool = True) -> Q:
+    """
+    Rows strictly after (``forward``) or before the row with ``values`` in
+    ``ordering``. The leading field also gets a non-strict bound so the
+    database can seek on its index.
+    """
+    fields = _parse_ordering(ordering)
+
+    def op(descending: bool, strict: bool) -> str:
+        ascending_after = forward != descending
+        return ("gt" if ascending_after else "lt") + ("" if strict else "e")
+
+    condition = Q()
+    equal = Q()
+    for (name, descending), value in zip(fields, values):
+        condition |= equal & Q(**{f"{name}__{op(descending, True)}": value})
+        equal &= Q(**{name: value})
+
+    lead_name, lead_desc = fields[0]
+    return Q(**{f"{lead_name}__{op(lead_desc, False)}": values[0]}) & condition
+
+
+def paginate(queryset: QuerySet, ordering: Sequence[str], per_page: int,
+             cursor: Optional[str] = None, direction: str = "next") -> KeysetPage:
+    """
+    One page of ``queryset`` in ``ordering``. ``cursor`` is the next_cursor
+    (direction 'next') or prev_cursor (direction 'prev') of the page the
+    client is on; without a valid cursor the first page is returned.
+    """
+    fields = _parse_ordering(ordering)
+    values = decode_cursor(queryset, ordering, cursor) if cursor else None
+    backwards = values is not None and direction == "prev"
+
+    qs = queryset
+    if values is not None:
+        qs = qs.filter(seek_q(ordering, values, forward=not backwards))
+    if backwards:
+        qs = qs.order_by(*[name if desc else f"-{name}" for name, desc in fields])
+    else:
+        qs = qs.order_by(*ordering)
+
+    rows = list(qs[:per_page + 1])
+    more = len(rows) > per_page
+    if backwards and not more:
+        # Reached the start: serve a full first page instead of a short one
+        return paginate(queryset, ordering, per_page)
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    def cursor_for(row: Any) -> str:
+        # rows are model instances or .values() dicts
+        get = row.get if isinstance(row, dict) else lambda name: getattr(row, name)
+        return encode_cursor([get(name) for name, _ in fields])
+
+    if backwards:
+        has_next, has_previous = True, True
+    else:
+        has_next, has_previous = more, values is not None
+    return KeysetPage(
+        items=rows,
+        has_next=has_next and bool(rows),
+        has_previous=has_previous and bool(rows),
+        next_cursor=cursor_for(rows[-1]) if rows else None,
+        prev_cursor=cursor_for(rows[0]) if rows else None,
+    )
+
+
+def capped_count(queryset: QuerySet, cap: int = COUNT_CAP) -> Tuple[int, bool]:
+    """(count, exact): counts at most ``cap`` + 1 rows, so the cost is bounded."""
+    count = queryset.order_by().values("pk")[:cap + 1].count()
+    return (cap, False) if count > cap else (count, True)
@@ -0,0 +1,347 @@
+"""
+Minimal pure-Python PDF writer.
+
+Only what the printable documents of this project need: the standard
+Helvetica fonts (no embedding), lines, rectangles and 8-bit PNG images.
+Pages are serialised one at a time by PdfWriter.stream(), so a document
+with many pages can be sent to the client while it is still being built.
+
+Canvas coordinates are in points with the origin at the TOP-left corner
+of the page; the y axis is flipped to PDF space when writing.
+"""
+import os
+import re
+import struct
+import zlib
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+# A4 portrait, in points
+A4 = (595.28, 841.89)
+
+FONT_REGULAR = "F1"
+FONT_BOLD = "F2"
+
+_BASE_FONTS = {FONT_REGULAR: "Helvetica", FONT_BOLD: "Helvetica-Bold"}
+
+# Glyph widths (1/1000 em) for the printable ASCII range, from the Adobe
+# core font metrics. Characters outside the range use _DEFAULT_WIDTH.
+_ASCII_WIDTHS = {
+    FONT_REGULAR: (
+        278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+        556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+        1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+        667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+        333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+        556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+    ),
+    FONT_BOLD: (
+        278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+        556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+        975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+        667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+        333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+        611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+    ),
+}
+_DEFAULT_WIDTH = 556
+
+
+def string_width(text: str, font: str, size: float) -> float:
+    widths = _ASCII_WIDTHS[font]
+    total = 0
+    for ch in text:
+        code = ord(ch)
+        total += widths[code - 32] if 32 <= code <= 126 else _DEFAULT_WIDTH
+    return total * size / 1000.0
+
+
+def wrap_text(text: str, font: str, size: float, max_width: float) -> List[str]:
+    """Greedy word wrap; words longer than a line are broken by character."""
+    lines: List[str] = []
+    for paragraph in (text or "").split("\n"):
+        current = ""
+        for word in paragraph.split():
+            candidate = f"{current} {word}" if current else word
+            if string_width(candidate, font, size) <= max_width:
+                current = candidate
+                continue
+            if current:
+                lines.append(current)
+            while string_width(word, font, size) > max_width and len(word) > 1:
+                cut = len(word) - 1
+                while cut > 1 and string_width(word[:cut], font, size) > max_width:
+                    cut -= 1
+                lines.append(word[:cut])
+                word = word[cut:]
+            current = word
+        lines.append(current)
+    return lines
+
+
+def fit_text(text: str, font: str, size: float, max_width: float) -> str:
+    """Truncate ``text`` with '...' so that it fits in ``max_width``."""
+    if string_width(text, font, size) <= max_width:
+        return text
+    while text and string_width(text + "...", font, size) > max_width:
+        text = text[:-1]
+    return text.rstrip() + "..."
+
+
+def _pdf_string(text: str) -> bytes:
+    raw = text.encode("cp1252", errors="replace")
+    return b"(" + raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def _num(value: float) -> str:
+    return f"{value:.2f}".rstrip("0").rstrip(".")
+
+
+# =============================================================================
+# Images
+# =============================================================================
+
+class PdfImage:
+    """
+    An RGB / grayscale image, with an optional alpha channel (SMask).
+    ``name`` is the resource name used in page content streams.
+    """
+
+    def __init__(self, name: str, width: int, height: int, colors: int, pixels: bytes,
+                 alpha: Optional[bytes] = None):
+        self.name = name
+        self.width = width
+        self.height = height
+        self.colors = colors
+        self.data = zlib.compress(pixels)
+        self.alpha = zlib.compress(alpha) if alpha is not None else None
+
+    @classmethod
+    def from_png(cls, path: str) -> "PdfImage":
+        """Decode a non-interlaced 8-bit PNG (gray, RGB, gray+alpha or RGBA)."""
+        with open(path, "rb") as f:
+            data = f.read()
+        if data[:8] != b"\x89PNG\r\n\x1a\n":
+            raise ValueError(f"{path} is not a PNG file")
+
+        pos, idat = 8, []
+        width = height = bit_depth = color_type = interlace = None
+        while pos < len(data):
+            length, kind = struct.unpack(">I4s", data[pos:pos + 8])
+            chunk = data[pos + 8:pos + 8 + length]
+            if kind == b"IHDR":
+                width, height, bit_depth, color_type, _, _, interlace = struct.unpack(">IIBBBBB", chunk)
+            elif kind == b"IDAT":
+                idat.append(chunk)
+            elif kind == b"IEND":
+                break
+            pos += length + 12
+
+        channels = {0: 1, 2: 3, 4: 2, 6: 4}.get(color_type)
+        if bit_depth != 8 or interlace or channels is None:
+            raise ValueError(f"{path}: only 8-bit non-interlaced gray/RGB PNGs are supported")
+
+        name = "Im" + re.sub(r"\W", "", os.path.splitext(os.path.basename(path))[0])
+        raw = _unfilter(zlib.decompress(b"".join(idat)), width, height, channels)
+        if channels in (1, 3):
+            return cls(name, width, height, channels, raw)
+
+        # Split the alpha channel off into its own soft mask
+        colors = channels - 1
+        pixels = bytearray(width * height * colors)
+        for i in range(colors):
+            pixels[i::colors] = raw[i::channels]
+        return cls(name, width, height, colors, bytes(pixels), bytes(raw[colors::channels]))
+
+
+def _unfilter(data: bytes, width: int, height: int, bpp: int) -> bytearray:
+    stride = width * bpp
+    out = bytearray(height * stride)
+    prev = bytearray(stride)
+    pos = 0
+    for y in range(height):
+        ftype = data[pos]
+        line = bytearray(data[pos + 1:pos + 1 + stride])
+        pos += stride + 1
+        if ftype == 1:
+            for i in range(bpp, stride):
+                line[i] = (line[i] + line[i - bpp]) & 0xFF
+        elif ftype == 2:
+            line = bytearray((a + b) & 0xFF for a, b in zip(line, prev))
+        elif ftype == 3:
+            for i in range(stride):
+                left = line[i - bpp] if i >= bpp else 0
+                line[i] = (line[i] + ((left + prev[i]) >> 1)) & 0xFF
+        elif ftype == 4:
+            for i in range(stride):
+                a = line[i - bpp] if i >= bpp else 0
+                b = prev[i]
+                c = prev[i - bpp] if i >= bpp else 0
+                p = a + b - c
+                pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+                pred = a if pa <= pb and pa <= pc else (b if pb <= pc else c)
+                line[i] = (line[i] + pred) & 0xFF
+        out[y * stride:(y + 1) * stride] = line
+        prev = line
+    return out
+
+
+# =============================================================================
+# Canvas
+# =============================================================================
+
+class PdfCanvas:
+    """Drawing operations for one page."""
+
+    def __init__(self, page_size: Tuple[float, float] = A4):
+        self.width, self.height = page_size
+        self._ops: List[str] = []
+        self.images: Dict[str, PdfImage] = {}
+
+    def _y(self, y: float) -> float:
+        return self.height - y
+
+    def text(self, x: float, y: float, text: str, font: str = FONT_REGULAR, size: float = 11) -> None:
+        """Draw ``text`` with its baseline at ``y``."""
+        self._ops.append(
+            f"BT /{font} {_num(size)} Tf {_num(x)} {_num(self._y(y))} Td "
+            + _pdf_string(text).decode("latin-1") + " Tj ET"
+        )
+
+    def text_centered(self, cx: float, y: float, text: str, font: str = FONT_REGULAR, size: float = 11) -> None:
+        self.text(cx - string_width(text, font, size) / 2, y, text, font, size)
+
+    def line(self, x1: float, y1: float, x2: float, y2: float, width: float = 1) -> None:
+        self._ops.append(
+            f"{_num(width)} w {_num(x1)} {_num(self._y(y1))} m {_num(x2)} {_num(self._y(y2))} l S"
+        )
+
+    def rect(self, x: float, y: float, w: float, h: float, width: float = 1) -> None:
+        """Stroke a rectangle whose top-left corner is (x, y)."""
+        self._ops.append(f"{_num(width)} w {_num(x)} {_num(self._y(y + h))} {_num(w)} {_num(h)} re S")
+
+    def image(self, image: PdfImage, x: float, y: float, w: float, h: float) -> None:
+        self.images[image.name] = image
+        self._ops.append(f"q {_num(w)} 0 0 {_num(h)} {_num(x)} {_num(self._y(y + h))} cm /{image.name} Do Q")
+
+    def content(self) -> bytes:
+        return zlib.compress("\n".join(self._ops).encode("latin-1"))
+
+    def freeze(self) -> "RenderedPage":
+        return RenderedPage(self.width, self.height, self.content(), dict(self.images))
+
+
+class RenderedPage:
+    """
+    A finished page: compressed content stream plus the images it uses.
+    Accepted by PdfWriter.stream() in place of a PdfCanvas, so rendered
+    pages can be cached and written again without redrawing them.
+    """
+
+    def __init__(self, width: float, height: float, content: bytes, images: Dict[str, PdfImage]):
+        self.width = width
+        self.height = height
+        self._content = content
+        self.images = images
+
+    def content(self) -> bytes:
+        return self._content
+
+
+# =============================================================================
+# Writer
+# =============================================================================
+
+class PdfWriter:
+    """
+    Serialises canvases into a PDF file. Object numbers 1-4 are reserved
+    for the catalog, the page tree and the two fonts; everything else is
+    numbered in the order it is written.
+    """
+
+    _CATALOG, _PAGES = 1, 2
+    _FONT_IDS = {FONT_REGULAR: 3, FONT_BOLD: 4}
+
+    def __init__(self) -> None:
+        self._offsets: Dict[int, int] = {}
+        self._position = 0
+        self._next_id = 5
+        self._image_ids: Dict[int, int] = {}
+
+    def _new_id(self) -> int:
+        obj_id = self._next_id
+        self._next_id += 1
+        return obj_id
+
+    def _emit(self, chunk: bytes) -> bytes:
+        self._position += len(chunk)
+        return chunk
+
+    def _object(self, obj_id: int, body: bytes, stream: Optional[bytes] = None) -> bytes:
+        self._offsets[obj_id] = self._position
+        out = f"{obj_id} 0 obj\n".encode() + body
+        if stream is not None:
+            out += b"\nstream\n" + stream + b"\nendstream"
+        return self._emit(out + b"\nendobj\n")
+
+    def _image_objects(self, image: PdfImage) -> Iterator[bytes]:
+        if id(image) in self._image_ids:
+            return
+        smask = ""
+        if image.alpha is not None:
+            smask_id = self._new_id()
+            yield self._object(smask_id, (
+                f"<< /Type /XObject /Subtype /Image /Width {image.width} /Height {image.height} "
+                f"/ColorSpace /DeviceGray /BitsPerComponent 8 /Filter /FlateDecode "
+                f"/Length {len(image.alpha)} >>"
+            ).encode(), image.alpha)
+            smask = f"/SMask {smask_id} 0 R "
+        obj_id = self._new_id()
+        colorspace = "/DeviceRGB" if image.colors == 3 else "/DeviceGray"
+        yield self._object(obj_id, (
+            f"<< /Type /XObject /Subtype /Image /Width {image.width} /Height {image.height} "
+            f"/ColorSpace {colorspace} /BitsPerComponent 8 /Filter /FlateDecode {smask}"
+            f"/Length {len(image.data)} >>"
+        ).encode(), image.data)
+        self._image_ids[id(image)] = obj_id
+
+    def stream(self, canvases: Iterable[Union[PdfCanvas, RenderedPage]]) -> Iterator[bytes]:
+        """Yield the PDF file in pieces, one page (plus new images) at a time."""
+        yield self._emit(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+        for font, obj_id in self._FONT_IDS.items():
+            yield self._object(obj_id, (
+                f"<< /Type /Font /Subtype /Type1 /BaseFont /{_BASE_FONTS[font]} "
+                f"/Encoding /WinAnsiEncoding >>"
+            ).encode())
+
+        page_ids: List[int] = []
+        for canvas in canvases:
+            for image in canvas.images.values():
+                yield from self._image_objects(image)
+
+            content = canvas.content()
+            content_id = self._new_id()
+            yield self._object(content_id, f"<< /Filter /FlateDecode /Length {len(content)} >>".encode(), content)
+
+            fonts = " ".join(f"/{font} {obj_id} 0 R" for font, obj_id in self._FONT_IDS.items())
+            xobjects = " ".join(f"/{name} {self._image_ids[id(img)]} 0 R" for name, img in canvas.images.items())
+            page_id = self._new_id()
+            yield self._object(page_id, (
+                f"<< /Type /Page /Parent {self._PAGES} 0 R "
+                f"/MediaBox [0 0 {_num(canvas.width)} {_num(canvas.height)}] "
+                f"/Resources << /Font << {fonts} >> /XObject << {xobjects} >> >> "
+                f"/Contents {content_id} 0 R >>"
+            ).encode())
+            page_ids.append(page_id)
+
+        kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+        yield self._object(self._PAGES, f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode())
+        yield self._object(self._CATALOG, f"<< /Type /Catalog /Pages {self._PAGES} 0 R >>".encode())
+
+        xref_at = self._position
+        size = self._next_id
+        xref = [f"xref\n0 {size}\n", "0000000000 65535 f \n"]
+        for obj_id in range(1, size):
+            xref.append(f"{self._offsets[obj_id]:010d} 00000 n \n")
+        xref.append(f"trailer\n<< /Size {size} /Root {self._CATALOG} 0 R >>\nstartxref\n{xref_at}\n%%EOF\n")
+        yield self._emit("".join(xref).encode())
@@ -0,0 +1,36 @@
+"""
+Tombstones for the entity tables (students, programs, courses, facilitators).
+
+A deleted row first gets ``deleted_at`` set and disappears from every
+queryset built on ``Model.objects`` (LiveManager). The real DELETE, and the
+SET_NULL updates it implies, are done later in small batches by
+apps.dashboard.bulk.purge(). Code that must see tombstoned rows (the
+purger) uses ``Model.all_objects``; the collector and forward foreign key
+access use the plain base manager, so they see them too.
+
+Until a row is purged, rows referencing it still carry its id. Queries
+that show a related name use live_related() so a tombstoned parent reads
+as missing straight away.
+"""
+from django.db import models
+from django.db.models import Case, F, Q, When
+
+
+class LiveManager(models.Manager):
+    """Default manager of a soft-deletable model: rows that are not tombstoned."""
+
+    def get_queryset(self) -> models.QuerySet:
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
+def live_related(path: str, field: str) -> Case:
+    """``path__field``, or NULL when the related row is tombstoned."""
+    return Case(
+        When(Q(**{f"{path}__deleted_at__isnull": True}), then=F(f"{path}__{field}")),
+        default=None,
+    )
+
+
+def is_live(path: str) -> Q:
+    """Rows whose ``path`` relation points to a row that is not tombstoned."""
+    return Q(**{f"{path}__deleted_at__isnull": True})